@@ -11,6 +11,8 @@ from typing import Dict, Any, Optional, AsyncGenerator
 import logging
 from datetime import datetime
 
+from llm_gateway import LLMGateway
+
 logger = logging.getLogger(__name__)
 
 class BaseSpecialistAgent(ABC):
@@ -26,10 +28,11 @@ class BaseSpecialistAgent(ABC):
         Initialize base agent
         
         Args:
-            groq_client: AsyncOpenAI client for Groq API
+            groq_client: Shared LLMGateway (or an AsyncOpenAI client for Groq API, wrapped in one)
             firebase_client: Optional Firebase client for data access
         """
-        self.client = groq_client
+        self.llm = groq_client if isinstance(groq_client, LLMGateway) else LLMGateway(groq_client)
+        self.client = self.llm.client
         self.db = firebase_client.db if firebase_client and hasattr(firebase_client, 'db') else None
         self.model = "llama-3.3-70b-versatile"
         self.fallback_model = "llama-3.1-8b-instant"
@@ -39,12 +42,13 @@ class BaseSpecialistAgent(ABC):
         logger.info(f"🤖 {self.__class__.__name__} initialized")
     
     @abstractmethod
-    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
+    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None, model: Optional[str] = None) -> str:
         """
         Get the specialist-specific system prompt
         
         Args:
             context: Optional context (user, organization, etc.)
+            model: Model the prompt is sent to (small models get the compact variant)
             
         Returns:
             System prompt string for this specialist
@@ -65,7 +69,9 @@ class BaseSpecialistAgent(ABC):
         self, 
         message: str, 
         context: Optional[Dict[str, Any]] = None,
-        stream: bool = True
+        stream: bool = True,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None
     ) -> AsyncGenerator[str, None]:
         """
         Chat with the specialist agent (streaming)
@@ -74,13 +80,16 @@ class BaseSpecialistAgent(ABC):
             message: User message
             context: Optional context dictionary
             stream: Whether to stream responses
+            model: Model chosen for this request (defaults to self.model)
+            max_tokens: Completion cap chosen for this request (defaults to self.max_tokens)
             
         Yields:
             Response chunks
         """
+        model = model or self.model
         try:
             # Get specialist system prompt
-            system_prompt = self.get_system_prompt(context)
+            system_prompt = self.get_system_prompt(context, model=model)
             
             # Prepare messages
             messages = [
@@ -90,28 +99,14 @@ class BaseSpecialistAgent(ABC):
             
             logger.info(f"💬 {self.get_specialist_name()} processing request")
             
-            # Stream response with automatic fallback on 429
-            try:
-                stream_response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                    stream=stream
-                )
-            except Exception as rate_err:
-                err_str = str(rate_err).lower()
-                if '429' in err_str or 'rate_limit' in err_str or 'rate limit' in err_str:
-                    logger.warning(f"⚠️ Rate limited on {self.model}, falling back to {self.fallback_model}")
-                    stream_response = await self.client.chat.completions.create(
-                        model=self.fallback_model,
-                        messages=messages,
-                        temperature=self.temperature,
-                        max_tokens=self.max_tokens,
-                        stream=stream
-                    )
-                else:
-                    raise
+            # Stream response (timeouts, retries and 429 fallback handled by the gateway)
+            stream_response = await self.llm.create(
+                messages,
+                model=model,
+                temperature=self.temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                stream=stream
+            )
             
             if stream:
                 async for chunk in stream_response:
@@ -153,27 +148,13 @@ class BaseSpecialistAgent(ABC):
             logger.info(f"📋 {self.get_specialist_name()} processing structured request")
             
             # Get response (non-streaming for structured output) with fallback
-            try:
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                    stream=False
-                )
-            except Exception as rate_err:
-                err_str = str(rate_err).lower()
-                if '429' in err_str or 'rate_limit' in err_str or 'rate limit' in err_str:
-                    logger.warning(f"⚠️ Rate limited on {self.model}, falling back to {self.fallback_model}")
-                    response = await self.client.chat.completions.create(
-                        model=self.fallback_model,
-                        messages=messages,
-                        temperature=self.temperature,
-                        max_tokens=self.max_tokens,
-                        stream=False
-                    )
-                else:
-                    raise
+            response = await self.llm.create(
+                messages,
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=False
+            )
             
             content = response.choices[0].message.content
             
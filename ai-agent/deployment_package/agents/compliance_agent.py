@@ -14,7 +14,7 @@ This specialist agent handles all compliance-related tasks including:
 from typing import Dict, Any, Optional, List
 import logging
 from .base_agent import BaseSpecialistAgent
-from specialist_prompts import get_compliance_specialist_prompt
+from prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -42,9 +42,9 @@ class ComplianceAgent(BaseSpecialistAgent):
         """Return specialist name"""
         return "Compliance Specialist"
     
-    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
+    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None, model: Optional[str] = None) -> str:
         """Get compliance specialist system prompt"""
-        return get_compliance_specialist_prompt()
+        return prompt_registry.get('compliance', model=model or self.model)
     
     # ==================== CBAHI Methods ====================
     
@@ -14,7 +14,7 @@ This specialist agent handles all risk-related tasks including:
 from typing import Dict, Any, Optional, List, Tuple
 import logging
 from .base_agent import BaseSpecialistAgent
-from specialist_prompts import get_risk_assessment_specialist_prompt
+from prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -61,9 +61,9 @@ class RiskAssessmentAgent(BaseSpecialistAgent):
         """Return specialist name"""
         return "Risk Assessment Specialist"
     
-    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
+    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None, model: Optional[str] = None) -> str:
         """Get risk assessment specialist system prompt"""
-        return get_risk_assessment_specialist_prompt()
+        return prompt_registry.get('risk', model=model or self.model)
     
     # ==================== Risk Calculation Methods ====================
     
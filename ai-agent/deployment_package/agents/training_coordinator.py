@@ -14,7 +14,7 @@ This specialist agent handles all training-related tasks including:
 from typing import Dict, Any, Optional, List
 import logging
 from .base_agent import BaseSpecialistAgent
-from specialist_prompts import get_training_specialist_prompt
+from prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -119,9 +119,9 @@ class TrainingCoordinator(BaseSpecialistAgent):
         """Return specialist name"""
         return "Training Coordinator"
     
-    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
+    def get_system_prompt(self, context: Optional[Dict[str, Any]] = None, model: Optional[str] = None) -> str:
         """Get training coordinator system prompt"""
-        return get_training_specialist_prompt()
+        return prompt_registry.get('training', model=model or self.model)
     
     # ==================== Competency Gap Analysis ====================
     
@@ -0,0 +1,148 @@
+"""
+Workspace analytics from Firestore aggregation queries
+
+Dashboard analytics used to stream every project, risk, department and user
+document of an organization and count statuses in Python. That is one billed
+read per document and the full payload of each one. AnalyticsEngine asks
+Firestore for `count()` aggregations instead, one per status / level bucket. An
+aggregation is billed one read per 1000 matching index entries, and the counts
+run concurrently. If aggregation queries are unavailable (older emulators),
+each collection is streamed once, projected to the one field being counted.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import logging
+import threading
+
+from fetch_plan import fan_out
+
+logger = logging.getLogger(__name__)
+
+# (collection, field, value) per count; field None counts the whole collection
+WORKSPACE_COUNTS: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {
+    'projects.total': ('projects', None, None),
+    'projects.active': ('projects', 'status', 'In Progress'),
+    'projects.completed': ('projects', 'status', 'Completed'),
+    'projects.on_hold': ('projects', 'status', 'On Hold'),
+    'risks.total': ('risks', None, None),
+    'risks.high': ('risks', 'level', 'High'),
+    'risks.critical': ('risks', 'level', 'Critical'),
+    'departments.total': ('departments', None, None),
+    'users.total': ('users', None, None),
+}
+
+SUMMARY_COUNTS: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {
+    'total_projects': ('projects', None, None),
+    'pending_risks': ('risks', 'status', 'open'),
+    'total_users': ('users', None, None),
+}
+
+
+def _nest(counts: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+    nested: Dict[str, Dict[str, int]] = {}
+    for key, value in counts.items():
+        group, name = key.split('.', 1)
+        nested.setdefault(group, {})[name] = value
+    return nested
+
+
+class AnalyticsEngine:
+    """Organization-scoped counts via aggregation queries"""
+
+    def __init__(self, db, executor: Optional[ThreadPoolExecutor] = None, use_aggregation: bool = True):
+        """
+        Initialize engine
+
+        Args:
+            db: Firestore client
+            executor: Pool the count queries fan out on (None runs them in turn)
+            use_aggregation: Use count() aggregations; False always uses projected streaming
+        """
+        self.db = db
+        self.executor = executor
+        self.use_aggregation = use_aggregation
+        self._lock = threading.Lock()
+        self._aggregations = 0
+        self._fallbacks = 0
+
+    def _query(self, collection: str, organization_id: str, field: Optional[str], value: Optional[str]):
+        query = self.db.collection(collection).where('organizationId', '==', organization_id)
+        if field is not None:
+            query = query.where(field, '==', value)
+        return query
+
+    def _aggregate(self, organization_id: str, specs) -> Dict[str, int]:
+        def count(collection: str, field: Optional[str], value: Optional[str]):
+            def read():
+                results = self._query(collection, organization_id, field, value).count(alias='count').get()
+                return int(results[0][0].value)
+            return read
+
+        counts = fan_out({key: count(*spec) for key, spec in specs.items()}, executor=self.executor)
+        with self._lock:
+            self._aggregations += len(specs)
+        return counts
+
+    def _tally(self, organization_id: str, specs) -> Dict[str, int]:
+        """One projected stream per collection, counting every bucket in a single pass"""
+        fields: Dict[str, set] = {}
+        for collection, field, _ in specs.values():
+            fields.setdefault(collection, set())
+            if field is not None:
+                fields[collection].add(field)
+
+        def tally(collection: str, projected: set):
+            def read():
+                total = 0
+                buckets: Counter = Counter()
+                # Project to the counted fields (organizationId when only the total is needed)
+                query = self._query(collection, organization_id, None, None)
+                for doc in query.select(sorted(projected) or ['organizationId']).stream():
+                    data = doc.to_dict() or {}
+                    total += 1
+                    for field in projected:
+                        buckets[(field, data.get(field))] += 1
+                return total, buckets
+            return read
+
+        tallies = fan_out(
+            {collection: tally(collection, projected) for collection, projected in fields.items()},
+            executor=self.executor
+        )
+        with self._lock:
+            self._fallbacks += 1
+        counts = {}
+        for key, (collection, field, value) in specs.items():
+            total, buckets = tallies[collection]
+            counts[key] = total if field is None else buckets[(field, value)]
+        return counts
+
+    def counts(self, organization_id: str, specs: Dict[str, Tuple[str, Optional[str], Optional[str]]]) -> Dict[str, int]:
+        """
+        Count documents of an organization for each spec
+
+        Args:
+            organization_id: Tenant scope
+            specs: {name: (collection, field or None, value)}
+
+        Returns:
+            {name: count}
+        """
+        if self.use_aggregation:
+            try:
+                return self._aggregate(organization_id, specs)
+            except Exception as e:
+                logger.warning(f"Aggregation queries failed, counting projected documents instead: {e}")
+        return self._tally(organization_id, specs)
+
+    def workspace_analytics(self, organization_id: str) -> Dict[str, Any]:
+        """Project, risk, department and user counts (FirebaseClient.get_workspace_analytics schema)"""
+        return _nest(self.counts(organization_id, WORKSPACE_COUNTS))
+
+    def workspace_summary(self, organization_id: str) -> Dict[str, int]:
+        """Project, open-risk and user totals (ContextManager full-tier schema)"""
+        return self.counts(organization_id, SUMMARY_COUNTS)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'aggregation_queries': self._aggregations, 'projected_fallbacks': self._fallbacks}
@@ -0,0 +1,154 @@
+"""
+Async Firestore data access
+
+FirebaseClient and ContextManager use the synchronous Firestore client, and
+their reads sit behind caches, single-flight and stale-while-revalidate that
+are synchronous too. Calling them from an `async def` endpoint blocks the event
+loop for the whole query, stalling every concurrent chat stream. Rather than
+duplicate that logic on Firestore's AsyncClient, the async methods here run the
+existing sync methods on a dedicated, bounded thread pool. The bound keeps a
+burst of requests from opening an unbounded number of Firestore calls at once.
+Excess calls queue, and the time they spend queued is reported.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+
+from monitoring import percentile
+
+_SAMPLE_WINDOW = 500
+
+
+class FirestoreExecutor:
+    """Bounded thread pool for blocking Firestore calls"""
+
+    def __init__(self, max_workers: int = 8, name: str = "firestore"):
+        """
+        Initialize executor
+
+        Args:
+            max_workers: Firestore calls allowed to run at once
+            name: Thread name prefix
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+        self._calls = 0
+        self._errors = 0
+        self._wait_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self._run_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking call on the pool and await its result
+
+        Context variables (request scope, priority) are copied into the worker
+        thread, as asyncio.to_thread does.
+
+        Args:
+            fn: Blocking callable
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            Whatever fn returns (its exceptions propagate)
+        """
+        submitted = time.perf_counter()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+
+        def timed():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            self._wait_ms.append((started - submitted) * 1000)
+            try:
+                return call()
+            except Exception:
+                self._errors += 1
+                raise
+            finally:
+                self._run_ms.append((time.perf_counter() - started) * 1000)
+                with self._lock:
+                    self._active -= 1
+
+        with self._lock:
+            self._queued += 1
+            self._calls += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool occupancy, queueing delay and call latency"""
+        return {
+            'max_workers': self.max_workers,
+            'active': self._active,
+            'queued': self._queued,
+            'calls': self._calls,
+            'errors': self._errors,
+            'wait_ms_p50': percentile(self._wait_ms, 0.5, ndigits=2),
+            'wait_ms_p95': percentile(self._wait_ms, 0.95, ndigits=2),
+            'run_ms_p50': percentile(self._run_ms, 0.5, ndigits=2),
+            'run_ms_p95': percentile(self._run_ms, 0.95, ndigits=2)
+        }
+
+
+def create_firestore_executor() -> FirestoreExecutor:
+    """Executor from FIRESTORE_THREADS (default 8)"""
+    return FirestoreExecutor(max_workers=int(os.getenv("FIRESTORE_THREADS", "8")))
+
+
+# Shared by FirebaseClient callers and ContextManager so the bound is process-wide
+firestore_executor = create_firestore_executor()
+
+
+class AsyncFirebaseClient:
+    """Awaitable FirebaseClient reads that never block the event loop"""
+
+    def __init__(self, client, executor: Optional[FirestoreExecutor] = None):
+        """
+        Initialize async client
+
+        Args:
+            client: FirebaseClient (or anything with the same read methods)
+            executor: Pool the reads run on (default: the shared firestore_executor)
+        """
+        self.client = client
+        self.executor = executor or firestore_executor
+
+    async def get_user_context(self, user_id: str, organization_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async FirebaseClient.get_user_context"""
+        return await self.executor.run(self.client.get_user_context, user_id, organization_id)
+
+    async def get_project_details(self, project_id: str, organization_id: str) -> Optional[Dict[str, Any]]:
+        """Async FirebaseClient.get_project_details"""
+        return await self.executor.run(self.client.get_project_details, project_id, organization_id)
+
+    async def get_workspace_analytics(self, organization_id: str) -> Dict[str, Any]:
+        """Async FirebaseClient.get_workspace_analytics"""
+        return await self.executor.run(self.client.get_workspace_analytics, organization_id)
+
+    async def search_documents(
+        self,
+        query: str,
+        organization_id: str,
+        document_type: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Async FirebaseClient.search_documents"""
+        return await self.executor.run(self.client.search_documents, query, organization_id, document_type, limit)
+
+    async def get_user_training_status(self, user_id: str, organization_id: str) -> Dict[str, Any]:
+        """Async FirebaseClient.get_user_training_status"""
+        return await self.executor.run(self.client.get_user_training_status, user_id, organization_id)
@@ -0,0 +1,79 @@
+"""
+One-time backfill of the uid -> organizationId mapping collection
+
+Reads every users/ document (and, with --with-auth-emails, every Firebase Auth
+user for email-only matches), derives each uid's organization with the same
+precedence the API uses, and writes one small document per uid to the mapping
+collection. After the backfill, tokens without the organizationId claim are
+resolved with a single document read instead of the legacy field queries.
+
+Usage:
+    python backfill_org_scopes.py [--dry-run] [--with-auth-emails] [--collection user_org_scopes]
+"""
+
+import argparse
+
+from firebase_admin import auth as firebase_auth
+
+from firebase_client import firebase_client
+from org_scope import MAPPING_COLLECTION, build_org_scope_mappings, mapping_document
+
+BATCH_LIMIT = 500  # Firestore batch write limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default=MAPPING_COLLECTION)
+    parser.add_argument("--with-auth-emails", action="store_true", help="match Auth users to user documents by email")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be written")
+    args = parser.parse_args()
+
+    db = firebase_client.db
+    print("=" * 72)
+    print(f"ORG SCOPE BACKFILL -> {args.collection}{' (dry run)' if args.dry_run else ''}")
+    print("=" * 72)
+
+    user_docs = [(doc.id, doc.to_dict() or {}) for doc in db.collection("users").stream()]
+    print(f"users/ documents: {len(user_docs)}")
+    auth_users = []
+    if args.with_auth_emails:
+        auth_users = [(user.uid, user.email) for user in firebase_auth.list_users().iterate_all()]
+        print(f"Auth users: {len(auth_users)}")
+
+    mappings, conflicts = build_org_scope_mappings(user_docs, auth_users)
+    sources = {}
+    for _, source in mappings.values():
+        sources[source] = sources.get(source, 0) + 1
+    print(f"uids with an organization: {len(mappings)}")
+    for source, count in sorted(sources.items()):
+        print(f"  {source:>16}: {count}")
+    if conflicts:
+        print(f"uids with conflicting organizations (highest-precedence source kept): {len(conflicts)}")
+        for uid in conflicts[:20]:
+            print(f"  {uid}")
+
+    if args.dry_run:
+        return
+
+    collection = db.collection(args.collection)
+    batch = db.batch()
+    batch_count = 0
+    written = 0
+    for uid, (organization_id, source) in mappings.items():
+        batch.set(collection.document(uid), mapping_document(organization_id, source))
+        batch_count += 1
+        if batch_count >= BATCH_LIMIT:
+            batch.commit()
+            written += batch_count
+            print(f"written: {written}")
+            batch = db.batch()
+            batch_count = 0
+    if batch_count:
+        batch.commit()
+        written += batch_count
+    print("-" * 72)
+    print(f"Wrote {written} mapping documents")
+
+
+if __name__ == "__main__":
+    main()
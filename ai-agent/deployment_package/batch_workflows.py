@@ -0,0 +1,114 @@
+"""
+Bounded-parallel workflow batches
+
+Runs a list of heterogeneous workflow payloads through their handlers. Items
+with identical (workflow, payload) content are run once; the other copies
+get the same result. Runs are capped at a fixed concurrency and use batch
+priority in the LLM scheduler, so a large batch cannot crowd out chat or
+single workflow calls. Results are yielded as each run completes, one line
+per submitted item, followed by a summary line.
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+import asyncio
+import os
+import time
+
+from llm_scheduler import PRIORITY_BATCH, request_scope
+from workflow_cache import payload_hash
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_WORKFLOW_CONCURRENCY", "4"))
+
+WorkflowHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def group_duplicates(items: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Group item indexes by content hash of their workflow and payload
+
+    Args:
+        items: [{'workflow': str, 'payload': dict}, ...]
+
+    Returns:
+        Hash -> indexes of the items with that content, in submission order
+    """
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        key = payload_hash({'workflow': item['workflow'], 'payload': item.get('payload') or {}})
+        groups.setdefault(key, []).append(index)
+    return groups
+
+
+async def run_batch(
+    items: List[Dict[str, Any]],
+    handlers: Dict[str, WorkflowHandler],
+    concurrency: int = BATCH_CONCURRENCY
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run workflow items and yield result lines as they complete
+
+    Args:
+        items: [{'workflow': str, 'payload': dict, 'id': optional client id}, ...]
+        handlers: Workflow name -> async handler taking the payload
+        concurrency: Maximum runs in flight
+
+    Yields:
+        One {'type': 'result', ...} line per item, then a {'type': 'summary', ...} line
+    """
+    started = time.perf_counter()
+    groups = group_duplicates(items)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(indexes: List[int]) -> Dict[str, Any]:
+        item = items[indexes[0]]
+        async with semaphore:
+            run_started = time.perf_counter()
+            try:
+                handler = handlers.get(item['workflow'])
+                if handler is None:
+                    raise ValueError(f"Unknown workflow '{item['workflow']}'")
+                result = await handler(item.get('payload') or {})
+                outcome = {'status': result.get('status', 'completed'), 'result': result}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                outcome = {'status': 'error', 'error': str(e) or type(e).__name__}
+            outcome['duration_ms'] = round((time.perf_counter() - run_started) * 1000, 1)
+            return outcome
+
+    # Runs copy the context at creation, so they inherit batch priority
+    with request_scope(priority=PRIORITY_BATCH):
+        tasks = {asyncio.ensure_future(run(indexes)): indexes for indexes in groups.values()}
+
+    counts = {'completed': 0, 'error': 0}
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                indexes = tasks[task]
+                outcome = task.result()
+                for position, index in enumerate(indexes):
+                    counts['completed' if outcome['status'] != 'error' else 'error'] += 1
+                    yield {
+                        'type': 'result',
+                        'index': index,
+                        'id': items[index].get('id'),
+                        'workflow': items[index]['workflow'],
+                        'deduplicated_from': indexes[0] if position else None,
+                        **outcome
+                    }
+    finally:
+        # Client went away: stop runs that have not finished
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    yield {
+        'type': 'summary',
+        'items': len(items),
+        'unique': len(groups),
+        'completed': counts['completed'],
+        'failed': counts['error'],
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,181 @@
+# Auth benchmark: requests/sec on an authenticated endpoint, blocking vs async token verification
+
+"""
+Serves a minimal authenticated FastAPI endpoint from a uvicorn subprocess and
+drives it with concurrent clients, each holding one of a fixed set of session
+tokens. Tokens are real RS256 JWTs checked with google-auth, the library
+firebase_admin uses, and every --cert-refresh-every verifications pays a
+simulated certificate fetch. Three modes are compared:
+
+  blocking         verify_id_token called inside the async dependency (before)
+  thread pool      TokenVerifier without its claims cache
+  pool + cache     TokenVerifier as used by main.py (after)
+
+Usage:
+    python benchmarks/auth_throughput.py [--requests 3000] [--concurrency 50] [--sessions 50]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException, Request  # noqa: E402
+from google.auth import crypt, jwt  # noqa: E402
+
+from token_verifier import TokenVerifier  # noqa: E402
+
+KEY_ID = "bench-key"
+
+
+class _Issuer:
+    """Signs session tokens and verifies them like firebase_admin does"""
+
+    def __init__(self, private_pem: bytes, cert_refresh_every: int = 0, cert_fetch_ms: float = 0.0):
+        key = serialization.load_pem_private_key(private_pem, password=None)
+        self.public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        self.signer = crypt.RSASigner.from_string(private_pem, key_id=KEY_ID)
+        self.cert_refresh_every = cert_refresh_every
+        self.cert_fetch_ms = cert_fetch_ms
+        self.verifications = 0
+
+    def token(self, uid: str) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://securetoken.google.com/bench", "aud": "bench", "sub": uid, "uid": uid,
+            "organizationId": "org-bench", "iat": now, "exp": now + 3600
+        }
+        return jwt.encode(self.signer, claims).decode()
+
+    def verify_id_token(self, token: str):
+        self.verifications += 1
+        if self.cert_refresh_every and self.verifications % self.cert_refresh_every == 0:
+            time.sleep(self.cert_fetch_ms / 1000)  # Google public certificate fetch
+        return jwt.decode(token, certs={KEY_ID: self.public_pem}, audience="bench")
+
+
+def _app(issuer: _Issuer, mode: str) -> FastAPI:
+    app = FastAPI()
+    verifier = TokenVerifier(issuer.verify_id_token, max_entries=0 if mode == "thread pool" else 10000)
+
+    async def authenticated(request: Request):
+        token = request.headers.get("Authorization", "")[7:]
+        try:
+            if mode == "blocking":
+                return issuer.verify_id_token(token)
+            return await verifier.verify(token)
+        except Exception:
+            raise HTTPException(status_code=401, detail="Invalid Firebase token")
+
+    @app.get("/api/me")
+    async def me(claims=Depends(authenticated)):
+        await asyncio.sleep(0.002)  # cache / Firestore round trip of a real handler
+        return {"uid": claims["uid"], "organization_id": claims.get("organizationId")}
+
+    @app.get("/stats")
+    async def stats():
+        return {"verifications": issuer.verifications}
+
+    return app
+
+
+def _serve(sock: socket.socket, private_pem: bytes, mode: str, cert_refresh_every: int, cert_fetch_ms: float):
+    issuer = _Issuer(private_pem, cert_refresh_every, cert_fetch_ms)
+    uvicorn.Server(uvicorn.Config(_app(issuer, mode), log_level="warning")).run(sockets=[sock])
+
+
+def _start_server(private_pem: bytes, mode: str, args) -> tuple:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    process = multiprocessing.Process(
+        target=_serve, args=(sock, private_pem, mode, args.cert_refresh_every, args.cert_fetch_ms), daemon=True
+    )
+    process.start()
+    base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    while True:
+        try:
+            httpx.get(f"{base_url}/stats").raise_for_status()
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+async def bench(base_url: str, tokens, requests: int, concurrency: int):
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(tokens[i % len(tokens)])
+
+        async def worker():
+            while not queue.empty():
+                token = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get("/api/me", headers={"Authorization": f"Bearer {token}"})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        verifications = (await client.get("/stats")).json()["verifications"]
+    return {
+        "verifications": verifications,
+        "rps": requests / elapsed,
+        "p50": _percentile(latencies, 0.50),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=50, help="distinct session tokens")
+    parser.add_argument("--cert-refresh-every", type=int, default=500, help="verifications per certificate fetch")
+    parser.add_argument("--cert-fetch-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"AUTH THROUGHPUT: {args.requests} requests, concurrency {args.concurrency}, {args.sessions} sessions")
+    print("=" * 72)
+    print(f"{'mode':>14} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'verifications':>13}")
+    print("-" * 72)
+    private_pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    issuer = _Issuer(private_pem)
+    tokens = [issuer.token(f"user-{i}") for i in range(args.sessions)]
+    for mode in ("blocking", "thread pool", "pool + cache"):
+        process, base_url = _start_server(private_pem, mode, args)
+        try:
+            result = asyncio.run(bench(base_url, tokens, args.requests, args.concurrency))
+        finally:
+            process.terminate()
+            process.join()
+        print(f"{mode:>14} | {result['rps']:>8.0f} | {result['p50']:>8.1f} | {result['p95']:>8.1f} | "
+              f"{result['p99']:>8.1f} | {result['verifications']:>13}")
+    print("-" * 72)
+    print("Blocking verification stalls every in-flight request; cached sessions skip verification entirely.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Cache backend benchmark: hit rate at 1 worker vs N workers
+
+"""
+Replays a skewed (Zipf-like) stream of user-context lookups against
+uvicorn-style workers and compares:
+
+- memory: every worker has its own SimpleCache (today's behaviour)
+- redis:  every worker talks to one shared RedisCacheBackend
+
+Uses REDIS_URL when set, otherwise fakeredis as a local stand-in.
+
+Usage:
+    python benchmarks/cache_worker_hit_rate.py [--requests 20000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import SimpleCache, RedisCacheBackend  # noqa: E402
+
+# Firestore reads performed by one get_user_context miss
+READS_PER_MISS = 4
+
+
+def _redis_client():
+    url = os.getenv("REDIS_URL")
+    if url:
+        import redis
+        client = redis.Redis.from_url(url)
+        client.ping()
+        return client, "redis"
+    import fakeredis
+    return fakeredis.FakeRedis(), "fakeredis"
+
+
+def _request_stream(total: int, users: int, orgs: int, seed: int):
+    """Zipf-like user popularity: a few users send most requests"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(users)]
+    user_ids = rng.choices(range(users), weights=weights, k=total)
+    return [(f"org-{uid % orgs}", f"user-{uid}") for uid in user_ids]
+
+
+def _user_context(org_id: str, user_id: str):
+    return {
+        "user_data": {"id": user_id, "organizationId": org_id, "role": "Quality Manager"},
+        "assigned_projects": [{"id": f"p{i}", "name": f"Project {i}", "status": "In Progress"} for i in range(5)],
+        "recent_documents": [{"name": f"Policy {i}", "type": "Policy", "status": "Approved"} for i in range(10)],
+    }
+
+
+def run(backends, stream, seed: int):
+    rng = random.Random(seed)
+    hits = misses = 0
+    start = time.perf_counter()
+    for org_id, user_id in stream:
+        backend = backends[rng.randrange(len(backends))]  # load balancer
+        key = f"user_context:{org_id}:{user_id}"
+        if backend.get(key) is not None:
+            hits += 1
+        else:
+            misses += 1
+            backend.set(key, _user_context(org_id, user_id), ttl=180)
+    elapsed = time.perf_counter() - start
+    return hits, misses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--orgs", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--per-worker-entries", type=int, default=500,
+                        help="memory budget per worker, in entries")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stream = _request_stream(args.requests, args.users, args.orgs, args.seed)
+    client, redis_kind = _redis_client()
+
+    print("=" * 72)
+    print(f"CACHE HIT RATE: {args.requests} requests, {args.users} users, {args.orgs} orgs")
+    print("=" * 72)
+    print(f"{'workers':>7} | {'backend':<10} | {'hit rate':>8} | {'firestore reads':>15} | {'us/op':>7}")
+    print("-" * 72)
+
+    for workers in args.workers:
+        memory = [SimpleCache(default_ttl=180, max_entries=args.per_worker_entries) for _ in range(workers)]
+        hits, misses, elapsed = run(memory, stream, args.seed)
+        print(f"{workers:>7} | {'memory':<10} | {hits / len(stream):>7.1%} | "
+              f"{misses * READS_PER_MISS:>15} | {elapsed / len(stream) * 1e6:>7.1f}")
+
+        client.flushdb()
+        shared = [RedisCacheBackend(client, namespace="bench", default_ttl=180) for _ in range(workers)]
+        hits, misses, elapsed = run(shared, stream, args.seed)
+        print(f"{workers:>7} | {redis_kind:<10} | {hits / len(stream):>7.1%} | "
+              f"{misses * READS_PER_MISS:>15} | {elapsed / len(stream) * 1e6:>7.1f}")
+
+    print("-" * 72)
+    print("memory hit rate falls as workers are added; the shared backend stays flat.")
+
+
+if __name__ == "__main__":
+    main()
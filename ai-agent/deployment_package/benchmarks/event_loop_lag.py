@@ -0,0 +1,135 @@
+# Event-loop lag benchmark: sync Firestore reads in async handlers vs the bounded Firestore pool
+
+"""
+Runs concurrent request handlers that each read user context and workspace
+analytics from a FirebaseClient stand-in whose reads block for a Firestore
+round trip per query. Chat streams emitting a token every --token-ms run at the
+same time, and a probe measures how late the event loop wakes up:
+
+  sync             client methods called directly in the coroutine (before)
+  pool (N)         AsyncFirebaseClient on a FirestoreExecutor with N threads (after)
+
+Reported: requests/sec, event-loop lag (probe wake-up delay) and the worst
+inter-token gap seen by the concurrent streams.
+
+Usage:
+    python benchmarks/event_loop_lag.py [--requests 200] [--concurrency 20] [--rtt-ms 15]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_firebase import AsyncFirebaseClient, FirestoreExecutor  # noqa: E402
+
+
+class _FirestoreStandIn:
+    """Blocking reads with the query counts of FirebaseClient's loaders"""
+
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+
+    def _queries(self, count: int):
+        for _ in range(count):
+            time.sleep(self.rtt)
+
+    def get_user_context(self, user_id, organization_id=None):
+        self._queries(4)  # user doc, projects, department, documents
+        return {"user_data": {"id": user_id, "organizationId": organization_id}}
+
+    def get_workspace_analytics(self, organization_id):
+        self._queries(4)  # projects, risks, departments, users
+        return {"projects": {"total": 12}}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)] if ordered else 0.0
+
+
+async def bench(mode: str, threads: int, args) -> dict:
+    client = _FirestoreStandIn(args.rtt_ms)
+    firestore = AsyncFirebaseClient(client, FirestoreExecutor(max_workers=threads)) if threads else None
+    lags, gaps = [], []
+    done = asyncio.Event()
+
+    async def probe():
+        interval = args.probe_ms / 1000
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append((time.perf_counter() - started - interval) * 1000)
+
+    async def stream():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(args.token_ms / 1000)
+            now = time.perf_counter()
+            gaps.append((now - last) * 1000)
+            last = now
+
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def handler():
+        while not queue.empty():
+            i = queue.get_nowait()
+            await asyncio.sleep(0)  # the rest of the handler (auth, LLM call) awaits
+            if firestore is None:
+                client.get_user_context(f"user-{i}", "org-1")
+                client.get_workspace_analytics("org-1")
+            else:
+                await firestore.get_user_context(f"user-{i}", "org-1")
+                await firestore.get_workspace_analytics("org-1")
+
+    background = [asyncio.create_task(probe())] + [asyncio.create_task(stream()) for _ in range(args.streams)]
+    started = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*background)
+    if firestore is not None:
+        firestore.executor.shutdown()
+    return {
+        "rps": args.requests / elapsed,
+        "lag_p50": _percentile(lags, 0.50),
+        "lag_p99": _percentile(lags, 0.99),
+        "lag_max": max(lags) if lags else 0.0,
+        "gap_max": max(gaps) if gaps else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=15.0, help="blocking time per Firestore query")
+    parser.add_argument("--threads", type=int, nargs="+", default=[4, 8, 16], help="pool sizes to compare")
+    parser.add_argument("--streams", type=int, default=10, help="concurrent chat streams")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="interval between streamed tokens")
+    parser.add_argument("--probe-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"EVENT LOOP LAG: {args.requests} requests x 8 Firestore queries, concurrency {args.concurrency}, "
+          f"rtt {args.rtt_ms:.0f} ms")
+    print("=" * 78)
+    print(f"{'mode':>10} | {'req/s':>7} | {'lag p50 ms':>10} | {'lag p99 ms':>10} | {'lag max ms':>10} | "
+          f"{'token gap max ms':>16}")
+    print("-" * 78)
+    for threads in [0] + args.threads:
+        mode = "sync" if not threads else f"pool ({threads})"
+        result = asyncio.run(bench(mode, threads, args))
+        print(f"{mode:>10} | {result['rps']:>7.1f} | {result['lag_p50']:>10.1f} | {result['lag_p99']:>10.1f} | "
+              f"{result['lag_max']:>10.1f} | {result['gap_max']:>16.1f}")
+    print("-" * 78)
+    print(f"Token gap is {args.token_ms:.0f} ms when the loop is free; sync reads stall every stream for the whole query.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# LLM gateway benchmark: time-to-first-token with and without hedging
+
+"""
+Starts a local OpenAI-compatible mock server whose primary model has a
+heavy first-token tail (most responses start in ~300 ms, a few stall for
+seconds) and whose fallback model is fast, then streams the same request
+mix through LLMGateway with hedging off, at a fixed threshold, and at the
+adaptive p95 threshold. Reports client-side TTFT percentiles and how often
+the hedge was sent and won.
+
+Usage:
+    python benchmarks/hedging_ttft.py [--requests 300] [--concurrency 20] [--tail 0.08]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI  # noqa: E402
+
+from benchmarks.mock_llm_server import MockLLMConfig, MockModel, create_mock_app, serve_in_thread  # noqa: E402
+from llm_gateway import LLMGateway  # noqa: E402
+
+PRIMARY = "llama-3.3-70b-versatile"
+FALLBACK = "llama-3.1-8b-instant"
+
+
+def _mock_config(tail: float, seed: int) -> MockLLMConfig:
+    return MockLLMConfig(
+        models={
+            # Most responses start in ~300 ms, a few stall for seconds
+            PRIMARY: MockModel(ttft_ms=300.0, ttft_sigma=0.35, tail_rate=tail, tail_ms=(3000.0, 6000.0)),
+            FALLBACK: MockModel(ttft_ms=150.0, ttft_sigma=0.3, tokens_per_sec=750.0),
+        },
+        seed=seed
+    )
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+async def bench(base_url: str, requests: int, concurrency: int, hedge: bool, hedge_after_ms):
+    client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+    gateway = LLMGateway(client, fallback_model=FALLBACK, hedge=hedge, hedge_after_ms=hedge_after_ms)
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfts = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            stream = await gateway.create([{"role": "user", "content": "hand hygiene policy"}], model=PRIMARY, stream=True)
+            first = None
+            async for chunk in stream:
+                if first is None and chunk.choices and chunk.choices[0].delta.content:
+                    first = time.perf_counter()
+            ttfts.append((first - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    await client.close()
+    fallback_stats = gateway.get_stats()["by_model"].get(FALLBACK, {})
+    return {
+        "p50": _percentile(ttfts, 0.50),
+        "p95": _percentile(ttfts, 0.95),
+        "p99": _percentile(ttfts, 0.99),
+        "hedged": fallback_stats.get("hedges_to", 0) / requests,
+        "won": fallback_stats.get("hedges_won", 0) / requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tail", type=float, default=0.08, help="share of primary requests that stall 3-6 s")
+    parser.add_argument("--hedge-after-ms", type=float, default=800)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    runs = [
+        ("no hedging", False, None),
+        (f"hedge @ {args.hedge_after_ms:.0f} ms", True, args.hedge_after_ms),
+        ("hedge @ p95", True, None),
+    ]
+    print("=" * 78)
+    print(f"HEDGING TTFT: {args.requests} streams, concurrency {args.concurrency}, "
+          f"{args.tail:.0%} primary stalls")
+    print("=" * 78)
+    print(f"{'mode':>20} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'hedged':>7} | {'hedge won':>9}")
+    print("-" * 78)
+    for label, hedge, after_ms in runs:
+        # Same latency sequence for every mode
+        base_url = serve_in_thread(create_mock_app(_mock_config(args.tail, args.seed)))
+        result = asyncio.run(bench(base_url, args.requests, args.concurrency, hedge, after_ms))
+        print(f"{label:>20} | {result['p50']:>8.0f} | {result['p95']:>8.0f} | {result['p99']:>8.0f} | "
+              f"{result['hedged']:>6.1%} | {result['won']:>8.1%}")
+    print("-" * 78)
+    print("Hedging caps the tail near threshold + fallback TTFT at the cost of the hedged share in extra calls.")
+
+
+if __name__ == "__main__":
+    main()
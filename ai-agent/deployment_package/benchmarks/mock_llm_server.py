@@ -0,0 +1,303 @@
+# Local OpenAI-compatible chat completions server for benchmarks and load tests
+
+"""
+Serves POST /v1/chat/completions (streaming and non-streaming) and
+GET /v1/models, so AsyncOpenAI(base_url=...) and the whole API (via
+LLM_BASE_URL) can run without Groq. Per model you set the time-to-first-token
+distribution (lognormal around a median, plus an optional slow tail), the
+token rate, and the share of calls answered with 429 or 500. Replies are
+canned texts picked by a hash of the conversation, so the same request always
+gets the same answer; the latency draws come from a seeded generator keyed
+on the request and its repeat count, so a run is reproducible.
+
+Usage:
+    python benchmarks/mock_llm_server.py [--port 8001] [--config mock.json] [--ttft-ms 300]
+        [--tokens-per-sec 250] [--tail-rate 0.05] [--rate-limit-rate 0.02] [--seed 7]
+
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 GROQ_API_KEY=mock uvicorn main:app
+
+A --config file looks like
+    {"seed": 7, "models": {"llama-3.3-70b-versatile": {"ttft_ms": 300, "tokens_per_sec": 250}},
+     "responses": ["## Summary ..."]}
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import ClientDisconnect, Request  # noqa: E402
+from starlette.responses import JSONResponse, Response, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from token_budget import estimate_tokens  # noqa: E402
+
+CANNED_RESPONSES = [
+    "## Summary\nReview the hand hygiene policy against **JCI IPSG.5**.\n\n"
+    "1. Audit compliance on every ward monthly.\n2. Retrain staff below 90%.\n3. Report results to the IPC committee.",
+    "## Gap analysis\n- Medication reconciliation is not documented at transfer.\n"
+    "- High-alert medication labels are inconsistent.\n\n**Next step:** assign an owner and a due date for each gap.",
+    "## Action plan\n1. Root cause: the policy was not updated after the 2024 revision.\n"
+    "2. Corrective action: revise the policy and brief department heads.\n"
+    "3. Timeline: 30 days.\n4. Success metric: 100% of units signed off.",
+    "## Risk\nThe overall survey risk is **Medium**. Fire drills and emergency-cart checks are the weakest areas; "
+    "close them before the mock survey.",
+]
+
+# Word pieces streamed as one token each
+_TOKEN_PIECES = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass
+class MockModel:
+    """Latency and failure profile of one mocked model"""
+    ttft_ms: float = 300.0  # median time to first token
+    ttft_sigma: float = 0.35  # lognormal shape of the first-token delay
+    tail_rate: float = 0.0  # share of calls that stall before the first token
+    tail_ms: Tuple[float, float] = (3000.0, 6000.0)
+    tokens_per_sec: float = 250.0
+    rate_limit_rate: float = 0.0  # share of calls answered with 429
+    error_rate: float = 0.0  # share of calls answered with 500
+    retry_after: float = 1.0  # Retry-After seconds on a 429
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'MockModel':
+        known = {f.name for f in fields(cls)}
+        options = {key: value for key, value in values.items() if key in known}
+        if 'tail_ms' in options:
+            options['tail_ms'] = tuple(options['tail_ms'])
+        return cls(**options)
+
+
+# Roughly Groq's observed speeds
+DEFAULT_MODELS = {
+    'llama-3.3-70b-versatile': MockModel(ttft_ms=300.0, tokens_per_sec=250.0),
+    'llama-3.1-8b-instant': MockModel(ttft_ms=150.0, tokens_per_sec=750.0),
+}
+
+
+@dataclass
+class MockLLMConfig:
+    """Models, canned replies and seed for a mock server"""
+    models: Dict[str, MockModel] = field(
+        default_factory=lambda: {name: replace(model) for name, model in DEFAULT_MODELS.items()}
+    )
+    default_model: MockModel = field(default_factory=MockModel)
+    responses: List[str] = field(default_factory=lambda: list(CANNED_RESPONSES))
+    seed: int = 7
+
+    @classmethod
+    def from_file(cls, path: str) -> 'MockLLMConfig':
+        with open(path) as f:
+            data = json.load(f)
+        config = cls(seed=int(data.get('seed', 7)))
+        for name, values in (data.get('models') or {}).items():
+            config.models[name] = MockModel.from_dict(values)
+        if data.get('default_model'):
+            config.default_model = MockModel.from_dict(data['default_model'])
+        if data.get('responses'):
+            config.responses = list(data['responses'])
+        return config
+
+    def model(self, name: str) -> MockModel:
+        return self.models.get(name, self.default_model)
+
+
+class MockLLMServer:
+    """Request handling and counters for the mock chat completions API"""
+
+    def __init__(self, config: Optional[MockLLMConfig] = None):
+        self.config = config or MockLLMConfig()
+        self._repeats: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, model: str, outcome: str):
+        counters = self.stats.setdefault(model, {'requests': 0, 'completed': 0, 'rate_limited': 0, 'errors': 0})
+        counters[outcome] += 1
+
+    def _plan(self, body: Dict[str, Any]):
+        """Reply text, first-token delay and injected failure for a request"""
+        model_name = body.get('model', '')
+        profile = self.config.model(model_name)
+        messages = body.get('messages') or []
+        key = hashlib.sha256(
+            json.dumps([model_name, messages], sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        repeat = self._repeats.get(key, 0)
+        self._repeats[key] = repeat + 1
+        rng = random.Random(f"{self.config.seed}:{key}:{repeat}")
+
+        failure = None
+        draw = rng.random()
+        if draw < profile.rate_limit_rate:
+            failure = 429
+        elif draw < profile.rate_limit_rate + profile.error_rate:
+            failure = 500
+
+        if rng.random() < profile.tail_rate:
+            delay_ms = rng.uniform(*profile.tail_ms)
+        else:
+            delay_ms = profile.ttft_ms * rng.lognormvariate(0.0, profile.ttft_sigma)
+
+        text = self.config.responses[int(key[:8], 16) % len(self.config.responses)]
+        prompt_tokens = sum(estimate_tokens(str(m.get('content') or '')) + 4 for m in messages)
+        return profile, text, delay_ms / 1000, failure, prompt_tokens, f"chatcmpl-mock-{key[:12]}-{repeat}"
+
+    @staticmethod
+    def _error(status: int, profile: MockModel) -> JSONResponse:
+        if status == 429:
+            return JSONResponse(
+                {'error': {'message': 'Rate limit reached (mock)', 'type': 'tokens', 'code': 'rate_limit_exceeded'}},
+                status_code=429,
+                headers={'retry-after': str(profile.retry_after)}
+            )
+        return JSONResponse(
+            {'error': {'message': 'Internal server error (mock)', 'type': 'internal_server_error'}},
+            status_code=500
+        )
+
+    async def completions(self, request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # A hedged or cancelled call went away before sending its body
+            return Response(status_code=499)
+        model_name = body.get('model', '')
+        profile, text, delay, failure, prompt_tokens, completion_id = self._plan(body)
+        self._count(model_name, 'requests')
+        if failure:
+            self._count(model_name, 'rate_limited' if failure == 429 else 'errors')
+            return self._error(failure, profile)
+
+        pieces = _TOKEN_PIECES.findall(text)
+        max_tokens = body.get('max_tokens') or body.get('max_completion_tokens')
+        finish_reason = 'stop'
+        if max_tokens and len(pieces) > max_tokens:
+            pieces, finish_reason = pieces[:max_tokens], 'length'
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(pieces),
+            'total_tokens': prompt_tokens + len(pieces)
+        }
+        created = int(time.time())
+        seconds_per_token = 1 / profile.tokens_per_sec if profile.tokens_per_sec else 0.0
+
+        if not body.get('stream'):
+            await asyncio.sleep(delay + len(pieces) * seconds_per_token)
+            self._count(model_name, 'completed')
+            return JSONResponse({
+                'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': model_name,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ''.join(pieces)},
+                    'finish_reason': finish_reason
+                }],
+                'usage': usage
+            })
+
+        include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+
+        def chunk(delta: Optional[Dict[str, Any]], finish: Optional[str] = None, **extra) -> str:
+            choices = [{'index': 0, 'delta': delta, 'finish_reason': finish}] if delta is not None else []
+            payload = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model_name,
+                'choices': choices, **extra
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            await asyncio.sleep(delay)
+            yield chunk({'role': 'assistant', 'content': ''})
+            started = time.perf_counter()
+            for index, piece in enumerate(pieces):
+                # Pace against the clock so sleep overhead does not slow the token rate
+                wait = started + index * seconds_per_token - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                yield chunk({'content': piece})
+            # Groq reports usage on the last chunk under x_groq
+            yield chunk({}, finish_reason, x_groq={'id': completion_id, 'usage': usage})
+            if include_usage:
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+            self._count(model_name, 'completed')
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def models(self, request: Request):
+        return JSONResponse({
+            'object': 'list',
+            'data': [{'id': name, 'object': 'model', 'owned_by': 'mock'} for name in sorted(self.config.models)]
+        })
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/v1/chat/completions", self.completions, methods=["POST"]),
+            Route("/v1/models", self.models, methods=["GET"]),
+        ])
+
+
+def create_mock_app(config: Optional[MockLLMConfig] = None) -> Starlette:
+    """Starlette app serving the mock API (the server is at app.state.mock)"""
+    server = MockLLMServer(config)
+    app = server.app()
+    app.state.mock = server
+    return app
+
+
+def serve_in_thread(app: Starlette, host: str = "127.0.0.1") -> str:
+    """Run the app on a free port in a daemon thread; returns the /v1 base URL"""
+    sock = socket.socket()
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://{host}:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--config", help="JSON file with models, responses and seed")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--ttft-ms", type=float, help="median TTFT for every model")
+    parser.add_argument("--tokens-per-sec", type=float, help="token rate for every model")
+    parser.add_argument("--tail-rate", type=float, help="share of calls that stall 3-6 s before the first token")
+    parser.add_argument("--rate-limit-rate", type=float, help="share of calls answered with 429")
+    parser.add_argument("--error-rate", type=float, help="share of calls answered with 500")
+    args = parser.parse_args()
+
+    config = MockLLMConfig.from_file(args.config) if args.config else MockLLMConfig()
+    if args.seed is not None:
+        config.seed = args.seed
+    overrides = {
+        'ttft_ms': args.ttft_ms, 'tokens_per_sec': args.tokens_per_sec, 'tail_rate': args.tail_rate,
+        'rate_limit_rate': args.rate_limit_rate, 'error_rate': args.error_rate
+    }
+    for profile in [*config.models.values(), config.default_model]:
+        for name, value in overrides.items():
+            if value is not None:
+                setattr(profile, name, value)
+
+    print(f"Mock LLM server on http://{args.host}:{args.port}/v1 (models: {', '.join(sorted(config.models))})")
+    uvicorn.run(create_mock_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Semantic cache benchmark: top-1 lookup latency at 10k / 100k cached entries
+
+"""
+Fills one organization's SemanticCache index with synthetic accreditation
+questions and measures lookup latency (one matrix-vector product + argmax)
+for reworded queries, plus the index memory footprint.
+
+Usage:
+    python benchmarks/semantic_cache_lookup.py [--sizes 10000 100000] [--lookups 500] [--dim 1024]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache  # noqa: E402
+
+BODIES = ["JCI", "CBAHI", "CAP", "ISO 9001", "DNV", "Joint Commission", "NABH", "ACHS"]
+AREAS = ["infection control", "medication management", "patient safety", "hand hygiene",
+         "fire safety", "emergency preparedness", "documentation", "staff competency",
+         "risk management", "quality improvement", "laboratory", "radiology", "pharmacy"]
+ACTIONS = ["prepare for", "write a policy on", "train nurses on", "audit", "close gaps in",
+           "track KPIs for", "build a checklist for", "explain standards for", "report on"]
+PHRASES = ["survey", "mock survey", "tracer", "self assessment", "CAPA", "action plan"]
+
+
+def _question(rng: random.Random) -> str:
+    return (f"how do I {rng.choice(ACTIONS)} {rng.choice(AREAS)} "
+            f"{rng.choice(PHRASES)} for {rng.choice(BODIES)} in unit {rng.randrange(500)}")
+
+
+def _reword(question: str) -> str:
+    """Cheap paraphrase: drop the lead-in and reorder the tail"""
+    words = question.replace("how do I ", "").split()
+    return " ".join(words[-4:] + words[:-4]) + " steps"
+
+
+def bench(size: int, lookups: int, dim: int, seed: int):
+    rng = random.Random(seed)
+    cache = SemanticCache(threshold=0.8, max_entries_per_org=size, dim=dim)
+    questions = [_question(rng) for _ in range(size)]
+
+    start = time.perf_counter()
+    cache.bulk_load("org-bench", [("general:standard:ctx", q, f"answer {i}") for i, q in enumerate(questions)])
+    build_s = time.perf_counter() - start
+
+    queries = [_reword(rng.choice(questions)) for _ in range(lookups)]
+    latencies = []
+    hits = 0
+    for query in queries:
+        t0 = time.perf_counter()
+        result = cache.lookup("org-bench", "general:standard:ctx", query)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += result is not None
+
+    latencies.sort()
+    index = cache._orgs["org-bench"]
+    return {
+        "build_s": build_s,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "hit_rate": hits / lookups,
+        "matrix_mb": index.matrix.nbytes / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"SEMANTIC CACHE LOOKUP: dim={args.dim}, {args.lookups} reworded lookups per size")
+    print("=" * 72)
+    print(f"{'entries':>8} | {'build s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'hit rate':>8} | {'matrix MB':>9}")
+    print("-" * 72)
+    for size in args.sizes:
+        result = bench(size, args.lookups, args.dim, args.seed)
+        print(f"{size:>8} | {result['build_s']:>7.2f} | {result['p50_ms']:>7.3f} | {result['p95_ms']:>7.3f} | "
+              f"{result['hit_rate']:>7.1%} | {result['matrix_mb']:>9.1f}")
+    print("-" * 72)
+    print("Lookup cost grows linearly with entries; keep SEMANTIC_CACHE_MAX_ENTRIES_PER_ORG bounded.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# User-context benchmark: sequential vs fanned-out Firestore reads in FirebaseClient._load_user_context
+
+"""
+Runs FirebaseClient's real user-context loader (cache disabled) against an
+in-memory Firestore stand-in that sleeps --rtt-ms per document read or query.
+The user document is read first; lead projects, department and recent
+documents only depend on it. Modes:
+
+  sequential   parallel_reads=False, the four reads one after another (before)
+  fan-out      parallel_reads=True, the three dependent reads concurrently (after)
+
+Reports per-stage p50 timings from FirebaseClient.user_context_timings.
+
+Usage:
+    python benchmarks/user_context_fanout.py [--loads 50] [--rtt-ms 25] [--jitter-ms 10]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import firebase_admin  # noqa: E402
+from firebase_admin import firestore  # noqa: E402
+
+ORG = "org-bench"
+
+
+class _Doc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Query:
+    def __init__(self, db, collection, filters=()):
+        self.db = db
+        self.collection = collection
+        self.filters = filters
+
+    def where(self, field, op, value):
+        return _Query(self.db, self.collection, self.filters + ((field, value),))
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def stream(self):
+        self.db.round_trip()
+        docs = self.db.data.get(self.collection, {})
+        return [_Doc(doc_id, data) for doc_id, data in docs.items()
+                if all(data.get(field) == value for field, value in self.filters)]
+
+
+class _DocRef:
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.collection = collection
+        self.doc_id = doc_id
+
+    def get(self):
+        self.db.round_trip()
+        return _Doc(self.doc_id, self.db.data.get(self.collection, {}).get(self.doc_id))
+
+
+class _Collection(_Query):
+    def document(self, doc_id):
+        return _DocRef(self.db, self.collection, doc_id)
+
+
+class _FirestoreStandIn:
+    """Firestore client whose reads each cost one simulated round trip"""
+
+    def __init__(self, rtt_ms: float, jitter_ms: float, seed: int = 7):
+        self.rtt_ms = rtt_ms
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.data = {
+            "users": {"user-1": {"name": "Dana", "role": "Quality Manager", "organizationId": ORG, "department": "qa"}},
+            "departments": {"qa": {"name": "Quality Assurance", "organizationId": ORG}},
+            "projects": {f"p{i}": {"name": f"Project {i}", "organizationId": ORG, "projectLeadId": "user-1"}
+                         for i in range(5)},
+            "documents": {f"d{i}": {"name": {"en": f"Policy {i}"}, "organizationId": ORG, "uploadedBy": "Dana"}
+                          for i in range(10)},
+        }
+
+    def round_trip(self):
+        time.sleep(max(0.0, self.rtt_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loads", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=25.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    stand_in = _FirestoreStandIn(args.rtt_ms, args.jitter_ms)
+    # Skip credential loading; every FirebaseClient gets the stand-in as its db
+    with mock.patch.dict(firebase_admin._apps, {"[DEFAULT]": object()}), \
+            mock.patch.object(firestore, "client", lambda: stand_in):
+        from firebase_client import FirebaseClient
+        clients = {
+            "sequential": FirebaseClient(use_cache=False, parallel_reads=False),
+            "fan-out": FirebaseClient(use_cache=False, parallel_reads=True),
+        }
+
+    stages = ("user_doc", "lead_projects", "department", "recent_documents", "fan_out", "total")
+    print("=" * 84)
+    print(f"USER CONTEXT LOAD: {args.loads} loads, {args.rtt_ms:.0f} ± {args.jitter_ms:.0f} ms per Firestore read")
+    print("=" * 84)
+    print(f"{'mode':>10} | " + " | ".join(f"{stage:>16}" for stage in stages[:3]) + " |")
+    print(f"{'':>10} | " + " | ".join(f"{stage:>16}" for stage in stages[3:]) + " |  (p50 ms)")
+    print("-" * 84)
+    for mode, client in clients.items():
+        for _ in range(args.loads):
+            context = client.get_user_context("user-1", ORG)
+            assert context.get("department_info") and len(context["assigned_projects"]) == 5
+        stats = client.user_context_timings.get_stats()
+        p50 = [stats[stage]["p50_ms"] for stage in stages]
+        print(f"{mode:>10} | " + " | ".join(f"{ms:>16.1f}" for ms in p50[:3]) + " |")
+        print(f"{'':>10} | " + " | ".join(f"{ms:>16.1f}" for ms in p50[3:]) + " |")
+    print("-" * 84)
+    print("Only the user document is a real dependency; fan-out total ~ user_doc + slowest dependent read.")
+
+
+if __name__ == "__main__":
+    main()
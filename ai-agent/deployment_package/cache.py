@@ -1,103 +1,818 @@
 """
 Caching layer for Firebase queries to improve performance
+
+Backends:
+- memory (default): bounded per-process SimpleCache
+- redis: shared across uvicorn workers, selected with CACHE_BACKEND=redis
+  and REDIS_URL (pip install redis)
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable, Tuple, Callable, Protocol
+from collections import OrderedDict
+import heapq
+import logging
+import threading
 import time
 import hashlib
 import json
+import os
+import zlib
+
+try:
+    import redis
+except ImportError:
+    # Optional dependency - only needed for CACHE_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    """Single cached value with its expiry and write-time size"""
+
+    __slots__ = ('value', 'expires_at', 'created_at', 'size', 'tags')
+
+    def __init__(self, value: Any, expires_at: float, created_at: float, size: int, tags: Tuple = ()):
+        self.value = value
+        self.expires_at = expires_at
+        self.created_at = created_at
+        self.size = size
+        self.tags = tags
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate the memory footprint of a cacheable value in bytes
+
+    Sizes are computed once when an entry is written so that stats and
+    budget checks never have to walk the cached values again.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8', errors='ignore'))
+    try:
+        return len(json.dumps(value, default=str, separators=(',', ':')))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class CacheBackend(Protocol):
+    """Interface shared by the in-memory and Redis cache backends"""
+
+    shared: bool
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[Iterable[str]] = None) -> bool: ...
+
+    def invalidate(self, key: str): ...
+
+    def invalidate_tag(self, tag: str): ...
+
+    def invalidate_prefix(self, prefix: str): ...
+
+    def clear(self): ...
+
+    def get_stats(self) -> Dict[str, Any]: ...
+
 
 class SimpleCache:
     """
-    Simple in-memory cache with TTL support
-    For production, consider using Redis
+    Bounded in-memory LRU cache with TTL support
+
+    - Entries are kept in access order so eviction of the least recently
+      used entry is O(1).
+    - Expirations are tracked in a min-heap and swept on writes, so expired
+      entries are reclaimed even if nobody reads them again.
+    - A per-entry and a total byte budget are enforced using sizes that are
+      measured once at write time.
+    - Stats are maintained incrementally and returned in O(1).
+    - Entries can carry tags; invalidating a tag bumps its generation in
+      O(1) and entries written under an older generation read as misses.
+
+    For multi-worker deployments use RedisCacheBackend (CACHE_BACKEND=redis)
     """
-    
-    def __init__(self, default_ttl: int = 300):
+
+    shared = False
+
+    def __init__(
+        self,
+        default_ttl: int = 300,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 1024 * 1024
+    ):
         """
         Initialize cache
-        
+
         Args:
             default_ttl: Default time-to-live in seconds (default: 5 minutes)
+            max_entries: Maximum number of entries kept before LRU eviction
+            max_bytes: Total byte budget across all entries
+            max_entry_bytes: Largest single value accepted into the cache
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
         self.default_ttl = default_ttl
-    
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._expiry_heap: list = []
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self._tag_generations: Dict[str, int] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rejections = 0
+
     def _generate_key(self, prefix: str, data: Dict[str, Any]) -> str:
         """Generate cache key from prefix and data"""
         data_str = json.dumps(data, sort_keys=True)
         hash_obj = hashlib.md5(data_str.encode())
         return f"{prefix}:{hash_obj.hexdigest()}"
-    
+
+    def _remove(self, key: str) -> Optional[_CacheEntry]:
+        """Drop an entry and release its bytes (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+        return entry
+
+    def _purge_expired(self, now: float):
+        """Pop expired entries off the expiry heap (caller holds the lock)"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Stale heap records (overwritten or evicted keys) are skipped
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                self._expirations += 1
+
+        # Rebuild if overwrites left the heap dominated by stale records
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(e.expires_at, k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _evict_for(self, incoming_size: int):
+        """Evict LRU entries until the incoming value fits (caller holds the lock)"""
+        while self._entries and (
+            len(self._entries) >= self.max_entries
+            or self._total_bytes + incoming_size > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.size
+            self._evictions += 1
+
     def get(self, key: str) -> Optional[Any]:
         """
         Get value from cache
-        
+
         Args:
             key: Cache key
-            
+
         Returns:
             Cached value or None if not found or expired
         """
-        if key not in self.cache:
-            return None
-        
-        entry = self.cache[key]
-        
-        # Check if expired
-        if time.time() > entry['expires_at']:
-            del self.cache[key]
-            return None
-        
-        return entry['value']
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            # Check if expired
+            if time.time() > entry.expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            # Entry was written before one of its tags was invalidated
+            if entry.tags and not self._tags_current(entry.tags):
+                self._remove(key)
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[Iterable[str]] = None) -> bool:
         """
         Set value in cache
-        
+
         Args:
             key: Cache key
             value: Value to cache
             ttl: Time-to-live in seconds (optional, uses default if not specified)
+            tags: Optional tags (e.g. "user:123", "collection:projects") for
+                group invalidation via invalidate_tag()
+
+        Returns:
+            True if stored, False if the value exceeds the per-entry budget
         """
-        expires_at = time.time() + (ttl or self.default_ttl)
-        
-        self.cache[key] = {
-            'value': value,
-            'expires_at': expires_at,
-            'created_at': time.time()
-        }
-    
+        size = estimate_size(value)
+        now = time.time()
+        expires_at = now + (ttl or self.default_ttl)
+
+        with self._lock:
+            self._remove(key)
+            if size > self.max_entry_bytes:
+                self._rejections += 1
+                return False
+
+            self._purge_expired(now)
+            self._evict_for(size)
+
+            entry_tags = tuple((tag, self._tag_generations.get(tag, 0)) for tag in tags) if tags else ()
+            self._entries[key] = _CacheEntry(value, expires_at, now, size, entry_tags)
+            self._total_bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            return True
+
     def invalidate(self, key: str):
         """Invalidate cache entry"""
-        if key in self.cache:
-            del self.cache[key]
-    
+        with self._lock:
+            self._remove(key)
+
+    def _tags_current(self, entry_tags: Tuple) -> bool:
+        """Check that none of an entry's tags were invalidated after it was written"""
+        generations = self._tag_generations
+        return all(generations.get(tag, 0) == generation for tag, generation in entry_tags)
+
+    def invalidate_tag(self, tag: str):
+        """
+        Invalidate every entry carrying a tag in O(1)
+
+        Stale entries are not walked; they read as misses and their bytes are
+        reclaimed by LRU eviction or the expiry sweep.
+        """
+        with self._lock:
+            self._tag_generations[tag] = self._tag_generations.get(tag, 0) + 1
+
     def invalidate_prefix(self, prefix: str):
-        """Invalidate all cache entries with given prefix"""
-        keys_to_delete = [k for k in self.cache.keys() if k.startswith(prefix)]
-        for key in keys_to_delete:
-            del self.cache[key]
-    
+        """Invalidate all cache entries with given prefix (O(n), prefer tags)"""
+        with self._lock:
+            keys_to_delete = [k for k in self._entries if k.startswith(prefix)]
+            for key in keys_to_delete:
+                self._remove(key)
+
+    def purge_expired(self):
+        """Reclaim every expired entry now"""
+        with self._lock:
+            self._purge_expired(time.time())
+
     def clear(self):
         """Clear entire cache"""
-        self.cache.clear()
-    
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap = []
+            self._total_bytes = 0
+            self._tag_generations.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return (
+            entry is not None
+            and time.time() <= entry.expires_at
+            and (not entry.tags or self._tags_current(entry.tags))
+        )
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        total_entries = len(self.cache)
-        
-        # Calculate cache size (approximate)
-        total_size = sum(
-            len(str(entry['value']))
-            for entry in self.cache.values()
+        total_size = self._total_bytes
+        lookups = self._hits + self._misses
+
+        return {
+            'total_entries': len(self._entries),
+            'size_bytes': total_size,
+            'size_kb': round(total_size / 1024, 2),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'max_entry_bytes': self.max_entry_bytes,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups * 100, 2) if lookups else 0.0,
+            'evictions': self._evictions,
+            'expirations': self._expirations,
+            'rejected_oversize': self._rejections,
+            'backend': 'memory'
+        }
+
+
+# Values smaller than this are stored as plain JSON; compressing them costs
+# more CPU than it saves on the wire.
+_COMPRESS_MIN_BYTES = 512
+
+
+def encode_value(value: Any) -> bytes:
+    """Serialize a value as compact JSON, zlib-compressed when it pays off"""
+    raw = json.dumps(value, default=str, separators=(',', ':')).encode('utf-8')
+    if len(raw) >= _COMPRESS_MIN_BYTES:
+        return b'z' + zlib.compress(raw, 6)
+    return b'j' + raw
+
+
+def decode_value(blob: bytes) -> Any:
+    """Inverse of encode_value()"""
+    if blob[:1] == b'z':
+        return json.loads(zlib.decompress(blob[1:]))
+    return json.loads(blob[1:])
+
+
+class RedisCacheBackend:
+    """
+    Cache backend stored in Redis so every uvicorn worker shares one cache
+
+    Values are zlib-compressed JSON. Each entry carries the generations of
+    its tags; invalidate_tag() and clear() are a single INCR, and entries
+    written under an older generation read as misses until Redis expires
+    them. The total memory budget is Redis' own maxmemory/allkeys-lru
+    policy; the per-entry budget is enforced here before writing.
+    """
+
+    shared = True
+
+    # Implicit tag on every entry so clear() is O(1)
+    _ALL_TAG = '__all__'
+
+    def __init__(
+        self,
+        client,
+        namespace: str = 'cache',
+        default_ttl: int = 300,
+        max_entry_bytes: int = 1024 * 1024
+    ):
+        """
+        Initialize Redis backend
+
+        Args:
+            client: redis.Redis (or API-compatible, e.g. fakeredis) client
+            namespace: Key prefix isolating this cache from others
+            default_ttl: Default time-to-live in seconds
+            max_entry_bytes: Largest encoded value accepted into the cache
+        """
+        self.client = client
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes
+
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._rejections = 0
+        self._bytes_written = 0
+
+    def _data_key(self, key: str) -> str:
+        return f"{self.namespace}:d:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:t:{tag}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from Redis, or None if missing, expired or invalidated"""
+        try:
+            blob = self.client.get(self._data_key(key))
+            if blob is None:
+                self._misses += 1
+                return None
+
+            envelope = decode_value(blob)
+            tags = envelope.get('t') or {}
+            if tags:
+                current = self.client.mget([self._tag_key(tag) for tag in tags])
+                for (tag, generation), live in zip(tags.items(), current):
+                    if int(live or 0) != generation:
+                        self._misses += 1
+                        return None
+
+            self._hits += 1
+            return envelope.get('v')
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Redis cache get failed for {key}: {e}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[Iterable[str]] = None) -> bool:
+        """Set value in Redis with TTL and tag generations"""
+        try:
+            tag_names = [self._ALL_TAG] + list(tags or ())
+            generations = self.client.mget([self._tag_key(tag) for tag in tag_names])
+            envelope = {
+                'v': value,
+                't': {tag: int(generation or 0) for tag, generation in zip(tag_names, generations)}
+            }
+            blob = encode_value(envelope)
+            if len(blob) > self.max_entry_bytes:
+                self._rejections += 1
+                return False
+
+            self.client.set(self._data_key(key), blob, ex=int(ttl or self.default_ttl))
+            self._bytes_written += len(blob)
+            return True
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Redis cache set failed for {key}: {e}")
+            return False
+
+    def invalidate(self, key: str):
+        """Invalidate cache entry"""
+        try:
+            self.client.delete(self._data_key(key))
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Redis cache invalidate failed for {key}: {e}")
+
+    def invalidate_tag(self, tag: str):
+        """Invalidate every entry carrying a tag in O(1), across all workers"""
+        try:
+            self.client.incr(self._tag_key(tag))
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Redis cache tag invalidation failed for {tag}: {e}")
+
+    def invalidate_prefix(self, prefix: str):
+        """Invalidate all entries with given prefix (SCAN, prefer tags)"""
+        try:
+            pattern = self._data_key(prefix) + '*'
+            keys = list(self.client.scan_iter(match=pattern, count=500))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Redis cache prefix invalidation failed for {prefix}: {e}")
+
+    def clear(self):
+        """Clear this namespace in O(1)"""
+        self.invalidate_tag(self._ALL_TAG)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics for this worker's view of the shared cache"""
+        lookups = self._hits + self._misses
+        return {
+            'backend': 'redis',
+            'namespace': self.namespace,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups * 100, 2) if lookups else 0.0,
+            'bytes_written': self._bytes_written,
+            'rejected_oversize': self._rejections,
+            'errors': self._errors
+        }
+
+
+_redis_client = None
+_redis_retry_at = 0.0
+
+
+def _get_redis_client():
+    """Create (once) the Redis client configured by REDIS_URL"""
+    global _redis_client, _redis_retry_at
+    if _redis_client is None:
+        # Don't pay the connect timeout on every partition while Redis is down
+        if time.time() < _redis_retry_at:
+            raise RuntimeError("Redis marked unavailable, retrying later")
+        _redis_retry_at = time.time() + 60
+        client = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            socket_timeout=float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.25')),
+            socket_connect_timeout=float(os.getenv('REDIS_CONNECT_TIMEOUT', '1.0')),
+            health_check_interval=30
+        )
+        client.ping()
+        _redis_client = client
+    return _redis_client
+
+
+def create_cache_backend(
+    namespace: str,
+    default_ttl: int = 300,
+    max_entries: int = 10000,
+    max_bytes: int = 64 * 1024 * 1024,
+    max_entry_bytes: int = 1024 * 1024,
+    backend: Optional[str] = None,
+    client=None
+) -> CacheBackend:
+    """
+    Build the cache backend selected by the CACHE_BACKEND env var
+
+    Args:
+        namespace: Logical cache name, used as the Redis key prefix
+        default_ttl: Default time-to-live in seconds
+        max_entries: Entry budget (memory backend)
+        max_bytes: Total byte budget (memory backend; Redis uses maxmemory)
+        max_entry_bytes: Largest single value accepted
+        backend: 'memory' or 'redis' (defaults to CACHE_BACKEND, then memory)
+        client: Optional Redis client to use instead of REDIS_URL
+
+    Returns:
+        A CacheBackend; falls back to memory if Redis is unavailable
+    """
+    backend = (backend or os.getenv('CACHE_BACKEND', 'memory')).lower()
+
+    if backend == 'redis':
+        try:
+            if client is None:
+                if redis is None:
+                    raise RuntimeError("redis package not installed")
+                client = _get_redis_client()
+            return RedisCacheBackend(
+                client,
+                namespace=namespace,
+                default_ttl=default_ttl,
+                max_entry_bytes=max_entry_bytes
+            )
+        except Exception as e:
+            logger.warning(f"Redis cache backend unavailable ({e}); using in-memory cache for {namespace}")
+
+    return SimpleCache(
+        default_ttl=default_ttl,
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        max_entry_bytes=max_entry_bytes
+    )
+
+
+class TenantCache:
+    """
+    Firebase query cache partitioned by organization
+
+    Each organization gets its own cache partition with a memory quota, so
+    one large tenant can only evict its own entries. Dropping a whole
+    organization is O(1) (the partition is discarded, or its namespace
+    generation bumped on Redis) and a user or collection inside an
+    organization is invalidated in O(1) through the partition's tag index.
+    """
+
+    def __init__(
+        self,
+        default_ttl: int = 300,
+        partition_quota_bytes: int = 8 * 1024 * 1024,
+        partition_max_entries: int = 2000,
+        max_partitions: int = 1000,
+        backend_factory: Optional[Callable[..., CacheBackend]] = None
+    ):
+        """
+        Initialize tenant cache
+
+        Args:
+            default_ttl: Default time-to-live in seconds
+            partition_quota_bytes: Byte budget for each organization
+            partition_max_entries: Entry budget for each organization
+            max_partitions: Organizations kept before the least recently
+                used partition is dropped
+            backend_factory: Builds a partition (defaults to
+                create_cache_backend, i.e. the CACHE_BACKEND selection)
+        """
+        self.default_ttl = default_ttl
+        self.partition_quota_bytes = partition_quota_bytes
+        self.partition_max_entries = partition_max_entries
+        self.max_partitions = max_partitions
+        self._backend_factory = backend_factory or create_cache_backend
+
+        self._partitions: "OrderedDict[str, CacheBackend]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._dropped_partitions = 0
+
+    @staticmethod
+    def user_tag(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def collection_tag(collection: str) -> str:
+        return f"collection:{collection}"
+
+    def _partition(self, organization_id: str, create: bool = False) -> Optional[CacheBackend]:
+        """Look up (and optionally create) an organization's partition"""
+        with self._lock:
+            partition = self._partitions.get(organization_id)
+            if partition is not None:
+                self._partitions.move_to_end(organization_id)
+                return partition
+            if not create:
+                return None
+
+            while len(self._partitions) >= self.max_partitions:
+                self._partitions.popitem(last=False)
+                self._dropped_partitions += 1
+
+            partition = self._backend_factory(
+                namespace=f"tenant:{organization_id}",
+                default_ttl=self.default_ttl,
+                max_entries=self.partition_max_entries,
+                max_bytes=self.partition_quota_bytes,
+                max_entry_bytes=self.partition_quota_bytes // 4
+            )
+            self._partitions[organization_id] = partition
+            return partition
+
+    def _shared_handle(self, organization_id: str) -> Optional[CacheBackend]:
+        """
+        Handle on an organization's namespace that this worker has not used yet
+
+        Only shared backends need one: another worker may hold entries that
+        must be invalidated. A fresh in-memory partition has nothing to drop.
+        """
+        handle = self._backend_factory(
+            namespace=f"tenant:{organization_id}",
+            default_ttl=self.default_ttl
         )
-        
+        return handle if handle.shared else None
+
+    def get(self, organization_id: str, key: str) -> Optional[Any]:
+        """Get a value from an organization's partition"""
+        partition = self._partition(organization_id, create=True)
+        return partition.get(key)
+
+    def set(
+        self,
+        organization_id: str,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        user_id: Optional[str] = None,
+        collections: Optional[Iterable[str]] = None
+    ) -> bool:
+        """
+        Set a value inside an organization's partition
+
+        Args:
+            organization_id: Tenant that owns the value
+            key: Cache key (unique within the organization)
+            value: Value to cache
+            ttl: Time-to-live in seconds
+            user_id: Tag the entry for invalidate_user()
+            collections: Firestore collections the value was read from, for
+                invalidate_collection()
+        """
+        tags = []
+        if user_id:
+            tags.append(self.user_tag(user_id))
+        for collection in collections or ():
+            tags.append(self.collection_tag(collection))
+        return self._partition(organization_id, create=True).set(key, value, ttl=ttl, tags=tags)
+
+    def invalidate(self, organization_id: str, key: str):
+        """Invalidate a single key inside an organization"""
+        partition = self._partition(organization_id)
+        if partition is not None:
+            partition.invalidate(key)
+
+    def invalidate_org(self, organization_id: str):
+        """Invalidate everything cached for an organization in O(1)"""
+        with self._lock:
+            partition = self._partitions.pop(organization_id, None)
+        if partition is None:
+            partition = self._shared_handle(organization_id)
+        if partition is not None and partition.shared:
+            # Other workers hold their own handle on the shared namespace
+            partition.clear()
+
+    def invalidate_user(self, organization_id: str, user_id: str):
+        """Invalidate every entry tagged with a user in O(1)"""
+        partition = self._partition(organization_id) or self._shared_handle(organization_id)
+        if partition is not None:
+            partition.invalidate_tag(self.user_tag(user_id))
+
+    def invalidate_collection(self, organization_id: str, collection: str):
+        """Invalidate every entry read from a collection in O(1)"""
+        partition = self._partition(organization_id) or self._shared_handle(organization_id)
+        if partition is not None:
+            partition.invalidate_tag(self.collection_tag(collection))
+
+    def clear(self):
+        """Drop every partition"""
+        with self._lock:
+            self._partitions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get aggregate and per-organization statistics"""
+        with self._lock:
+            partitions = list(self._partitions.items())
+
+        per_org = {org_id: partition.get_stats() for org_id, partition in partitions}
+        total_entries = sum(stats.get('total_entries', 0) for stats in per_org.values())
+        total_size = sum(stats.get('size_bytes', 0) for stats in per_org.values())
+        hits = sum(stats['hits'] for stats in per_org.values())
+        misses = sum(stats['misses'] for stats in per_org.values())
+
         return {
+            'partitions': len(per_org),
             'total_entries': total_entries,
             'size_bytes': total_size,
-            'size_kb': round(total_size / 1024, 2)
+            'size_kb': round(total_size / 1024, 2),
+            'partition_quota_bytes': self.partition_quota_bytes,
+            'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0.0,
+            'dropped_partitions': self._dropped_partitions,
+            'by_organization': {
+                org_id: {
+                    'entries': stats.get('total_entries'),
+                    'size_bytes': stats.get('size_bytes'),
+                    'evictions': stats.get('evictions'),
+                    'hit_rate': stats['hit_rate']
+                }
+                for org_id, stats in per_org.items()
+            }
         }
 
 
-# Global cache instance
-cache = SimpleCache(default_ttl=300)  # 5 minutes default
+class NegativeCache:
+    """
+    Short-lived record of lookups that found nothing
+
+    A user without an organizationId or a deleted project id otherwise costs
+    the same Firestore reads on every request. Markers expire quickly and
+    can be dropped explicitly once the missing record is created.
+    """
+
+    _MARKER = 1
+
+    def __init__(self, backend: CacheBackend, default_ttl: int = 60):
+        """
+        Initialize negative cache
+
+        Args:
+            backend: Cache backend holding the markers
+            default_ttl: Seconds a miss is remembered
+        """
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._hits: Dict[str, int] = {}
+        self._stores: Dict[str, int] = {}
+
+    @staticmethod
+    def _key(kind: str, key: str) -> str:
+        return f"{kind}:{key}"
+
+    def is_missing(self, kind: str, key: str) -> bool:
+        """
+        Check whether a lookup is known to find nothing
+
+        Args:
+            kind: Lookup type (e.g. "project", "org_scope")
+            key: Lookup identity within that type
+        """
+        missing = self.backend.get(self._key(kind, key)) is not None
+        if missing:
+            self._hits[kind] = self._hits.get(kind, 0) + 1
+        return missing
+
+    def mark_missing(self, kind: str, key: str, ttl: Optional[int] = None):
+        """Remember that a lookup found nothing"""
+        self.backend.set(
+            self._key(kind, key),
+            self._MARKER,
+            ttl=ttl or self.default_ttl,
+            tags=[f"kind:{kind}"]
+        )
+        self._stores[kind] = self._stores.get(kind, 0) + 1
+
+    def forget(self, kind: str, key: str):
+        """Drop a marker, e.g. after the missing record was created"""
+        self.backend.invalidate(self._key(kind, key))
+
+    def forget_kind(self, kind: str):
+        """Drop every marker of one lookup type"""
+        self.backend.invalidate_tag(f"kind:{kind}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-kind hit (reads avoided) and store counters"""
+        return {
+            'default_ttl': self.default_ttl,
+            'hits': sum(self._hits.values()),
+            'stores': sum(self._stores.values()),
+            'by_kind': {
+                kind: {'hits': self._hits.get(kind, 0), 'stores': self._stores.get(kind, 0)}
+                for kind in sorted(set(self._hits) | set(self._stores))
+            }
+        }
+
+
+# Global cache instance (CACHE_BACKEND=memory|redis)
+cache = create_cache_backend(
+    namespace="cache",
+    default_ttl=300,  # 5 minutes default
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    max_entry_bytes=int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+)
+
+# Organization-partitioned cache for Firebase query results
+tenant_cache = TenantCache(
+    default_ttl=300,
+    partition_quota_bytes=int(os.getenv("CACHE_ORG_QUOTA_BYTES", str(8 * 1024 * 1024))),
+    partition_max_entries=int(os.getenv("CACHE_ORG_MAX_ENTRIES", "2000")),
+    max_partitions=int(os.getenv("CACHE_MAX_ORGS", "1000"))
+)
+
+# Known-missing lookups (users without org scope, nonexistent projects)
+negative_cache = NegativeCache(
+    create_cache_backend(namespace="negative", default_ttl=60, max_entries=20000),
+    default_ttl=int(os.getenv("NEGATIVE_CACHE_TTL", "60"))
+)
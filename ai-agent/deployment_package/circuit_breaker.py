@@ -0,0 +1,135 @@
+"""
+Per-model circuit breaker
+
+Tracks the outcome and latency of recent calls to a model over a rolling
+window. When too many calls fail, or too many are slow, the breaker opens
+and the gateway routes straight to the fallback model instead of paying a
+timeout or a slow response first. After a cooldown one probe call is let
+through (half-open); its outcome closes or re-opens the breaker.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Error-rate and slow-call-rate breaker for one model"""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 50,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_ms: float = 4000.0,
+        slow_call_rate: float = 0.5,
+        cooldown: float = 30.0
+    ):
+        """
+        Initialize breaker
+
+        Args:
+            name: Model name (for metrics)
+            window: Number of recent calls considered
+            min_calls: Calls required in the window before the breaker can open
+            failure_rate: Share of failed calls that opens the breaker
+            slow_call_ms: Latency (time to first token for streams) counted as slow
+            slow_call_rate: Share of slow calls that opens the breaker
+            cooldown: Seconds to stay open before letting a probe through
+        """
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.cooldown = cooldown
+
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to this model now (claims the probe when half-open)"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self._rejected += 1
+        return False
+
+    def record_success(self, latency_ms: Optional[float] = None):
+        """Record a completed call; latency_ms None means latency is not judged"""
+        slow = latency_ms is not None and latency_ms >= self.slow_call_ms
+        if self._state == HALF_OPEN:
+            if slow:
+                self._trip()
+            else:
+                self._reset()
+            return
+        self._calls.append((True, slow))
+        self._evaluate()
+
+    def record_slow(self):
+        """Record a call abandoned for being slow (e.g. it lost a hedge race before its first token)"""
+        self.record_success(self.slow_call_ms)
+
+    def record_failure(self):
+        """Record a failed call (error, timeout or rate limit)"""
+        if self._state == HALF_OPEN:
+            self._trip()
+            return
+        self._calls.append((False, False))
+        self._evaluate()
+
+    def release_probe(self):
+        """Give up a claimed probe without an outcome (e.g. the call was cancelled)"""
+        self._probe_in_flight = False
+
+    def _evaluate(self):
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        slow = sum(1 for ok, is_slow in self._calls if ok and is_slow)
+        if failures / len(self._calls) >= self.failure_rate or slow / len(self._calls) >= self.slow_call_rate:
+            self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._times_opened += 1
+        self._calls.clear()
+
+    def _reset(self):
+        self._state = CLOSED
+        self._probe_in_flight = False
+        self._calls.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """State and window counters"""
+        calls = len(self._calls)
+        return {
+            'state': self.state,
+            'window_calls': calls,
+            'window_failure_rate': round(sum(1 for ok, _ in self._calls if not ok) / calls, 3) if calls else 0.0,
+            'window_slow_rate': round(sum(1 for _, slow in self._calls if slow) / calls, 3) if calls else 0.0,
+            'times_opened': self._times_opened,
+            'rejected_calls': self._rejected
+        }
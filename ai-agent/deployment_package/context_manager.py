@@ -14,9 +14,20 @@ import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from firebase_client import firebase_client
+from async_firebase import firestore_executor
+from cache import create_cache_backend
+from stale_while_revalidate import StaleWhileRevalidate, StalenessPolicy
 
 logger = logging.getLogger(__name__)
 
+# How stale each tier may be served while it refreshes in the background.
+# Minimal context (name/role) rarely changes; full context carries analytics.
+TIER_POLICIES = {
+    'minimal': StalenessPolicy.from_env('context_minimal', fresh_ttl=300, max_stale=900),
+    'standard': StalenessPolicy.from_env('context_standard', fresh_ttl=300, max_stale=600),
+    'full': StalenessPolicy.from_env('context_full', fresh_ttl=300, max_stale=300),
+}
+
 class ContextManager:
     """
     Manages context loading with 3-tier system for token optimization
@@ -24,8 +35,13 @@ class ContextManager:
     
     def __init__(self):
         self.db = firebase_client.db if firebase_client else None
-        self.cache = {}
+        self.analytics = firebase_client.analytics if firebase_client else None
+        self.org_summaries = firebase_client.org_summaries if firebase_client else None
         self.cache_ttl = 300  # 5 minutes
+        # Shared across workers when CACHE_BACKEND=redis
+        self.cache = create_cache_backend(namespace="context", default_ttl=self.cache_ttl, max_entries=5000)
+        # Serves bounded-stale tiers while refreshing; concurrent misses share one load
+        self._swr = StaleWhileRevalidate('context_manager')
     
     def get_context(self, user_id: str, context_tier: str = 'standard', organization_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -50,6 +66,24 @@ class ContextManager:
             logger.warning(f"Unknown context tier: {context_tier}, defaulting to standard")
             return self._get_standard_context(user_id, organization_id)
     
+    async def get_context_async(
+        self,
+        user_id: str,
+        context_tier: str = 'standard',
+        organization_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        get_context on the shared Firestore pool, for callers on the event loop
+        
+        Args:
+            user_id: User identifier
+            context_tier: 'minimal', 'standard', or 'full'
+        
+        Returns:
+            Context dictionary appropriate for the tier
+        """
+        return await firestore_executor.run(self.get_context, user_id, context_tier, organization_id)
+    
     def _get_minimal_context(self, user_id: str, organization_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Minimal context - just user essentials
@@ -59,12 +93,10 @@ class ContextManager:
         if not self.db:
             return {'user_id': user_id, 'tier': 'minimal'}
         
-        # Check cache
-        cache_key = f"minimal_{user_id}_{organization_id or 'auto'}"
-        if self._is_cached(cache_key):
-            logger.info("✅ Using cached minimal context")
-            return self.cache[cache_key]['data']
-        
+        return self._cached_tier('minimal', user_id, organization_id, self._load_minimal_context)
+    
+    def _load_minimal_context(self, user_id: str, organization_id: Optional[str]) -> Dict[str, Any]:
+        """Build minimal context from Firestore (cache-miss and refresh path)"""
         context = {
             'user_id': user_id,
             'tier': 'minimal',
@@ -87,9 +119,6 @@ class ContextManager:
         except Exception as e:
             logger.error(f"Error loading minimal context: {e}")
         
-        # Cache it
-        self._cache_data(cache_key, context)
-        
         logger.info(f"📊 Minimal context size: {len(str(context))} chars (~50 tokens)")
         return context
     
@@ -102,14 +131,13 @@ class ContextManager:
         if not self.db:
             return {'user_id': user_id, 'tier': 'standard'}
         
-        # Check cache
-        cache_key = f"standard_{user_id}_{organization_id or 'auto'}"
-        if self._is_cached(cache_key):
-            logger.info("✅ Using cached standard context")
-            return self.cache[cache_key]['data']
-        
+        return self._cached_tier('standard', user_id, organization_id, self._load_standard_context)
+    
+    def _load_standard_context(self, user_id: str, organization_id: Optional[str]) -> Dict[str, Any]:
+        """Build standard context from Firestore (cache-miss and refresh path)"""
         # Start with minimal context
-        context = self._get_minimal_context(user_id, organization_id)
+        # Copy so the cached minimal context is not mutated (in-memory backend)
+        context = dict(self._get_minimal_context(user_id, organization_id))
         context['tier'] = 'standard'
         
         try:
@@ -155,9 +183,6 @@ class ContextManager:
         except Exception as e:
             logger.error(f"Error loading standard context: {e}")
         
-        # Cache it
-        self._cache_data(cache_key, context)
-        
         logger.info(f"📊 Standard context size: {len(str(context))} chars (~200 tokens)")
         return context
     
@@ -170,14 +195,12 @@ class ContextManager:
         if not self.db:
             return {'user_id': user_id, 'tier': 'full'}
         
-        # Check cache
-        cache_key = f"full_{user_id}_{organization_id or 'auto'}"
-        if self._is_cached(cache_key):
-            logger.info("✅ Using cached full context")
-            return self.cache[cache_key]['data']
-        
+        return self._cached_tier('full', user_id, organization_id, self._load_full_context)
+    
+    def _load_full_context(self, user_id: str, organization_id: Optional[str]) -> Dict[str, Any]:
+        """Build full context from Firestore (cache-miss and refresh path)"""
         # Start with standard context
-        context = self._get_standard_context(user_id, organization_id)
+        context = dict(self._get_standard_context(user_id, organization_id))
         context['tier'] = 'full'
         
         try:
@@ -185,13 +208,11 @@ class ContextManager:
             if not org_id:
                 return context
             
-            # Add all templates (summarized)
-            templates_count = len(list(self.db.collection('templates').where('organizationId', '==', org_id).stream()))
-            context['templates_count'] = templates_count
-            
-            # Add all forms (summarized)
-            forms_count = len(list(self.db.collection('forms').where('organizationId', '==', org_id).stream()))
-            context['forms_count'] = forms_count
+            # Template and form totals (count aggregations)
+            context.update(self.analytics.counts(org_id, {
+                'templates_count': ('templates', None, None),
+                'forms_count': ('forms', None, None)
+            }))
             
             # Add workspace analytics summary
             analytics = self._get_workspace_analytics_summary(org_id)
@@ -206,67 +227,46 @@ class ContextManager:
         except Exception as e:
             logger.error(f"Error loading full context: {e}")
         
-        # Cache it
-        self._cache_data(cache_key, context)
-        
         logger.info(f"📊 Full context size: {len(str(context))} chars (~1000 tokens)")
         return context
     
     def _get_workspace_analytics_summary(self, org_id: str) -> Dict[str, Any]:
         """Get high-level analytics summary"""
         try:
-            # Count projects by status
-            projects_ref = self.db.collection('projects').where('organizationId', '==', org_id)
-            total_projects = len(list(projects_ref.stream()))
-            
-            # Count pending risks
-            risks_ref = self.db.collection('risks').where('organizationId', '==', org_id).where('status', '==', 'open')
-            pending_risks = len(list(risks_ref.stream()))
-            
-            # Count active users
-            users_ref = self.db.collection('users').where('organizationId', '==', org_id)
-            total_users = len(list(users_ref.stream()))
-            
-            return {
-                'total_projects': total_projects,
-                'pending_risks': pending_risks,
-                'total_users': total_users
-            }
+            summary = self.org_summaries.workspace_summary(org_id)
+            if summary is not None:
+                return summary
+            return self.analytics.workspace_summary(org_id)
         except Exception as e:
             logger.error(f"Error getting analytics summary: {e}")
             return {}
     
-    def _is_cached(self, cache_key: str) -> bool:
-        """Check if data is in cache and not expired"""
-        if cache_key not in self.cache:
-            return False
-        
-        cached_time = self.cache[cache_key]['timestamp']
-        age = (datetime.now() - cached_time).total_seconds()
-        
-        if age > self.cache_ttl:
-            # Expired
-            del self.cache[cache_key]
-            return False
+    def _cached_tier(self, tier: str, user_id: str, organization_id: Optional[str], loader) -> Dict[str, Any]:
+        """
+        Serve a context tier fresh or bounded-stale, loading inline only on a hard miss
         
-        return True
-    
-    def _cache_data(self, cache_key: str, data: Dict[str, Any]):
-        """Cache data with timestamp"""
-        self.cache[cache_key] = {
-            'data': data,
-            'timestamp': datetime.now()
-        }
+        Entries are tagged with their user for O(1) invalidation.
+        """
+        cache_key = f"{tier}_{user_id}_{organization_id or 'auto'}"
+        policy = TIER_POLICIES[tier]
+        return self._swr.get_or_load(
+            f"context_{tier}",
+            cache_key,
+            policy,
+            read=lambda: self.cache.get(cache_key),
+            write=lambda envelope: self.cache.set(
+                cache_key, envelope, ttl=policy.storage_ttl, tags=[f"user:{user_id}"]
+            ),
+            loader=lambda: loader(user_id, organization_id)
+        )
     
     def invalidate_cache(self, user_id: str = None):
         """Invalidate cache for specific user or all"""
         if user_id:
-            keys_to_delete = [k for k in self.cache.keys() if user_id in k]
-            for key in keys_to_delete:
-                del self.cache[key]
+            self.cache.invalidate_tag(f"user:{user_id}")
             logger.info(f"🗑️ Invalidated cache for user {user_id}")
         else:
-            self.cache = {}
+            self.cache.clear()
             logger.info("🗑️ Invalidated all cache")
     
     @staticmethod
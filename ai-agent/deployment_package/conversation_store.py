@@ -0,0 +1,477 @@
+"""
+Bounded, persistent conversation store
+
+Hot threads live in an in-process LRU with an idle TTL. Threads that are
+evicted (LRU overflow or idle too long) spill to a durable backend, SQLite
+locally or Firestore in production, and are lazy-loaded on their next turn.
+Messages are compact __slots__ records with interned role strings.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Evicted turns awaiting summarization beyond this are dropped oldest-first
+MAX_PENDING_EVICTED = 40
+
+# Default home of the local SQLite backend (CONVERSATION_DATA_DIR overrides)
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# One shared string object per role instead of one per message
+_ROLES = {role: sys.intern(role) for role in ('system', 'user', 'assistant')}
+
+
+def _intern_role(role: str) -> str:
+    return _ROLES.get(role) or sys.intern(role)
+
+
+def scoped_thread_id(thread_id: str, organization_id: Optional[str] = None, user_id: Optional[str] = None) -> str:
+    """
+    Storage key of a client-supplied thread id
+
+    Namespaced by organization and user, so the same (or a guessed) thread id
+    sent by another tenant never resolves to someone else's history. Callers
+    with neither (trusted in-process use) keep the bare id.
+    """
+    if not organization_id and not user_id:
+        return thread_id
+    return f"{organization_id or ''}:{user_id or ''}:{thread_id}"
+
+
+class Message:
+    """One chat message"""
+
+    __slots__ = ('role', 'content')
+
+    def __init__(self, role: str, content: str):
+        self.role = _intern_role(role)
+        self.content = content
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'role': self.role, 'content': self.content}
+
+
+class ConversationThread:
+    """
+    Message history of one thread (system prompt first when present)
+
+    Turns dropped from the prompt wait in `evicted` until they are folded
+    into the rolling `summary`.
+    """
+
+    __slots__ = ('thread_id', 'messages', 'last_access', 'dirty', 'summary', 'evicted', 'evicted_tokens')
+
+    def __init__(self, thread_id: str, messages: Optional[List[Message]] = None):
+        self.thread_id = thread_id
+        self.messages: List[Message] = messages or []
+        self.last_access = time.time()
+        self.dirty = False
+        self.summary = ''
+        self.evicted: List[Message] = []
+        self.evicted_tokens = 0
+
+    def set_system_prompt(self, content: str):
+        """Insert or replace the leading system message"""
+        if self.messages and self.messages[0].role == 'system':
+            self.messages[0] = Message('system', content)
+        else:
+            self.messages.insert(0, Message('system', content))
+        self.dirty = True
+
+    def append(self, role: str, content: str):
+        self.messages.append(Message(role, content))
+        self.dirty = True
+
+    def evict_history(self, count: int) -> List[Message]:
+        """Move the oldest count non-system messages to the evicted queue"""
+        start = 1 if self.messages and self.messages[0].role == 'system' else 0
+        dropped = self.messages[start:start + count]
+        if dropped:
+            del self.messages[start:start + count]
+            self.evicted.extend(dropped)
+            del self.evicted[:-MAX_PENDING_EVICTED]
+            self.dirty = True
+        return dropped
+
+    def set_summary(self, summary: str, folded: List[Message]):
+        """Replace the rolling summary and drop the evicted turns it now covers"""
+        covered = {id(message) for message in folded}
+        self.summary = summary
+        self.evicted = [message for message in self.evicted if id(message) not in covered]
+        self.dirty = True
+
+    def as_messages(self) -> List[Dict[str, str]]:
+        """Messages in chat-completions format"""
+        return [message.to_dict() for message in self.messages]
+
+    def encode(self) -> bytes:
+        """Compact durable form: zlib-compressed JSON with [role, content] pairs"""
+        payload = {
+            'm': [[message.role, message.content] for message in self.messages],
+            's': self.summary,
+            'e': [[message.role, message.content] for message in self.evicted],
+            't': self.evicted_tokens
+        }
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'), 6)
+
+    @classmethod
+    def decode(cls, thread_id: str, blob: bytes) -> "ConversationThread":
+        payload = json.loads(zlib.decompress(blob))
+        if isinstance(payload, list):
+            # Messages-only records
+            payload = {'m': payload}
+        thread = cls(thread_id, [Message(role, content) for role, content in payload.get('m', [])])
+        thread.summary = payload.get('s', '')
+        thread.evicted = [Message(role, content) for role, content in payload.get('e', [])]
+        thread.evicted_tokens = payload.get('t', 0)
+        return thread
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+
+class ConversationBackend(Protocol):
+    """Durable storage for cold threads"""
+
+    def load(self, thread_id: str) -> Optional[bytes]: ...
+
+    def save(self, thread_id: str, blob: bytes): ...
+
+    def delete(self, thread_id: str): ...
+
+    def purge_older_than(self, cutoff: float) -> int: ...
+
+
+class SQLiteConversationBackend:
+    """Cold-thread storage in a local SQLite file"""
+
+    def __init__(self, path: str = "conversations.db"):
+        """
+        Initialize SQLite backend
+
+        Args:
+            path: Database file (":memory:" for tests)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "thread_id TEXT PRIMARY KEY, payload BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def load(self, thread_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM conversations WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, thread_id: str, blob: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations (thread_id, payload, updated_at) VALUES (?, ?, ?)",
+                (thread_id, blob, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, thread_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    def purge_older_than(self, cutoff: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class FirestoreConversationBackend:
+    """Cold-thread storage in a Firestore collection (one document per thread)"""
+
+    def __init__(self, db, collection: str = "ai_conversations"):
+        """
+        Initialize Firestore backend
+
+        Args:
+            db: Firestore client
+            collection: Collection holding conversation documents
+        """
+        self.db = db
+        self.collection = collection
+
+    def load(self, thread_id: str) -> Optional[bytes]:
+        doc = self.db.collection(self.collection).document(thread_id).get()
+        if not doc.exists:
+            return None
+        return (doc.to_dict() or {}).get('payload')
+
+    def save(self, thread_id: str, blob: bytes):
+        self.db.collection(self.collection).document(thread_id).set({
+            'payload': blob,
+            'updatedAt': time.time()
+        })
+
+    def delete(self, thread_id: str):
+        self.db.collection(self.collection).document(thread_id).delete()
+
+    def purge_older_than(self, cutoff: float) -> int:
+        stale = self.db.collection(self.collection).where('updatedAt', '<', cutoff).limit(500).stream()
+        removed = 0
+        for doc in stale:
+            doc.reference.delete()
+            removed += 1
+        return removed
+
+
+class ConversationStore:
+    """
+    LRU of hot threads with idle expiry and spill to a durable backend
+
+    Supports `thread_id in store`, `len(store)` and `store[thread_id]`
+    (messages as dicts) so it can stand in for the old dict of lists.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[ConversationBackend] = None,
+        max_hot_threads: int = 1000,
+        idle_ttl: int = 1800,
+        retention_seconds: int = 7 * 24 * 3600
+    ):
+        """
+        Initialize conversation store
+
+        Args:
+            backend: Durable storage for cold threads (None: evicted threads are dropped)
+            max_hot_threads: Threads kept in memory
+            idle_ttl: Seconds without a turn before a thread is spilled
+            retention_seconds: Cold threads older than this are purged
+        """
+        self.backend = backend
+        self.max_hot_threads = max_hot_threads
+        self.idle_ttl = idle_ttl
+        self.retention_seconds = retention_seconds
+        self._hot: "OrderedDict[str, ConversationThread]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_purge = time.time()
+
+        self._hot_hits = 0
+        self._cold_loads = 0
+        self._created = 0
+        self._spilled = 0
+        self._idle_expired = 0
+        self._spill_errors = 0
+
+    def _spill(self, thread: ConversationThread):
+        if self.backend is None or not thread.dirty or not thread.messages:
+            return
+        try:
+            self.backend.save(thread.thread_id, thread.encode())
+            thread.dirty = False
+            self._spilled += 1
+        except Exception as e:
+            self._spill_errors += 1
+            logger.warning(f"Failed to spill conversation {thread.thread_id}: {e}")
+
+    def _evict_idle(self, now: float):
+        """Spill threads idle past the TTL (oldest first, stops at the first active one)"""
+        while self._hot:
+            thread_id, thread = next(iter(self._hot.items()))
+            if now - thread.last_access < self.idle_ttl:
+                break
+            self._hot.popitem(last=False)
+            self._idle_expired += 1
+            self._spill(thread)
+
+    def _evict_overflow(self):
+        while len(self._hot) > self.max_hot_threads:
+            _, thread = self._hot.popitem(last=False)
+            self._spill(thread)
+
+    def _maybe_purge(self, now: float):
+        if self.backend is None or now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        try:
+            removed = self.backend.purge_older_than(now - self.retention_seconds)
+            if removed:
+                logger.info(f"🗑️ Purged {removed} expired conversations")
+        except Exception as e:
+            logger.warning(f"Conversation purge failed: {e}")
+
+    def _load_cold(self, thread_id: str) -> Optional[ConversationThread]:
+        if self.backend is None:
+            return None
+        try:
+            blob = self.backend.load(thread_id)
+        except Exception as e:
+            logger.warning(f"Failed to load conversation {thread_id}: {e}")
+            return None
+        if blob is None:
+            return None
+        self._cold_loads += 1
+        return ConversationThread.decode(thread_id, blob)
+
+    def get_hot(self, thread_id: str) -> Optional[ConversationThread]:
+        """Return a thread only if it is in memory (never touches the backend)"""
+        with self._lock:
+            thread = self._hot.get(thread_id)
+            if thread is not None:
+                self._hot.move_to_end(thread_id)
+                thread.last_access = time.time()
+                self._hot_hits += 1
+            return thread
+
+    def get_or_create(self, thread_id: str) -> ConversationThread:
+        """
+        Return a thread, lazy-loading it from the backend or creating it
+
+        Args:
+            thread_id: Conversation identifier
+
+        Returns:
+            The thread, now the most recently used
+        """
+        thread = self.get_hot(thread_id)
+        if thread is not None:
+            return thread
+
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            thread = self._hot.get(thread_id) or self._load_cold(thread_id)
+            if thread is None:
+                thread = ConversationThread(thread_id)
+                self._created += 1
+            thread.last_access = now
+            self._hot[thread_id] = thread
+            self._hot.move_to_end(thread_id)
+            self._evict_overflow()
+            self._maybe_purge(now)
+            return thread
+
+    async def aget_or_create(self, thread_id: str) -> ConversationThread:
+        """get_or_create() that keeps backend I/O (cold load, spills) off the event loop"""
+        thread = self.get_hot(thread_id)
+        if thread is not None:
+            return thread
+        return await asyncio.to_thread(self.get_or_create, thread_id)
+
+    def commit(self, thread: ConversationThread):
+        """
+        End a turn: keep the thread hot even if it was evicted mid-turn
+
+        Without this, appends made after a concurrent eviction would only
+        live on an object the store no longer references.
+        """
+        with self._lock:
+            thread.last_access = time.time()
+            if self._hot.get(thread.thread_id) is not thread:
+                self._hot[thread.thread_id] = thread
+                self._evict_overflow()
+            self._hot.move_to_end(thread.thread_id)
+
+    async def acommit(self, thread: ConversationThread):
+        """commit() that keeps spills of overflowing threads (and waits on the store lock) off the event loop"""
+        await asyncio.to_thread(self.commit, thread)
+
+    def delete(self, thread_id: str):
+        """Forget a thread everywhere"""
+        with self._lock:
+            self._hot.pop(thread_id, None)
+        if self.backend is not None:
+            self.backend.delete(thread_id)
+
+    def flush(self):
+        """Persist every dirty hot thread (call on shutdown)"""
+        with self._lock:
+            threads = list(self._hot.values())
+        for thread in threads:
+            self._spill(thread)
+
+    def __contains__(self, thread_id: str) -> bool:
+        with self._lock:
+            if thread_id in self._hot:
+                return True
+        return self.backend is not None and self.backend.load(thread_id) is not None
+
+    def __getitem__(self, thread_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            thread = self._hot.get(thread_id)
+        if thread is None:
+            thread = self._load_cold(thread_id)
+        if thread is None:
+            raise KeyError(thread_id)
+        return thread.as_messages()
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._hot))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hot-set size and load/spill counters"""
+        with self._lock:
+            hot_messages = sum(len(thread) for thread in self._hot.values())
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hot_threads': len(self._hot),
+            'hot_messages': hot_messages,
+            'max_hot_threads': self.max_hot_threads,
+            'idle_ttl': self.idle_ttl,
+            'hot_hits': self._hot_hits,
+            'cold_loads': self._cold_loads,
+            'created': self._created,
+            'spilled': self._spilled,
+            'idle_expired': self._idle_expired,
+            'spill_errors': self._spill_errors
+        }
+
+
+def create_conversation_store(db=None) -> ConversationStore:
+    """
+    Build the conversation store from environment settings
+
+    CONVERSATION_BACKEND=sqlite (default, CONVERSATION_DB_PATH, else
+    conversations.db in CONVERSATION_DATA_DIR), firestore (uses db) or memory
+    (no persistence).
+    """
+    kind = os.getenv("CONVERSATION_BACKEND", "sqlite").lower()
+    backend: Optional[ConversationBackend] = None
+    try:
+        if kind == "firestore" and db is not None:
+            backend = FirestoreConversationBackend(db, os.getenv("CONVERSATION_COLLECTION", "ai_conversations"))
+        elif kind == "sqlite":
+            path = os.getenv("CONVERSATION_DB_PATH")
+            if not path:
+                # Never the working directory: the database and its -wal/-shm files go in a data dir
+                data_dir = os.getenv("CONVERSATION_DATA_DIR", DEFAULT_DATA_DIR)
+                os.makedirs(data_dir, exist_ok=True)
+                path = os.path.join(data_dir, "conversations.db")
+            backend = SQLiteConversationBackend(path)
+    except Exception as e:
+        logger.warning(f"⚠️ Conversation backend '{kind}' unavailable, keeping threads in memory only: {e}")
+        backend = None
+
+    return ConversationStore(
+        backend=backend,
+        max_hot_threads=int(os.getenv("CONVERSATION_MAX_HOT_THREADS", "1000")),
+        idle_ttl=int(os.getenv("CONVERSATION_IDLE_TTL", "1800")),
+        retention_seconds=int(os.getenv("CONVERSATION_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    )
@@ -0,0 +1,102 @@
+"""
+Concurrent fan-out of independent blocking reads
+
+A Firestore loader usually has one root read (the user document) followed by
+several reads that only depend on the root, not on each other. Run one after
+another, their round trips add up. fan_out runs such a group concurrently on a
+dedicated thread pool and records how long each read took, so loaders can
+report per-stage timings.
+
+The pool is separate from async_firebase's FirestoreExecutor on purpose. Loaders
+already run on that bounded pool, and waiting there for work queued on the same
+pool could deadlock once every worker is a waiting loader.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+import os
+import threading
+import time
+
+from monitoring import percentile
+
+_SAMPLE_WINDOW = 500
+
+
+class StageTimings:
+    """Rolling per-stage latency of a multi-read loader"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings: Dict[str, float]):
+        """Add one load's {stage: milliseconds}"""
+        with self._lock:
+            for stage, ms in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=_SAMPLE_WINDOW)).append(ms)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95 milliseconds and sample count per stage"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': len(samples),
+                    'p50_ms': percentile(samples, 0.5, ndigits=2),
+                    'p95_ms': percentile(samples, 0.95, ndigits=2)
+                }
+                for stage, samples in self._samples.items()
+            }
+
+
+def fan_out(
+    reads: Dict[str, Callable[[], Any]],
+    executor: Optional[ThreadPoolExecutor] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Run independent reads concurrently and collect their results
+
+    Args:
+        reads: {stage name: blocking read}
+        executor: Pool to run on; None runs the reads inline, in order
+        timings: Filled with {stage name: milliseconds}
+
+    Returns:
+        {stage name: result}
+
+    Raises:
+        The first read's exception (in `reads` order) once every read has finished
+    """
+    timings = timings if timings is not None else {}
+
+    def timed(name: str, read: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return read()
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    if executor is None or len(reads) < 2:
+        return {name: timed(name, read) for name, read in reads.items()}
+
+    futures = {name: executor.submit(timed, name, read) for name, read in reads.items()}
+    wait(futures.values())
+    return {name: future.result() for name, future in futures.items()}
+
+
+_fan_out_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_fan_out_executor() -> ThreadPoolExecutor:
+    """Process-wide fan-out pool (FIRESTORE_FANOUT_THREADS, default 16)"""
+    global _fan_out_executor
+    with _executor_lock:
+        if _fan_out_executor is None:
+            _fan_out_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("FIRESTORE_FANOUT_THREADS", "16")),
+                thread_name_prefix="firestore-fanout"
+            )
+        return _fan_out_executor
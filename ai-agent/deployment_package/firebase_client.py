@@ -11,26 +11,54 @@ from firebase_admin import credentials, firestore
 from typing import Dict, List, Any, Optional
 import os
 import json
+import time
 from datetime import datetime, timedelta
 
+from fetch_plan import StageTimings, fan_out, get_fan_out_executor
+from analytics_engine import AnalyticsEngine
+from org_summary_service import create_org_summary_service
+
 # Import caching and monitoring
 try:
-    from cache import cache
+    from cache import cache, tenant_cache, negative_cache
     from monitoring import performance_monitor
+    from singleflight import SingleFlight
+    from stale_while_revalidate import StaleWhileRevalidate, StalenessPolicy
 except ImportError:
     # Fallback if modules not available
     cache = None
+    tenant_cache = None
+    negative_cache = None
     performance_monitor = None
+    SingleFlight = None
+    StaleWhileRevalidate = None
+    StalenessPolicy = None
+
+USER_CONTEXT_COLLECTIONS = ('users', 'projects', 'departments', 'documents')
+ANALYTICS_COLLECTIONS = ('projects', 'risks', 'departments', 'users')
+
+# Staleness bounds per call site: (fresh seconds, extra seconds a stale value may be served)
+if StalenessPolicy:
+    USER_CONTEXT_POLICY = StalenessPolicy.from_env('user_context', fresh_ttl=180, max_stale=600)
+    WORKSPACE_ANALYTICS_POLICY = StalenessPolicy.from_env('workspace_analytics', fresh_ttl=120, max_stale=900)
 
 class FirebaseClient:
-    def __init__(self, use_cache: bool = True):
+    def __init__(self, use_cache: bool = True, parallel_reads: bool = True):
         """
         Initialize Firebase Admin SDK
         
         Args:
             use_cache: Enable caching for Firebase queries (default: True)
+            parallel_reads: Run a loader's independent reads concurrently (default: True)
         """
-        self.use_cache = use_cache and cache is not None
+        self.use_cache = use_cache and tenant_cache is not None
+        # Concurrent cache misses for the same key share one Firestore load
+        self._flights = SingleFlight('firebase_client') if SingleFlight else None
+        # Stale entries are served while a background task refreshes them
+        self._swr = StaleWhileRevalidate('firebase_client') if StaleWhileRevalidate else None
+        # Reads that only depend on the user document run concurrently
+        self._fan_out_executor = get_fan_out_executor() if parallel_reads else None
+        self.user_context_timings = StageTimings('user_context')
         
         # Use service account from environment or file
         if not firebase_admin._apps:
@@ -56,6 +84,9 @@ class FirebaseClient:
                 firebase_admin.initialize_app()
         
         self.db = firestore.client()
+        self.analytics = AnalyticsEngine(self.db, executor=self._fan_out_executor)
+        # Materialized org_summaries/{orgId} counts (ORG_SUMMARY_MODE)
+        self.org_summaries = create_org_summary_service(self.db)
 
     def _resolve_org_id(self, user_data: Dict[str, Any], organization_id: Optional[str]) -> Optional[str]:
         """Resolve and validate organization scope for tenant-safe queries."""
@@ -64,34 +95,142 @@ class FirebaseClient:
             return None
         return organization_id or user_org
 
+    @staticmethod
+    def _user_context_key(user_id: str, organization_id: str) -> str:
+        return f"user_context:{organization_id}:{user_id}"
+
+    def _single_flight(self, key: str, loader):
+        """Run loader once for all concurrent callers of the same key"""
+        if self._flights is None:
+            return loader()
+        return self._flights.do(key, loader)
+
+    def _swr_cached(
+        self,
+        namespace: str,
+        organization_id: str,
+        key: str,
+        policy: "StalenessPolicy",
+        loader,
+        user_id: Optional[str] = None,
+        collections=()
+    ):
+        """Stale-while-revalidate read through the organization's cache partition"""
+        if not self.use_cache or self._swr is None:
+            return self._single_flight(key, loader)
+
+        def read():
+            envelope = tenant_cache.get(organization_id, key)
+            if performance_monitor:
+                if envelope:
+                    performance_monitor.track_cache_hit(key)
+                else:
+                    performance_monitor.track_cache_miss(key)
+            return envelope
+
+        def write(envelope):
+            tenant_cache.set(
+                organization_id,
+                key,
+                envelope,
+                ttl=policy.storage_ttl,
+                user_id=user_id,
+                collections=collections
+            )
+
+        return self._swr.get_or_load(namespace, key, policy, read, write, loader)
+
+    def invalidate_user_cache(self, organization_id: str, user_id: str):
+        """Drop every cached entry tagged with a user inside an organization"""
+        if self.use_cache:
+            tenant_cache.invalidate_user(organization_id, user_id)
+
+    def invalidate_collection_cache(self, organization_id: str, collection: str):
+        """Drop every cached entry read from a collection inside an organization"""
+        if self.use_cache:
+            tenant_cache.invalidate_collection(organization_id, collection)
+
+    def _known_missing(self, kind: str, key: str) -> bool:
+        """Whether a recent lookup for this key found nothing"""
+        if not self.use_cache or negative_cache is None:
+            return False
+        if negative_cache.is_missing(kind, key):
+            if performance_monitor:
+                performance_monitor.track_negative_cache_hit(kind, key)
+            return True
+        return False
+
+    def _mark_missing(self, kind: str, key: str):
+        if self.use_cache and negative_cache is not None:
+            negative_cache.mark_missing(kind, key)
+
+    def invalidate_missing_project(self, organization_id: str, project_id: str):
+        """Forget a cached "project not found" (call after creating the project)"""
+        if negative_cache is not None:
+            negative_cache.forget('project', f"{organization_id}:{project_id}")
+
+    def invalidate_missing_org_scope(self, user_id: str):
+        """Forget a cached "no organizationId" for a user (call after assigning one)"""
+        if negative_cache is not None:
+            negative_cache.forget('org_scope', user_id)
+
+    def invalidate_organization_cache(self, organization_id: str):
+        """Drop everything cached for an organization"""
+        if self.use_cache:
+            tenant_cache.invalidate_org(organization_id)
+
     def get_user_context(self, user_id: str, organization_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get comprehensive user context from Firebase with caching
         
         Args:
             user_id: User's Firebase document ID
+            organization_id: Tenant scope; results are cached in this
+                organization's partition
             
         Returns:
             Dictionary with user data, projects, permissions, etc.
         """
-        # Check cache first
-        if self.use_cache:
-            cache_key = f"user_context:{user_id}"
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                if performance_monitor:
-                    performance_monitor.track_cache_hit(cache_key)
-                return cached_data
-            if performance_monitor:
-                performance_monitor.track_cache_miss(cache_key)
-        
+        if organization_id:
+            return self._swr_cached(
+                'user_context',
+                organization_id,
+                self._user_context_key(user_id, organization_id),
+                USER_CONTEXT_POLICY,
+                lambda: self._load_user_context(user_id, organization_id),
+                user_id=user_id,
+                collections=USER_CONTEXT_COLLECTIONS
+            )
+
+        # Tenant unknown up front: load, then cache under the resolved organization
+        result = self._single_flight(
+            self._user_context_key(user_id, 'auto'),
+            lambda: self._load_user_context(user_id, None)
+        )
+        resolved_org = (result.get('user_data') or {}).get('organizationId')
+        if self.use_cache and self._swr is not None and resolved_org:
+            tenant_cache.set(
+                resolved_org,
+                self._user_context_key(user_id, resolved_org),
+                self._swr.wrap(result, USER_CONTEXT_POLICY),
+                ttl=USER_CONTEXT_POLICY.storage_ttl,
+                user_id=user_id,
+                collections=USER_CONTEXT_COLLECTIONS
+            )
+        return result
+
+    def _load_user_context(self, user_id: str, organization_id: Optional[str] = None) -> Dict[str, Any]:
+        """Read user context from Firestore (cache-miss and background refresh path)"""
         try:
             if performance_monitor:
                 performance_monitor.track_firebase_query('users', 'get_document')
             
-            # Get user document
-            user_ref = self.db.collection('users').document(user_id)
-            user_doc = user_ref.get()
+            timings: Dict[str, float] = {}
+            started = time.perf_counter()
+
+            # Stage 1: the user document (everything else depends on it)
+            user_doc = self.db.collection('users').document(user_id).get()
+            timings['user_doc'] = round((time.perf_counter() - started) * 1000, 2)
             
             if not user_doc.exists:
                 return {
@@ -106,36 +245,57 @@ class FirebaseClient:
                     'error': 'Organization scope mismatch or missing organizationId',
                     'user_data': None
                 }
-            
-            # Get user's projects (as lead) within the same organization
-            projects_as_lead = self.db.collection('projects')\
-                .where('organizationId', '==', org_id)\
-                .where('projectLeadId', '==', user_id)\
-                .limit(50)\
-                .stream()
-            
-            lead_projects = [p.to_dict() for p in projects_as_lead]
-            
-            # Get user's department
-            department = None
-            if user_data.get('department'):
+
+            def read_lead_projects():
+                # User's projects (as lead) within the same organization
+                projects_as_lead = self.db.collection('projects')\
+                    .where('organizationId', '==', org_id)\
+                    .where('projectLeadId', '==', user_id)\
+                    .limit(50)\
+                    .stream()
+                return [p.to_dict() for p in projects_as_lead]
+
+            def read_department():
+                if not user_data.get('department'):
+                    return None
                 dept_doc = self.db.collection('departments')\
                     .document(user_data['department'])\
                     .get()
                 if dept_doc.exists:
                     dept_data = dept_doc.to_dict()
                     if dept_data.get('organizationId') == org_id:
-                        department = dept_data
-            
-            # Get user's recent documents inside their organization
-            recent_docs = self.db.collection('documents')\
-                .where('organizationId', '==', org_id)\
-                .where('uploadedBy', '==', user_data.get('name', ''))\
-                .order_by('uploadedAt', direction=firestore.Query.DESCENDING)\
-                .limit(10)\
-                .stream()
-            
-            documents = [doc.to_dict() for doc in recent_docs]
+                        return dept_data
+                return None
+
+            def read_recent_documents():
+                # User's recent documents inside their organization
+                recent_docs = self.db.collection('documents')\
+                    .where('organizationId', '==', org_id)\
+                    .where('uploadedBy', '==', user_data.get('name', ''))\
+                    .order_by('uploadedAt', direction=firestore.Query.DESCENDING)\
+                    .limit(10)\
+                    .stream()
+                return [doc.to_dict() for doc in recent_docs]
+
+            # Stage 2: the reads that only need the user document, concurrently
+            fan_out_started = time.perf_counter()
+            reads = fan_out(
+                {
+                    'lead_projects': read_lead_projects,
+                    'department': read_department,
+                    'recent_documents': read_recent_documents
+                },
+                executor=self._fan_out_executor,
+                timings=timings
+            )
+            lead_projects = reads['lead_projects']
+            department = reads['department']
+            documents = reads['recent_documents']
+            timings['fan_out'] = round((time.perf_counter() - fan_out_started) * 1000, 2)
+            timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+            self.user_context_timings.record(timings)
+            if performance_monitor:
+                performance_monitor.log_debug("user_context_loaded", user_id=user_id, **timings)
             
             result = {
                 'user_data': {
@@ -168,10 +328,6 @@ class FirebaseClient:
                 ]
             }
             
-            # Cache the result
-            if self.use_cache:
-                cache.set(f"user_context:{user_id}", result, ttl=180)  # 3 minutes
-            
             return result
             
         except Exception as e:
@@ -193,15 +349,22 @@ class FirebaseClient:
         Returns:
             Project data with checklist, CAPAs, surveys, etc.
         """
+        negative_key = f"{organization_id}:{project_id}"
+        if self._known_missing('project', negative_key):
+            return None
+        
         try:
             project_ref = self.db.collection('projects').document(project_id)
             project_doc = project_ref.get()
             
             if not project_doc.exists:
+                self._mark_missing('project', negative_key)
                 return None
             
             project_data = project_doc.to_dict()
             if project_data.get('organizationId') != organization_id:
+                # Out-of-tenant ids look missing to this organization
+                self._mark_missing('project', negative_key)
                 return None
             
             # Calculate compliance statistics
@@ -243,45 +406,26 @@ class FirebaseClient:
         Returns:
             Aggregate statistics across all projects, users, departments
         """
-        try:
-            # Get all projects in organization scope
-            projects = list(self.db.collection('projects').where('organizationId', '==', organization_id).stream())
-            
-            # Get all risks in organization scope
-            risks = list(self.db.collection('risks').where('organizationId', '==', organization_id).stream())
-            
-            # Get all departments in organization scope
-            departments = list(self.db.collection('departments').where('organizationId', '==', organization_id).stream())
+        if self.org_summaries.live:
+            # Listener-maintained counts in memory are fresher than any cache entry
+            return self.org_summaries.workspace_analytics(organization_id)
+        return self._swr_cached(
+            'workspace_analytics',
+            organization_id,
+            f"workspace_analytics:{organization_id}",
+            WORKSPACE_ANALYTICS_POLICY,
+            lambda: self._load_workspace_analytics(organization_id),
+            collections=ANALYTICS_COLLECTIONS
+        )
 
-            # Get all users in organization scope
-            users = list(self.db.collection('users').where('organizationId', '==', organization_id).stream())
-            
-            # Calculate statistics
-            total_projects = len(projects)
-            active_projects = len([p for p in projects if p.to_dict().get('status') == 'In Progress'])
-            
-            high_risks = len([r for r in risks if r.to_dict().get('level') == 'High'])
-            critical_risks = len([r for r in risks if r.to_dict().get('level') == 'Critical'])
-            
-            return {
-                'projects': {
-                    'total': total_projects,
-                    'active': active_projects,
-                    'completed': len([p for p in projects if p.to_dict().get('status') == 'Completed']),
-                    'on_hold': len([p for p in projects if p.to_dict().get('status') == 'On Hold'])
-                },
-                'risks': {
-                    'total': len(risks),
-                    'high': high_risks,
-                    'critical': critical_risks
-                },
-                'departments': {
-                    'total': len(departments)
-                },
-                'users': {
-                    'total': len(users)
-                }
-            }
+    def _load_workspace_analytics(self, organization_id: str) -> Dict[str, Any]:
+        """Compute workspace analytics from Firestore"""
+        try:
+            # One summary document when materialized, else count() aggregations per status / level
+            analytics = self.org_summaries.workspace_analytics(organization_id)
+            if analytics is not None:
+                return analytics
+            return self.analytics.workspace_analytics(organization_id)
             
         except Exception as e:
             print(f"❌ Error fetching analytics: {e}")
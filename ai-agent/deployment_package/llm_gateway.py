@@ -0,0 +1,617 @@
+"""
+Shared LLM gateway
+
+Single entry point for chat completions. It owns one pooled httpx client
+shared by the unified agent and every specialist, bounds each attempt with
+a timeout and each call with an overall deadline, retries transient errors
+with exponential backoff (honoring Retry-After), falls back to the secondary
+model on rate limits, and records per-call metrics: time to first token,
+tokens/sec and prompt/completion tokens.
+"""
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import time
+from types import SimpleNamespace
+
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError
+
+from circuit_breaker import HALF_OPEN, CircuitBreaker
+from llm_scheduler import Grant, LLMScheduler, SchedulerTimeout, create_llm_scheduler
+from monitoring import percentile, performance_monitor
+from prompt_registry import prompt_registry
+from stream_metrics import current_observation
+from token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+FALLBACK_MODEL = "llama-3.1-8b-instant"
+
+# Latency samples kept per model for percentiles
+_SAMPLE_WINDOW = 500
+
+# Adaptive hedging uses the model's TTFT p95 once this many samples exist
+_HEDGE_MIN_SAMPLES = 20
+_HEDGE_DEFAULT_MS = 2000.0
+
+
+class LLMDeadlineExceeded(Exception):
+    """The call's overall deadline passed before a response arrived"""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether an API error is a 429 / rate-limit rejection"""
+    if _status_code(error) == 429:
+        return True
+    text = str(error).lower()
+    return '429' in text or 'rate_limit' in text or 'rate limit' in text
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an API error is worth retrying on the same model"""
+    if isinstance(error, (APITimeoutError, APIConnectionError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    status = _status_code(error)
+    return status is not None and status >= 500
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested wait from Retry-After / retry-after-ms headers, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        # HTTP-date form is not used by Groq; fall back to computed backoff
+        return None
+    return None
+
+
+def _chunk_usage(chunk) -> Optional[Any]:
+    """Token usage carried by a stream chunk (OpenAI 'usage' or Groq's final 'x_groq.usage')"""
+    usage = getattr(chunk, 'usage', None)
+    if usage is None:
+        extra = getattr(chunk, 'x_groq', None)
+        usage = extra.get('usage') if isinstance(extra, dict) else getattr(extra, 'usage', None)
+    if isinstance(usage, dict):
+        return SimpleNamespace(**usage)
+    return usage
+
+
+# Model that answered the latest gateway call made in this context (after fallback or hedging)
+_served_model: ContextVar[Optional[str]] = ContextVar('llm_served_model', default=None)
+
+
+def last_served_model() -> Optional[str]:
+    """Model that served the most recent successful create() in this task, None if it failed"""
+    return _served_model.get()
+
+
+class _ModelStats:
+    """Rolling per-model call metrics"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.ttft_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.tokens_per_sec: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'fallbacks_to': self.fallbacks,
+            'hedges_to': self.hedges,
+            'hedges_won': self.hedges_won,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'latency_ms_p50': percentile(self.latency_ms, 0.5),
+            'latency_ms_p95': percentile(self.latency_ms, 0.95),
+            'ttft_ms_p50': percentile(self.ttft_ms, 0.5),
+            'ttft_ms_p95': percentile(self.ttft_ms, 0.95),
+            'tokens_per_sec_p50': percentile(self.tokens_per_sec, 0.5)
+        }
+
+
+@dataclass
+class _Opened:
+    """A started call: the completion, or a stream with its first content chunk already read"""
+    model: str
+    response: Any
+    grant: Optional[Grant]
+    started: float
+    prefetched: List[Any] = field(default_factory=list)
+    first_token_at: Optional[float] = None
+    iterator: Any = None
+
+
+async def _close_stream(response):
+    close = getattr(response, 'close', None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        logger.debug(f"Closing abandoned stream failed: {e}")
+
+
+class _MeteredStream:
+    """
+    Pass-through async iterator over stream chunks that records TTFT and throughput
+
+    Callers must iterate it to the end (or close it): the scheduler slot is
+    released when iteration finishes.
+    """
+
+    def __init__(self, opened: _Opened, gateway: 'LLMGateway', prompt_tokens: int, started: float):
+        self._opened = opened
+        self._gateway = gateway
+        self._prompt_tokens = prompt_tokens
+        self._started = started
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        opened = self._opened
+        first_token_at = opened.first_token_at
+        parts: List[str] = []
+        usage = None
+        exhausted = False
+        observation = current_observation()
+        if observation is not None and first_token_at is not None:
+            observation.on_upstream_first_token(opened.model, first_token_at)
+
+        def observe(chunk):
+            nonlocal usage
+            usage = _chunk_usage(chunk) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+
+        try:
+            for chunk in opened.prefetched:
+                observe(chunk)
+                yield chunk
+            if opened.iterator is not None:
+                async for chunk in opened.iterator:
+                    observe(chunk)
+                    yield chunk
+            exhausted = True
+        finally:
+            if not exhausted:
+                await _close_stream(opened.response)
+            finished = time.perf_counter()
+            prompt_tokens = getattr(usage, 'prompt_tokens', None) or self._prompt_tokens
+            completion_tokens = getattr(usage, 'completion_tokens', None) or estimate_tokens(''.join(parts))
+            self._gateway._record(
+                opened.model,
+                opened.grant,
+                latency=finished - self._started,
+                ttft=(first_token_at - self._started) if first_token_at else None,
+                generation_seconds=(finished - first_token_at) if first_token_at else None,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens
+            )
+            if observation is not None:
+                observation.on_upstream_done(opened.model, prompt_tokens, completion_tokens, usage is not None)
+
+
+class LLMGateway:
+    """Chat completions with timeouts, deadlines, backoff, fallback, circuit breaking, hedging and metrics"""
+
+    def __init__(
+        self,
+        client,
+        fallback_model: str = FALLBACK_MODEL,
+        timeout: float = 30.0,
+        deadline: float = 90.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        scheduler: Optional[LLMScheduler] = None,
+        breaker_settings: Optional[Dict[str, Any]] = None,
+        hedge: bool = False,
+        hedge_after_ms: Optional[float] = None
+    ):
+        """
+        Initialize gateway
+
+        Args:
+            client: AsyncOpenAI-compatible client (its own retries should be disabled)
+            fallback_model: Model used when the requested one is rate limited or degraded
+            timeout: Seconds allowed per attempt
+            deadline: Seconds allowed per call across all attempts and backoff
+            max_retries: Retries after the first attempt (fallback switches not counted)
+            backoff_base: First backoff delay in seconds, doubled per retry
+            backoff_max: Cap on a single backoff delay
+            scheduler: Admission scheduler each attempt waits on (None admits immediately)
+            breaker_settings: CircuitBreaker keyword arguments applied to every model
+            hedge: Race the fallback model when a stream's first token is late
+            hedge_after_ms: First-token delay before hedging (None: the model's observed p95)
+        """
+        self.client = client
+        self.fallback_model = fallback_model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.scheduler = scheduler
+        self.breaker_settings = breaker_settings or {}
+        self.hedge = hedge
+        self.hedge_after_ms = hedge_after_ms
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, _ModelStats] = {}
+
+    def _model_stats(self, model: str) -> _ModelStats:
+        if model not in self._stats:
+            self._stats[model] = _ModelStats()
+        return self._stats[model]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """Circuit breaker for a model"""
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, **self.breaker_settings)
+        return self._breakers[model]
+
+    def _record(self, model: str, grant: Optional[Grant], latency: float, ttft: Optional[float],
+                generation_seconds: Optional[float], prompt_tokens: int, completion_tokens: int):
+        if grant is not None:
+            self.scheduler.release(grant, used_tokens=prompt_tokens + completion_tokens)
+        stats = self._model_stats(model)
+        stats.calls += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.latency_ms.append(latency * 1000)
+        if ttft is not None:
+            stats.ttft_ms.append(ttft * 1000)
+        if generation_seconds and completion_tokens:
+            stats.tokens_per_sec.append(completion_tokens / generation_seconds)
+        performance_monitor.track_groq_api_call(model, prompt_tokens + completion_tokens)
+
+    def _backoff(self, retry: int, error: Exception) -> float:
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            return min(requested, self.backoff_max)
+        delay = min(self.backoff_base * (2 ** (retry - 1)), self.backoff_max)
+        # Full jitter keeps workers that were throttled together from retrying together
+        return random.uniform(delay / 2, delay)
+
+    def _hedge_delay(self, model: str) -> float:
+        """Seconds to wait for a first token before racing the fallback model"""
+        if self.hedge_after_ms is not None:
+            return self.hedge_after_ms / 1000
+        samples = self._model_stats(model).ttft_ms
+        if len(samples) < _HEDGE_MIN_SAMPLES:
+            return _HEDGE_DEFAULT_MS / 1000
+        return percentile(samples, 0.95) / 1000
+
+    async def _open(self, model: str, kwargs: Dict[str, Any], prompt_tokens: int, reserve_tokens: int,
+                    timeout: float, deadline_at: float) -> _Opened:
+        """
+        Admit and start one call
+
+        For streams this waits for the first content chunk, so a hedge race is
+        won by whichever model actually starts answering first. Every outcome
+        is reported to the model's circuit breaker; a half-open probe that ends
+        without one (deadline, cancellation) is handed back.
+        """
+        breaker = self.breaker(model)
+        probing = breaker.state == HALF_OPEN
+        recorded = False
+        grant = None
+        response = None
+        started = time.perf_counter()
+        try:
+            if self.scheduler is not None:
+                try:
+                    grant = await self.scheduler.acquire(model, reserve_tokens, timeout=deadline_at - started)
+                except SchedulerTimeout as e:
+                    raise LLMDeadlineExceeded(str(e)) from e
+            remaining = deadline_at - time.perf_counter()
+            response = await self.client.chat.completions.create(
+                model=model,
+                timeout=max(min(timeout, remaining), 0.001),
+                **kwargs
+            )
+            opened = _Opened(model, response, grant, started)
+            if kwargs.get('stream'):
+                opened.iterator = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await opened.iterator.__anext__()
+                    except StopAsyncIteration:
+                        opened.iterator = None
+                        break
+                    opened.prefetched.append(chunk)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        opened.first_token_at = time.perf_counter()
+                        break
+                first_token_ms = ((opened.first_token_at or time.perf_counter()) - started) * 1000
+                breaker.record_success(first_token_ms)
+            else:
+                breaker.record_success()
+            recorded = True
+            return opened
+        except asyncio.CancelledError:
+            # Lost a hedge race (recorded by _open_hedged) or the caller went away
+            if response is not None:
+                await _close_stream(response)
+            if grant is not None:
+                self.scheduler.release(grant, used_tokens=prompt_tokens)
+            raise
+        except Exception as e:
+            if not isinstance(e, LLMDeadlineExceeded):
+                breaker.record_failure()
+                recorded = True
+            if response is not None:
+                await _close_stream(response)
+            if grant is not None:
+                self.scheduler.release(grant, used_tokens=prompt_tokens, rate_limited=is_rate_limited(e))
+            raise
+        finally:
+            if probing and not recorded:
+                breaker.release_probe()
+
+    async def _discard(self, tasks: List[asyncio.Task], prompt_tokens: int):
+        """Cancel hedge-race calls whose result won't be returned and free the streams and slots of finished ones"""
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for task in tasks:
+            if task.cancelled() or task.exception() is not None:
+                continue
+            unused = task.result()
+            await _close_stream(unused.response)
+            if unused.grant is not None:
+                self.scheduler.release(unused.grant, used_tokens=prompt_tokens)
+
+    async def _open_hedged(self, model: str, kwargs: Dict[str, Any], hedge_kwargs: Dict[str, Any],
+                           prompt_tokens: int, reserve_tokens: int, timeout: float, deadline_at: float) -> _Opened:
+        """Start on model; if its first token is late, race the fallback and keep the first to answer"""
+        primary = asyncio.create_task(self._open(model, kwargs, prompt_tokens, reserve_tokens, timeout, deadline_at))
+        hedge: Optional[asyncio.Task] = None
+        winner: Optional[asyncio.Task] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay(model))
+            if primary in done or not self.breaker(self.fallback_model).allow():
+                opened = await primary
+                winner = primary
+                return opened
+
+            self._model_stats(self.fallback_model).hedges += 1
+            hedge = asyncio.create_task(
+                self._open(self.fallback_model, hedge_kwargs, prompt_tokens, reserve_tokens, timeout, deadline_at)
+            )
+            pending = {primary, hedge}
+            errors: Dict[asyncio.Task, BaseException] = {}
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors[task] = task.exception()
+                    elif winner is None:
+                        winner = task
+
+            if winner is None:
+                # Surface the primary's error so the normal retry / fallback path handles it
+                raise errors.get(primary) or errors[hedge]
+            if winner is hedge:
+                self._model_stats(self.fallback_model).hedges_won += 1
+                if not primary.done():
+                    # Its first token is later than the hedge delay plus the fallback's; judge it slow
+                    self.breaker(model).record_slow()
+            return winner.result()
+        finally:
+            # Also runs when the caller is cancelled: nothing may keep a slot or stream open
+            await self._discard([task for task in (primary, hedge) if task is not None and task is not winner],
+                                prompt_tokens)
+
+    async def create(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = DEFAULT_MODEL,
+        stream: bool = False,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        fallback: bool = True
+    ):
+        """
+        Create a chat completion
+
+        Args:
+            messages: Chat messages
+            model: Model to try first
+            stream: Return a stream of chunks instead of a completion
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+            timeout: Per-attempt timeout override (seconds)
+            deadline: Whole-call deadline override (seconds)
+            fallback: Whether the call may switch to the fallback model (rate limit,
+                open circuit breaker, hedging)
+
+        Returns:
+            Completion object, or an async iterator of chunks when streaming
+
+        Raises:
+            LLMDeadlineExceeded: If the deadline passes between attempts or while queued
+            Exception: The last API error once retries are exhausted
+        """
+        started = time.perf_counter()
+        deadline_at = started + (deadline or self.deadline)
+        prompt_tokens = sum(estimate_tokens(message.get('content') or '') for message in messages)
+        # Reserve the worst case against the TPM budget; reconciled on release
+        reserve_tokens = prompt_tokens + (max_tokens or 1024)
+        kwargs: Dict[str, Any] = {'messages': messages, 'stream': stream}
+        if max_tokens is not None:
+            kwargs['max_tokens'] = max_tokens
+        if temperature is not None:
+            kwargs['temperature'] = temperature
+
+        def switch_to_fallback():
+            kwargs['messages'] = prompt_registry.adapt_messages(messages, self.fallback_model)
+            self._model_stats(self.fallback_model).fallbacks += 1
+            return self.fallback_model
+
+        _served_model.set(None)
+        current = model
+        retries = 0
+        while True:
+            remaining = deadline_at - time.perf_counter()
+            if remaining <= 0:
+                raise LLMDeadlineExceeded(f"LLM call to {current} exceeded its {deadline or self.deadline}s deadline")
+            can_fall_back = fallback and current != self.fallback_model
+            if can_fall_back and not self.breaker(current).allow():
+                logger.warning(f"⚠️ Circuit open for {current}, routing to {self.fallback_model}")
+                current = switch_to_fallback()
+                can_fall_back = False
+            try:
+                if stream and self.hedge and can_fall_back:
+                    hedge_kwargs = {**kwargs, 'messages': prompt_registry.adapt_messages(messages, self.fallback_model)}
+                    opened = await self._open_hedged(
+                        current, kwargs, hedge_kwargs, prompt_tokens, reserve_tokens,
+                        timeout or self.timeout, deadline_at
+                    )
+                else:
+                    opened = await self._open(
+                        current, kwargs, prompt_tokens, reserve_tokens, timeout or self.timeout, deadline_at
+                    )
+            except LLMDeadlineExceeded:
+                raise
+            except Exception as e:
+                stats = self._model_stats(current)
+                stats.errors += 1
+                if can_fall_back and is_rate_limited(e):
+                    logger.warning(f"⚠️ Rate-limited on {current}, falling back to {self.fallback_model}")
+                    current = switch_to_fallback()
+                    continue
+                if not (is_rate_limited(e) or is_transient(e)) or retries >= self.max_retries:
+                    raise
+                retries += 1
+                stats.retries += 1
+                delay = self._backoff(retries, e)
+                if time.perf_counter() + delay >= deadline_at:
+                    raise
+                logger.warning(f"⚠️ {current} call failed ({e}); retry {retries}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            _served_model.set(opened.model)
+            if stream:
+                return _MeteredStream(opened, self, prompt_tokens, started)
+            response = opened.response
+            usage = getattr(response, 'usage', None)
+            content = response.choices[0].message.content if response.choices else ''
+            self._record(
+                opened.model,
+                opened.grant,
+                latency=time.perf_counter() - started,
+                ttft=None,
+                generation_seconds=None,
+                prompt_tokens=getattr(usage, 'prompt_tokens', None) or prompt_tokens,
+                completion_tokens=getattr(usage, 'completion_tokens', None) or estimate_tokens(content or '')
+            )
+            return response
+
+    async def complete_text(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Create a non-streaming completion and return its text"""
+        response = await self.create(messages, stream=False, **kwargs)
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        """Close the pooled HTTP connections"""
+        close = getattr(self.client, 'close', None)
+        if close is not None:
+            await close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model call metrics"""
+        return {
+            'timeout_seconds': self.timeout,
+            'deadline_seconds': self.deadline,
+            'max_retries': self.max_retries,
+            'hedging': {
+                'enabled': self.hedge,
+                'after_ms': self.hedge_after_ms if self.hedge_after_ms is not None else 'p95'
+            },
+            'by_model': {model: stats.as_dict() for model, stats in sorted(self._stats.items())},
+            'circuit_breakers': {model: breaker.get_stats() for model, breaker in sorted(self._breakers.items())}
+        }
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Pooled keep-alive HTTP client shared by every LLM call in the process"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        ),
+        timeout=httpx.Timeout(
+            float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+            connect=float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")),
+            pool=float(os.getenv("LLM_POOL_TIMEOUT_SECONDS", "5"))
+        )
+    )
+
+
+def create_llm_gateway() -> LLMGateway:
+    """Gateway on a Groq (or OpenAI) client configured from the environment"""
+    api_key = os.getenv("GROQ_API_KEY") or os.getenv("OPENAI_API_KEY")
+    base_url = "https://api.groq.com/openai/v1" if os.getenv("GROQ_API_KEY") else None
+    # Point at another OpenAI-compatible server, e.g. benchmarks/mock_llm_server.py
+    base_url = os.getenv("LLM_BASE_URL") or base_url
+    client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=create_http_client(),
+        # Retries and backoff are handled by the gateway
+        max_retries=0
+    )
+    return LLMGateway(
+        client,
+        timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+        deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "90")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        scheduler=create_llm_scheduler(),
+        breaker_settings={
+            'failure_rate': float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            'slow_call_ms': float(os.getenv("LLM_BREAKER_SLOW_CALL_MS", "4000")),
+            'slow_call_rate': float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", "0.5")),
+            'cooldown': float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+        },
+        hedge=os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true",
+        hedge_after_ms=float(os.getenv("LLM_HEDGE_AFTER_MS")) if os.getenv("LLM_HEDGE_AFTER_MS") else None
+    )
@@ -0,0 +1,326 @@
+"""
+Admission scheduler for LLM calls
+
+Every gateway attempt acquires a slot on its model's lane before calling
+Groq. A lane enforces a concurrency limit and a tokens-per-minute budget
+(token bucket, reserved up front and reconciled with actual usage). Waiting
+calls are served strictly by priority class (interactive chat, then
+workflows, then batch jobs) and, within a class, by start-time fair queueing
+across organizations, so one tenant's burst cannot monopolize the model.
+
+The organization and priority of the current request travel in a context
+variable, set once by the endpoint (or the chat path) and read here.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+
+from monitoring import percentile
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_WORKFLOW = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_WORKFLOW: 'workflow', PRIORITY_BATCH: 'batch'}
+
+# Budgets per model; Groq's free-tier TPM limits. Override with LLM_SCHEDULER_BUDGETS
+# (JSON: {"model": {"concurrency": 16, "tpm": 12000}}); tpm 0 means unlimited.
+DEFAULT_BUDGETS = {
+    'llama-3.3-70b-versatile': {'concurrency': 16, 'tpm': 12000},
+    'llama-3.1-8b-instant': {'concurrency': 16, 'tpm': 6000},
+}
+UNKNOWN_MODEL_BUDGET = {'concurrency': 8, 'tpm': 0}
+
+_WAIT_SAMPLES = 500
+
+_request_scope: ContextVar[Tuple[str, int]] = ContextVar(
+    'llm_request_scope', default=('anonymous', PRIORITY_WORKFLOW)
+)
+
+
+def bind_request_scope(organization_id: Optional[str] = None, priority: Optional[int] = None):
+    """Set the organization and/or priority for LLM calls made by the current request"""
+    current_org, current_priority = _request_scope.get()
+    _request_scope.set((
+        organization_id or current_org,
+        current_priority if priority is None else priority
+    ))
+
+
+@contextmanager
+def request_scope(organization_id: Optional[str] = None, priority: Optional[int] = None):
+    """Temporarily override the request scope (e.g. background work at batch priority)"""
+    current_org, current_priority = _request_scope.get()
+    token = _request_scope.set((
+        organization_id or current_org,
+        current_priority if priority is None else priority
+    ))
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+def get_request_scope() -> Tuple[str, int]:
+    """(organization_id, priority) of the current request"""
+    return _request_scope.get()
+
+
+class SchedulerTimeout(Exception):
+    """No slot was granted before the caller's deadline"""
+
+
+@dataclass(order=True)
+class _Ticket:
+    start_tag: float
+    seq: int
+    organization_id: str = field(compare=False)
+    priority: int = field(compare=False)
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+@dataclass
+class Grant:
+    """An admitted call; release it exactly once"""
+    model: str
+    priority: int
+    reserved_tokens: int
+    released: bool = False
+
+
+class _ModelLane:
+    """Concurrency + TPM budget and fair queues for one model"""
+
+    def __init__(self, model: str, max_concurrency: int, tokens_per_minute: int):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.refilled_at = time.monotonic()
+        self.active = 0
+        self.queues: Dict[int, List[_Ticket]] = {priority: [] for priority in PRIORITY_NAMES}
+        self.virtual_time: Dict[int, float] = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.org_finish: Dict[int, Dict[str, float]] = {priority: {} for priority in PRIORITY_NAMES}
+        self.refill_timer: Optional[asyncio.TimerHandle] = None
+
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.timeouts = 0
+        self.throttled = 0
+        self.wait_ms: Dict[int, Deque[float]] = {priority: deque(maxlen=_WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+
+    def refill(self):
+        if not self.tokens_per_minute:
+            return
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.tokens_per_minute),
+            self.tokens + (now - self.refilled_at) * self.tokens_per_minute / 60
+        )
+        self.refilled_at = now
+
+    def fits(self, tokens: int) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        if not self.tokens_per_minute:
+            return True
+        self.refill()
+        return self.tokens >= tokens
+
+    def seconds_until(self, tokens: int) -> float:
+        return max(tokens - self.tokens, 0) * 60 / self.tokens_per_minute
+
+    def head(self) -> Optional[_Ticket]:
+        for priority in sorted(self.queues):
+            queue = self.queues[priority]
+            while queue and queue[0].future.done():
+                # Cancelled or timed out while waiting
+                heapq.heappop(queue)
+            if queue:
+                return queue[0]
+        return None
+
+    def queued(self) -> int:
+        return sum(1 for queue in self.queues.values() for ticket in queue if not ticket.future.done())
+
+
+class LLMScheduler:
+    """Priority- and tenant-fair admission control for model calls"""
+
+    def __init__(self, budgets: Optional[Dict[str, Dict[str, int]]] = None,
+                 org_weights: Optional[Dict[str, float]] = None):
+        """
+        Initialize scheduler
+
+        Args:
+            budgets: Per-model {'concurrency': int, 'tpm': int}
+            org_weights: Fair-share weight per organization (default 1.0)
+        """
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.org_weights = org_weights or {}
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            budget = self.budgets.get(model, UNKNOWN_MODEL_BUDGET)
+            lane = _ModelLane(model, int(budget['concurrency']), int(budget.get('tpm', 0)))
+            self._lanes[model] = lane
+        return lane
+
+    def _admit(self, lane: _ModelLane, priority: int, tokens: int, waited: float) -> Grant:
+        lane.active += 1
+        if lane.tokens_per_minute:
+            lane.tokens -= tokens
+        lane.admitted[priority] += 1
+        lane.wait_ms[priority].append(waited * 1000)
+        return Grant(lane.model, priority, tokens)
+
+    def _dispatch(self, lane: _ModelLane):
+        """Grant slots to queued tickets in priority / fair-share order while budget allows"""
+        while True:
+            ticket = lane.head()
+            if ticket is None:
+                return
+            if not lane.fits(ticket.tokens):
+                # Head-of-line waits so lower classes cannot drain the budget ahead of it
+                if lane.active < lane.max_concurrency and lane.tokens_per_minute and lane.refill_timer is None:
+                    loop = asyncio.get_running_loop()
+                    lane.refill_timer = loop.call_later(lane.seconds_until(ticket.tokens), self._on_refill, lane)
+                return
+            heapq.heappop(lane.queues[ticket.priority])
+            lane.virtual_time[ticket.priority] = ticket.start_tag
+            ticket.future.set_result(
+                self._admit(lane, ticket.priority, ticket.tokens, time.monotonic() - ticket.enqueued_at)
+            )
+
+    def _on_refill(self, lane: _ModelLane):
+        lane.refill_timer = None
+        self._dispatch(lane)
+
+    async def acquire(self, model: str, tokens: int, timeout: Optional[float] = None) -> Grant:
+        """
+        Wait for a slot on a model
+
+        Args:
+            model: Model about to be called
+            tokens: Tokens to reserve (prompt + completion limit)
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            Grant to pass to release()
+
+        Raises:
+            SchedulerTimeout: If no slot was granted in time
+        """
+        lane = self._lane(model)
+        organization_id, priority = get_request_scope()
+        if lane.tokens_per_minute:
+            # A single call larger than the whole budget would never fit
+            tokens = min(tokens, lane.tokens_per_minute)
+
+        if lane.head() is None and lane.fits(tokens):
+            return self._admit(lane, priority, tokens, 0.0)
+
+        # Start-time fair queueing within the priority class
+        weight = self.org_weights.get(organization_id, 1.0)
+        start_tag = max(lane.virtual_time[priority], lane.org_finish[priority].get(organization_id, 0.0))
+        lane.org_finish[priority][organization_id] = start_tag + tokens / weight
+        ticket = _Ticket(
+            start_tag=start_tag,
+            seq=next(self._seq),
+            organization_id=organization_id,
+            priority=priority,
+            tokens=tokens,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic()
+        )
+        heapq.heappush(lane.queues[priority], ticket)
+        self._dispatch(lane)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Granted just as we gave up: hand the slot back
+                self.release(ticket.future.result(), used_tokens=0)
+            else:
+                ticket.future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                lane.timeouts += 1
+                raise SchedulerTimeout(
+                    f"No {model} slot within {timeout:.1f}s ({lane.queued()} queued, {lane.active} active)"
+                )
+            raise
+
+    def release(self, grant: Grant, used_tokens: Optional[int] = None, rate_limited: bool = False):
+        """
+        Return a slot and reconcile the reservation with actual usage
+
+        Args:
+            grant: Grant from acquire()
+            used_tokens: Tokens the call actually consumed (None keeps the reservation)
+            rate_limited: The provider rejected the call; pause the lane until the bucket refills
+        """
+        if grant.released:
+            return
+        grant.released = True
+        lane = self._lane(grant.model)
+        lane.active -= 1
+        if lane.tokens_per_minute:
+            if used_tokens is not None:
+                lane.tokens = min(float(lane.tokens_per_minute), lane.tokens + grant.reserved_tokens - used_tokens)
+            if rate_limited:
+                lane.throttled += 1
+                lane.tokens = min(lane.tokens, 0.0)
+        self._dispatch(lane)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times and budget usage per model"""
+        stats = {}
+        for model, lane in sorted(self._lanes.items()):
+            lane.refill()
+            by_priority = {}
+            for priority, name in PRIORITY_NAMES.items():
+                by_priority[name] = {
+                    'queued': sum(1 for ticket in lane.queues[priority] if not ticket.future.done()),
+                    'admitted': lane.admitted[priority],
+                    'wait_ms_p50': percentile(lane.wait_ms[priority], 0.5),
+                    'wait_ms_p95': percentile(lane.wait_ms[priority], 0.95)
+                }
+            stats[model] = {
+                'active': lane.active,
+                'max_concurrency': lane.max_concurrency,
+                'tokens_per_minute': lane.tokens_per_minute,
+                'tokens_available': round(lane.tokens) if lane.tokens_per_minute else None,
+                'queue_depth': lane.queued(),
+                'timeouts': lane.timeouts,
+                'provider_throttles': lane.throttled,
+                'by_priority': by_priority
+            }
+        return stats
+
+
+def create_llm_scheduler() -> Optional[LLMScheduler]:
+    """Scheduler from LLM_SCHEDULER_* settings (None when LLM_SCHEDULER_ENABLED=false)"""
+    if os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() != "true":
+        return None
+    budgets = json.loads(os.getenv("LLM_SCHEDULER_BUDGETS", "{}") or "{}")
+    org_weights = {}
+    for pair in os.getenv("LLM_SCHEDULER_ORG_WEIGHTS", "").split(","):
+        if ":" in pair:
+            org_id, weight = pair.rsplit(":", 1)
+            org_weights[org_id.strip()] = float(weight)
+    return LLMScheduler(budgets=budgets, org_weights=org_weights)
@@ -8,12 +8,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, AsyncGenerator
+from typing import Optional, Dict, Any, AsyncGenerator, List
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import uvicorn
 import os
+import json
 import logging
 import time
 from datetime import datetime
@@ -31,7 +32,16 @@ sys.path.append(current_dir)
 
 from unified_accreditex_agent import UnifiedAccreditexAgent
 from monitoring import performance_monitor
-from cache import cache
+from cache import cache, tenant_cache, negative_cache
+from singleflight import get_single_flight_stats
+from stale_while_revalidate import get_swr_stats
+from prompt_registry import prompt_registry
+from llm_scheduler import bind_request_scope
+from stream_metrics import begin_chat_observation, stream_metrics
+from batch_workflows import BATCH_MAX_ITEMS, run_batch
+from token_verifier import create_token_verifier
+from async_firebase import firestore_executor
+from org_scope import create_org_scope_resolver
 
 # Configure logging
 logging.basicConfig(
@@ -97,6 +107,9 @@ app.add_middleware(
 # API Key Security
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Firebase ID tokens are verified off the event loop; decoded claims are cached until exp
+token_verifier = create_token_verifier(lambda token: firebase_auth.verify_id_token(token))
+
 async def verify_api_key(request: Request, api_key: str = Depends(api_key_header)):
     """Verify authentication via API key OR Firebase ID token.
     
@@ -118,7 +131,9 @@ async def verify_api_key(request: Request, api_key: str = Depends(api_key_header
     if auth_header.startswith("Bearer "):
         token = auth_header[7:]
         try:
-            decoded_token = firebase_auth.verify_id_token(token)
+            decoded_token = await token_verifier.verify(token)
+            # Fair-share LLM admission is keyed on the caller's organization
+            bind_request_scope(organization_id=decoded_token.get("organizationId"))
             return {
                 "auth_type": "firebase",
                 "uid": decoded_token.get("uid"),
@@ -143,6 +158,18 @@ async def verify_api_key(request: Request, api_key: str = Depends(api_key_header
 # Initialize agent
 agent = None
 
+# uid -> organizationId for tokens without the organizationId claim
+org_scope_resolver = None
+
+
+def get_org_scope_resolver():
+    """Resolver bound to the Firestore client, created on first use"""
+    global org_scope_resolver
+    if org_scope_resolver is None:
+        from firebase_client import firebase_client
+        org_scope_resolver = create_org_scope_resolver(firebase_client.db)
+    return org_scope_resolver
+
 
 def ensure_workflow_response(result: Dict[str, Any], expected_field: str) -> Dict[str, Any]:
     """Normalize workflow responses to stable schema (non-breaking additive guard)."""
@@ -160,7 +187,7 @@ def ensure_workflow_response(result: Dict[str, Any], expected_field: str) -> Dic
     return normalized
 
 
-def resolve_request_scope(
+async def resolve_request_scope(
     auth_info: Dict[str, Any],
     requested_user_id: Optional[str] = None,
     requested_org_id: Optional[str] = None,
@@ -176,42 +203,15 @@ def resolve_request_scope(
             raise HTTPException(status_code=401, detail="Invalid Firebase token: missing uid")
 
         # Backward-compatible fallback for users whose custom token claims
-        # have not been refreshed with organizationId yet.
+        # have not been refreshed with organizationId yet: cached mapping,
+        # then parallel Firestore lookups off the event loop.
         if not org_id:
             try:
-                from firebase_client import firebase_client
-                users_col = firebase_client.db.collection("users")
-
-                def _first_non_empty_org(docs):
-                    for candidate in docs:
-                        candidate_data = candidate.to_dict() or {}
-                        candidate_org = candidate_data.get("organizationId")
-                        if candidate_org:
-                            return candidate_org
-                    return None
-
-                user_doc = users_col.document(uid).get()
-                if user_doc.exists:
-                    user_data = user_doc.to_dict() or {}
-                    org_id = user_data.get("organizationId")
-
-                # Legacy fallback patterns for older user document schemas.
-                if not org_id:
-                    legacy_queries = [
-                        users_col.where("id", "==", uid),
-                        users_col.where("uid", "==", uid),
-                        users_col.where("authUid", "==", uid),
-                    ]
-                    if email:
-                        legacy_queries.append(users_col.where("email", "==", email))
-
-                    for legacy_query in legacy_queries:
-                        legacy_matches = legacy_query.get()
-                        org_id = _first_non_empty_org(legacy_matches)
-                        if org_id:
-                            break
+                org_id = await get_org_scope_resolver().resolve(uid, email)
             except Exception as scope_error:
                 logger.warning(f"Unable to resolve organizationId from users/{uid}: {scope_error}")
+            if org_id:
+                bind_request_scope(organization_id=org_id)
 
         if requested_user_id and requested_user_id != uid:
             logger.warning(
@@ -339,6 +339,16 @@ class DesignComplianceRequest(BaseModel):
     design_phase: Optional[str] = Field(None, description="Design phase (Concept/Development/Validation/Post-Market)")
     user_id: Optional[str] = None
 
+class BatchWorkflowItem(BaseModel):
+    """One workflow run in a batch"""
+    workflow: str = Field(..., description="Workflow name (see POST /batch/workflows)", example="action_plan")
+    payload: Dict[str, Any] = Field(..., description="Body the workflow's own endpoint would take")
+    id: Optional[str] = Field(None, description="Client reference echoed on the result line")
+
+class BatchWorkflowRequest(BaseModel):
+    """Request for a batch of workflow runs"""
+    items: List[BatchWorkflowItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
 class HealthResponse(BaseModel):
     status: str = Field(..., description="Health status", example="healthy")
     agent_initialized: bool = Field(..., description="Whether AI agent is initialized")
@@ -355,10 +365,24 @@ async def startup_event():
         agent = UnifiedAccreditexAgent()
         await agent.initialize()
         logger.info("✅ AI Agent initialized successfully")
+        # ORG_SUMMARY_MODE=listen keeps org_summaries current from this process
+        agent.firestore.client.org_summaries.start()
     except Exception as e:
         logger.error(f"❌ Failed to initialize agent: {e}")
         raise
 
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist hot conversation threads so they survive the restart"""
+    if agent:
+        agent.firestore.client.org_summaries.stop()
+        agent.conversations.flush()
+        logger.info("✅ Conversation threads flushed")
+        await agent.llm.aclose()
+    token_verifier.shutdown()
+    firestore_executor.shutdown()
+
 # Health check endpoint
 @app.get(
     "/health",
@@ -396,6 +420,7 @@ async def chat(request: Request, chat_request: ChatRequest, auth_info = Depends(
     Requires Firebase Bearer auth for frontend requests or the backend API key for trusted service calls
     """
     start_time = time.time()
+    request_started = time.perf_counter()
     
     if not agent:
         performance_monitor.track_error("ServiceUnavailable", "Agent not initialized", {"endpoint": "chat"})
@@ -406,7 +431,7 @@ async def chat(request: Request, chat_request: ChatRequest, auth_info = Depends(
 
         # Normalize auth scope into context so downstream queries stay tenant-scoped.
         context_payload = dict(chat_request.context or {})
-        scope = resolve_request_scope(
+        scope = await resolve_request_scope(
             auth_info,
             requested_user_id=context_payload.get("user_id") or chat_request.user_id,
             requested_org_id=context_payload.get("organization_id"),
@@ -429,6 +454,8 @@ async def chat(request: Request, chat_request: ChatRequest, auth_info = Depends(
         async def generate():
             full_response = ""
             chunk_count = 0
+            # TTFT, first byte, inter-chunk gaps and tokens/sec for this stream
+            observation = begin_chat_observation(started=request_started)
             async for chunk in agent.chat(
                 message=chat_request.message,
                 thread_id=chat_request.thread_id,
@@ -436,17 +463,29 @@ async def chat(request: Request, chat_request: ChatRequest, auth_info = Depends(
             ):
                 full_response += chunk
                 chunk_count += 1
+                observation.on_client_chunk()
                 yield chunk
             
             # Track performance
             duration = time.time() - start_time
+            observation.finished_at = time.perf_counter()
+            stream_metrics.record(observation)
             performance_monitor.track_request("chat", success=True)
             performance_monitor.track_response_time("chat", duration)
             performance_monitor.log_info(
                 "chat_completed",
                 response_length=len(full_response),
                 chunks_sent=chunk_count,
-                duration_ms=round(duration * 1000, 2)
+                duration_ms=round(duration * 1000, 2),
+                task_type=observation.task_type,
+                route_mode=observation.route_mode,
+                model=observation.model,
+                upstream_ttft_ms=round((observation.upstream_first_token_at - request_started) * 1000, 1)
+                if observation.upstream_first_token_at else None,
+                first_byte_ms=round((observation.client_first_byte_at - request_started) * 1000, 1)
+                if observation.client_first_byte_at else None,
+                completion_tokens=observation.completion_tokens,
+                model_selection=observation.model_selection
             )
         
         return StreamingResponse(
@@ -512,6 +551,20 @@ async def assess_risk(
         logger.error(f"Risk assessment error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def training_arguments(payload: TrainingRequest) -> Dict[str, Any]:
+    """Map the frontend's training fields onto the agent's arguments"""
+    return {
+        "role": payload.role,
+        "competency_gaps": payload.competency_gaps or payload.current_skills or [],
+        "accreditation_focus": (
+            payload.accreditation_focus
+            or payload.upcoming_accreditation
+            or payload.department
+            or "General healthcare accreditation readiness"
+        ),
+        "timeline": payload.timeline or "Next accreditation cycle",
+    }
+
 # Training recommendations endpoint
 @app.post("/training-recommendations", dependencies=[Depends(verify_api_key)])
 @limiter.limit("15/minute")
@@ -524,21 +577,7 @@ async def get_training_recommendations(
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
     try:
-        competency_gaps = payload.competency_gaps or payload.current_skills or []
-        accreditation_focus = (
-            payload.accreditation_focus
-            or payload.upcoming_accreditation
-            or payload.department
-            or "General healthcare accreditation readiness"
-        )
-        timeline = payload.timeline or "Next accreditation cycle"
-
-        result = await agent.get_training_recommendations(
-            role=payload.role,
-            competency_gaps=competency_gaps,
-            accreditation_focus=accreditation_focus,
-            timeline=timeline,
-        )
+        result = await agent.get_training_recommendations(**training_arguments(payload))
         return JSONResponse(content=result)
     except Exception as e:
         logger.error(f"Training recommendations error: {e}")
@@ -649,6 +688,84 @@ async def check_design_compliance(request: Request, payload: DesignComplianceReq
         logger.error(f"Design compliance error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch workflow endpoint
+BATCH_WORKFLOWS = {
+    # name: (request model, run(payload) -> agent result, expected field or None)
+    "compliance_check": (ComplianceCheckRequest, lambda p: agent.check_document_compliance(
+        document_type=p.document_type, standard=p.standard,
+        content_summary=p.content_summary, requirements=p.requirements), None),
+    "risk_assessment": (RiskAssessmentRequest, lambda p: agent.assess_risk(
+        area=p.area, current_status=p.current_status,
+        upcoming_review_date=p.upcoming_review_date, critical_areas=p.critical_areas), None),
+    "training_recommendations": (TrainingRequest, lambda p: agent.get_training_recommendations(
+        **training_arguments(p)), None),
+    "action_plan": (ActionPlanRequest, lambda p: agent.generate_action_plan(
+        standard_id=p.standard_id, item=p.item, status=p.status, findings=p.findings), "action_plan"),
+    "root_cause_analysis": (RootCauseAnalysisRequest, lambda p: agent.analyze_root_cause(
+        issue_title=p.issue_title, description=p.description,
+        context=p.context, affected_areas=p.affected_areas), "root_cause_analysis"),
+    "pdca_improvements": (PDCARequest, lambda p: agent.suggest_pdca_improvements(
+        process_name=p.process_name, current_state=p.current_state,
+        problem_identified=p.problem_identified, previous_actions=p.previous_actions), "pdca_improvements"),
+    "survey_risk_assessment": (SurveyRiskRequest, lambda p: agent.assess_survey_risk(
+        standard=p.standard, organization_area=p.organization_area, readiness_level=p.readiness_level,
+        critical_concerns=p.critical_concerns, survey_date=p.survey_date), "survey_risk_assessment"),
+    "design_compliance": (DesignComplianceRequest, lambda p: agent.check_design_compliance(
+        design_element=p.design_element, requirement=p.requirement,
+        current_implementation=p.current_implementation, design_phase=p.design_phase),
+        "design_compliance_assessment"),
+}
+
+
+def batch_workflow_handler(name: str):
+    """Validate a batch payload with the workflow's request model and run it"""
+    request_model, run, expected_field = BATCH_WORKFLOWS[name]
+
+    async def handler(payload: Dict[str, Any]) -> Dict[str, Any]:
+        result = await run(request_model(**payload))
+        return ensure_workflow_response(result, expected_field) if expected_field else result
+
+    return handler
+
+
+@app.post("/batch/workflows", dependencies=[Depends(verify_api_key)], tags=["workflows"])
+@limiter.limit("5/minute")
+async def batch_workflows(request: Request, payload: BatchWorkflowRequest):
+    """Run up to BATCH_MAX_ITEMS workflow payloads and stream results as NDJSON"""
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+
+    unknown = sorted({item.workflow for item in payload.items if item.workflow not in BATCH_WORKFLOWS})
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown workflow(s): {', '.join(unknown)}; expected one of {', '.join(BATCH_WORKFLOWS)}"
+        )
+
+    items = [item.model_dump() for item in payload.items]
+    handlers = {name: batch_workflow_handler(name) for name in BATCH_WORKFLOWS}
+    start_time = time.time()
+
+    async def generate():
+        summary = {}
+        async for line in run_batch(items, handlers):
+            if line["type"] == "summary":
+                summary = line
+            yield json.dumps(line, default=str) + "\n"
+
+        duration = time.time() - start_time
+        performance_monitor.track_request("batch_workflows", success=True)
+        performance_monitor.track_response_time("batch_workflows", duration)
+        performance_monitor.log_info(
+            "batch_workflows_completed",
+            items=summary.get("items"),
+            unique=summary.get("unique"),
+            failed=summary.get("failed"),
+            duration_ms=round(duration * 1000, 2)
+        )
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 # NEW: Project Insights endpoint
 @app.post("/api/ai/insights", dependencies=[Depends(verify_api_key)])
 @limiter.limit("20/minute")
@@ -664,7 +781,7 @@ async def get_project_insights(
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
     try:
-        scope = resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
+        scope = await resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
         org_id = scope.get("organization_id")
         if not org_id:
             raise HTTPException(status_code=400, detail="organization_id is required")
@@ -700,7 +817,7 @@ async def search_documents_ai(
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
     try:
-        scope = resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
+        scope = await resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
         org_id = scope.get("organization_id")
         if not org_id:
             raise HTTPException(status_code=400, detail="organization_id is required")
@@ -731,11 +848,10 @@ async def get_user_context_endpoint(
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    scope = resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
+    scope = await resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
     
     try:
-        from firebase_client import firebase_client
-        context = firebase_client.get_user_context(scope["user_id"] or user_id, scope["organization_id"])
+        context = await agent.firestore.get_user_context(scope["user_id"] or user_id, scope["organization_id"])
         
         if context.get('error'):
             raise HTTPException(status_code=404, detail=context['error'])
@@ -758,12 +874,11 @@ async def get_workspace_analytics_endpoint(
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
     try:
-        scope = resolve_request_scope(auth_info, requested_org_id=organization_id)
+        scope = await resolve_request_scope(auth_info, requested_org_id=organization_id)
         org_id = scope.get("organization_id")
         if not org_id:
             raise HTTPException(status_code=400, detail="organization_id is required")
-        from firebase_client import firebase_client
-        analytics = firebase_client.get_workspace_analytics(org_id)
+        analytics = await agent.firestore.get_workspace_analytics(org_id)
         return JSONResponse(content=analytics)
     except Exception as e:
         logger.error(f"Analytics retrieval error: {e}")
@@ -797,7 +912,7 @@ async def get_training_status_ai(
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
     try:
-        scope = resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
+        scope = await resolve_request_scope(auth_info, requested_user_id=user_id, requested_org_id=organization_id)
         org_id = scope.get("organization_id")
         if not org_id:
             raise HTTPException(status_code=400, detail="organization_id is required")
@@ -924,7 +1039,8 @@ async def root():
             "GET /api/ai/training/{user_id} - Training status with AI",
             "POST /check-compliance - Document compliance",
             "POST /assess-risk - Risk assessment",
-            "POST /training-recommendations - Training suggestions"
+            "POST /training-recommendations - Training suggestions",
+            "POST /batch/workflows - Batched workflows (NDJSON stream)"
         ]
     }
 
@@ -945,7 +1061,26 @@ async def get_metrics():
     return {
         "timestamp": datetime.utcnow().isoformat(),
         "metrics": performance_monitor.get_metrics_summary(),
-        "cache_stats": cache.get_stats()
+        "cache_stats": cache.get_stats(),
+        "tenant_cache_stats": tenant_cache.get_stats(),
+        "negative_cache_stats": negative_cache.get_stats(),
+        "token_verifier": token_verifier.get_stats(),
+        "firestore_executor": firestore_executor.get_stats(),
+        "user_context_stages": agent.firestore.client.user_context_timings.get_stats() if agent else None,
+        "org_summaries": agent.firestore.client.org_summaries.get_stats() if agent else None,
+        "org_scope": org_scope_resolver.get_stats() if org_scope_resolver else None,
+        "response_cache_stats": agent.response_cache.get_stats() if agent else None,
+        "semantic_cache_stats": agent.semantic_cache.get_stats() if agent and agent.semantic_cache else None,
+        "workflow_cache_stats": agent.workflow_cache.get_stats() if agent else None,
+        "conversation_store": agent.conversations.get_stats() if agent else None,
+        "history_budget": agent.history_budget.get_stats() if agent else None,
+        "prompt_registry": prompt_registry.get_report(),
+        "llm_gateway": agent.llm.get_stats() if agent else None,
+        "llm_scheduler": agent.llm.scheduler.get_stats() if agent and agent.llm.scheduler else None,
+        "chat_streaming": stream_metrics.get_stats(),
+        "model_selector": agent.model_selector.get_stats() if agent else None,
+        "single_flight": get_single_flight_stats(),
+        "stale_while_revalidate": get_swr_stats()
     }
 
 # ─────────────────────────────────────────────────────────────
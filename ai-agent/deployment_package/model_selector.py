@@ -0,0 +1,220 @@
+"""
+Latency-aware model selection
+
+Picks the model and completion cap for each chat turn and workflow call.
+Requests are bucketed by task type, context tier and message length. Every
+(bucket, model) arm keeps rolling latency, quality confidence and completion
+length samples. The policy is epsilon-greedy: with probability epsilon a
+random eligible model is tried. Otherwise the model with the best reward
+(mean quality minus a per-second latency penalty) is used, preferring arms
+that meet the quality floor. Until both arms have enough samples a prior
+applies: short minimal-tier chat goes to the fast model and everything else
+to the primary model. Full-tier requests never go to the fast model.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+import math
+import os
+import random
+
+from monitoring import percentile
+from token_budget import estimate_tokens
+
+_SAMPLE_WINDOW = 200
+
+# Message length buckets in estimated tokens
+SHORT_MESSAGE_TOKENS = 60
+LONG_MESSAGE_TOKENS = 400
+
+MIN_MAX_TOKENS = 256
+MAX_TOKENS_HEADROOM = 1.5
+
+
+def _length_bucket(message: str) -> str:
+    tokens = estimate_tokens(message or '')
+    if tokens <= SHORT_MESSAGE_TOKENS:
+        return 'short'
+    if tokens <= LONG_MESSAGE_TOKENS:
+        return 'medium'
+    return 'long'
+
+
+@dataclass
+class ModelDecision:
+    """Model and completion cap chosen for one request"""
+    model: str
+    max_tokens: int
+    bucket: str
+    reason: str  # 'prior', 'exploit', 'explore' or 'static'
+
+    def as_meta(self) -> Dict[str, Any]:
+        return {'model': self.model, 'max_tokens': self.max_tokens, 'bucket': self.bucket, 'reason': self.reason}
+
+
+class _Arm:
+    """Rolling outcome samples for one model in one bucket"""
+
+    def __init__(self):
+        self.samples = 0
+        self.latency_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.quality: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.completion_tokens: Deque[int] = deque(maxlen=_SAMPLE_WINDOW)
+        self.truncated: Deque[bool] = deque(maxlen=_SAMPLE_WINDOW)
+
+    def mean_quality(self) -> float:
+        return sum(self.quality) / len(self.quality) if self.quality else 0.0
+
+    def reward(self, latency_weight: float) -> float:
+        return self.mean_quality() - latency_weight * percentile(self.latency_ms, 0.5, ndigits=None) / 1000
+
+
+class ModelSelector:
+    """Epsilon-greedy choice between a primary and a fast model"""
+
+    def __init__(
+        self,
+        primary_model: str,
+        fast_model: str,
+        enabled: bool = True,
+        epsilon: float = 0.1,
+        latency_weight: float = 0.05,
+        quality_floor: float = 0.7,
+        min_samples: int = 20,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize selector
+
+        Args:
+            primary_model: Default, higher quality model
+            fast_model: Lower latency model
+            enabled: False always picks the primary model and the caller's max_tokens
+            epsilon: Share of requests that try a random eligible model
+            latency_weight: Reward lost per second of median latency
+            quality_floor: Mean quality confidence an arm needs to be preferred
+            min_samples: Samples each arm needs before the prior is replaced
+            seed: Random seed (tests and benchmarks)
+        """
+        self.primary_model = primary_model
+        self.fast_model = fast_model
+        self.enabled = enabled
+        self.epsilon = epsilon
+        self.latency_weight = latency_weight
+        self.quality_floor = quality_floor
+        self.min_samples = min_samples
+        self._random = random.Random(seed)
+        self._arms: Dict[str, Dict[str, _Arm]] = {}
+        self._decisions = {'prior': 0, 'exploit': 0, 'explore': 0, 'static': 0}
+
+    def _arm(self, bucket: str, model: str) -> _Arm:
+        return self._arms.setdefault(bucket, {}).setdefault(model, _Arm())
+
+    def _eligible(self, context_tier: Optional[str]) -> List[str]:
+        if context_tier == 'full':
+            return [self.primary_model]
+        return [self.primary_model, self.fast_model]
+
+    def _prior(self, context_tier: Optional[str], length: str) -> str:
+        if length == 'short' and context_tier in ('minimal', None):
+            return self.fast_model
+        return self.primary_model
+
+    def _max_tokens(self, arm: _Arm, default_max_tokens: int) -> int:
+        """Cap at the arm's p95 completion length plus headroom; back to the default after a truncation"""
+        if arm.samples < self.min_samples or any(arm.truncated):
+            return default_max_tokens
+        p95 = percentile(arm.completion_tokens, 0.95, ndigits=None)
+        cap = int(math.ceil(p95 * MAX_TOKENS_HEADROOM / 64) * 64)
+        return max(min(cap, default_max_tokens), min(MIN_MAX_TOKENS, default_max_tokens))
+
+    def select(self, task_type: str, context_tier: Optional[str], message: str,
+               default_max_tokens: int = 1024) -> ModelDecision:
+        """
+        Choose the model and max_tokens for a request
+
+        Args:
+            task_type: Chat task type or workflow name
+            context_tier: 'minimal', 'standard', 'full' or None (no context loaded)
+            message: User message or workflow prompt
+            default_max_tokens: The caller's completion cap
+
+        Returns:
+            ModelDecision to pass back to record()
+        """
+        length = _length_bucket(message)
+        bucket = f"{task_type}:{context_tier or 'none'}:{length}"
+        if not self.enabled:
+            self._decisions['static'] += 1
+            return ModelDecision(self.primary_model, default_max_tokens, bucket, 'static')
+
+        eligible = self._eligible(context_tier)
+        arms = {model: self._arm(bucket, model) for model in eligible}
+        if len(eligible) > 1 and self._random.random() < self.epsilon:
+            model, reason = self._random.choice(eligible), 'explore'
+        elif any(arm.samples < self.min_samples for arm in arms.values()):
+            model, reason = self._prior(context_tier, length), 'prior'
+        else:
+            qualified = [m for m in eligible if arms[m].mean_quality() >= self.quality_floor] or eligible
+            model = max(qualified, key=lambda m: arms[m].reward(self.latency_weight))
+            reason = 'exploit'
+
+        self._decisions[reason] += 1
+        return ModelDecision(model, self._max_tokens(arms[model], default_max_tokens), bucket, reason)
+
+    def record(self, decision: ModelDecision, latency_ms: float, quality: float, completion_tokens: int,
+               served_model: Optional[str] = None):
+        """
+        Feed back the outcome of a decision
+
+        Args:
+            decision: Decision returned by select()
+            latency_ms: Time until the full response was received
+            quality: Quality confidence of the response (0 for a failed call)
+            completion_tokens: Tokens in the response
+            served_model: Model that actually answered, when the gateway fell back or
+                hedged (None: the decision's model)
+        """
+        model = served_model or decision.model
+        if decision.reason == 'static' or model not in (self.primary_model, self.fast_model):
+            return
+        arm = self._arm(decision.bucket, model)
+        arm.samples += 1
+        arm.latency_ms.append(latency_ms)
+        arm.quality.append(quality)
+        arm.completion_tokens.append(completion_tokens)
+        arm.truncated.append(completion_tokens >= decision.max_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Decision counts and per-bucket arm statistics"""
+        buckets = {}
+        for bucket, arms in sorted(self._arms.items()):
+            buckets[bucket] = {
+                model: {
+                    'samples': arm.samples,
+                    'latency_ms_p50': percentile(arm.latency_ms, 0.5),
+                    'quality_mean': round(arm.mean_quality(), 3),
+                    'completion_tokens_p95': percentile(arm.completion_tokens, 0.95, ndigits=None),
+                    'reward': round(arm.reward(self.latency_weight), 3)
+                }
+                for model, arm in sorted(arms.items()) if arm.samples
+            }
+        return {
+            'enabled': self.enabled,
+            'epsilon': self.epsilon,
+            'decisions': dict(self._decisions),
+            'buckets': {bucket: arms for bucket, arms in buckets.items() if arms}
+        }
+
+
+def create_model_selector(primary_model: str, fast_model: str) -> ModelSelector:
+    """Selector from MODEL_SELECTOR_* settings"""
+    return ModelSelector(
+        primary_model,
+        fast_model,
+        enabled=os.getenv("MODEL_SELECTOR_ENABLED", "true").lower() == "true",
+        epsilon=float(os.getenv("MODEL_SELECTOR_EPSILON", "0.1")),
+        latency_weight=float(os.getenv("MODEL_SELECTOR_LATENCY_WEIGHT", "0.05")),
+        quality_floor=float(os.getenv("MODEL_SELECTOR_QUALITY_FLOOR", "0.7")),
+        min_samples=int(os.getenv("MODEL_SELECTOR_MIN_SAMPLES", "20"))
+    )
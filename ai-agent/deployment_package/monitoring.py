@@ -5,11 +5,27 @@ Provides structured logging, metrics collection, and performance tracking
 import logging
 import time
 import structlog
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional
 from datetime import datetime
 from functools import wraps
 import asyncio
 
+def percentile(samples: Iterable[float], pct: float, ndigits: Optional[int] = 1) -> float:
+    """
+    Nearest-rank percentile of a window of samples (0.0 when empty)
+
+    Args:
+        samples: Samples in any order
+        pct: Fraction between 0 and 1 (0.95 for p95)
+        ndigits: Digits to round to (None returns the sample as is)
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    value = ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+    return value if ndigits is None else round(value, ndigits)
+
+
 class PerformanceMonitor:
     """
     Performance monitoring and metrics collection
@@ -27,6 +43,7 @@ class PerformanceMonitor:
             'firebase_queries': 0,
             'cache_hits': 0,
             'cache_misses': 0,
+            'negative_cache_hits': 0,
             'errors': []
         }
         
@@ -126,6 +143,17 @@ class PerformanceMonitor:
             hit_rate=self.get_cache_hit_rate()
         )
     
+    def track_negative_cache_hit(self, kind: str, key: str):
+        """Track a lookup answered by a cached "not found" (Firestore reads avoided)"""
+        self.metrics['negative_cache_hits'] += 1
+        
+        self.logger.debug(
+            "negative_cache_hit",
+            kind=kind,
+            key=key,
+            total_negative_hits=self.metrics['negative_cache_hits']
+        )
+    
     def track_error(self, error_type: str, error_message: str, context: Optional[Dict] = None):
         """Track error"""
         error_entry = {
@@ -174,7 +202,8 @@ class PerformanceMonitor:
             'cache_stats': {
                 'hits': self.metrics['cache_hits'],
                 'misses': self.metrics['cache_misses'],
-                'hit_rate': self.get_cache_hit_rate()
+                'hit_rate': self.get_cache_hit_rate(),
+                'negative_hits': self.metrics['negative_cache_hits']
             },
             'recent_errors_count': len(self.metrics['errors']),
             'last_errors': self.metrics['errors'][-5:] if self.metrics['errors'] else []
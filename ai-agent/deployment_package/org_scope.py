@@ -0,0 +1,267 @@
+"""
+Organization scope resolution for Firebase users
+
+Tokens minted before the organizationId custom claim existed still reach the
+API. For those users the organization is looked up in Firestore. The
+lookup runs off the event loop and is cached per uid. First a direct read
+of the compact uid -> organizationId mapping collection and of users/{uid}
+run in parallel; only if neither has an organization do the legacy schema
+queries (id / uid / authUid / email fields) run, concurrently, with the
+first one that finds an organization winning. A legacy hit is written back
+to the mapping collection, and backfill_org_scopes.py fills it for every
+existing user, so the legacy path is only a safety net.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from cache import CacheBackend, NegativeCache, create_cache_backend, negative_cache
+from monitoring import percentile, performance_monitor
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MAPPING_COLLECTION = os.getenv("ORG_SCOPE_COLLECTION", "user_org_scopes")
+
+# Older user document schemas stored the auth uid under one of these fields
+LEGACY_UID_FIELDS = ("id", "uid", "authUid")
+
+_SAMPLE_WINDOW = 500
+
+
+def _first_non_empty_org(docs) -> Optional[str]:
+    for candidate in docs:
+        candidate_org = (candidate.to_dict() or {}).get("organizationId")
+        if candidate_org:
+            return candidate_org
+    return None
+
+
+def _doc_org(doc) -> Optional[str]:
+    if doc is None or not doc.exists:
+        return None
+    return (doc.to_dict() or {}).get("organizationId")
+
+
+def mapping_document(organization_id: str, source: str) -> Dict[str, Any]:
+    """Body of a uid -> organizationId mapping document"""
+    return {"organizationId": organization_id, "source": source, "updatedAt": datetime.utcnow().isoformat()}
+
+
+def build_org_scope_mappings(
+    user_docs: Iterable[Tuple[str, Dict[str, Any]]],
+    auth_users: Iterable[Tuple[str, Optional[str]]] = ()
+) -> Tuple[Dict[str, Tuple[str, str]], List[str]]:
+    """
+    Derive uid -> organizationId from user documents, with the resolver's precedence
+
+    Args:
+        user_docs: (document id, data) of every users/ document
+        auth_users: (uid, email) of every Firebase Auth user, for email-only matches
+
+    Returns:
+        ({uid: (organization_id, source)}, uids whose candidates disagreed)
+    """
+    # Lower rank wins: the users/{uid} document, then each legacy field in order, then email
+    ranks = {"user_doc": 0, **{f"legacy:{field}": i + 1 for i, field in enumerate(LEGACY_UID_FIELDS)}}
+    ranks["legacy:email"] = len(ranks)
+
+    candidates: Dict[str, Dict[str, str]] = {}
+    by_email: Dict[str, str] = {}
+
+    def add(uid, organization_id: str, source: str):
+        if uid and isinstance(uid, str):
+            candidates.setdefault(uid, {}).setdefault(source, organization_id)
+
+    for doc_id, data in user_docs:
+        organization_id = (data or {}).get("organizationId")
+        if not organization_id:
+            continue
+        add(doc_id, organization_id, "user_doc")
+        for field in LEGACY_UID_FIELDS:
+            add(data.get(field), organization_id, f"legacy:{field}")
+        if data.get("email"):
+            by_email.setdefault(data["email"].lower(), organization_id)
+
+    for uid, email in auth_users:
+        if email and email.lower() in by_email:
+            add(uid, by_email[email.lower()], "legacy:email")
+
+    mappings = {}
+    conflicts = []
+    for uid, sources in candidates.items():
+        source = min(sources, key=ranks.__getitem__)
+        mappings[uid] = (sources[source], source)
+        if len(set(sources.values())) > 1:
+            conflicts.append(uid)
+    return mappings, sorted(conflicts)
+
+
+class OrgScopeResolver:
+    """Cached, parallel uid -> organizationId lookup"""
+
+    def __init__(
+        self,
+        db,
+        cache_backend: Optional[CacheBackend] = None,
+        negative: Optional[NegativeCache] = None,
+        ttl: int = 3600,
+        mapping_collection: str = MAPPING_COLLECTION
+    ):
+        """
+        Initialize resolver
+
+        Args:
+            db: Firestore client (None disables lookups)
+            cache_backend: Cache for resolved mappings (shared across workers with CACHE_BACKEND=redis)
+            negative: Negative cache for users without any organization
+            ttl: Seconds a resolved mapping is cached
+            mapping_collection: Collection of compact uid -> organizationId documents
+        """
+        self.db = db
+        self.cache = cache_backend or create_cache_backend(namespace="org_scope", default_ttl=ttl, max_entries=50000)
+        self.negative = negative
+        self.ttl = ttl
+        self.mapping_collection = mapping_collection
+        self._flight = SingleFlight("org_scope")
+        self._writes: set = set()
+
+        self._cache_hits = 0
+        self._negative_hits = 0
+        self._not_found = 0
+        self._errors = 0
+        self._resolved_by: Dict[str, int] = {}
+        self._lookup_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    async def resolve(self, uid: str, email: Optional[str] = None) -> Optional[str]:
+        """
+        Organization of a user whose token has no organizationId claim
+
+        Args:
+            uid: Firebase Auth uid
+            email: Email from the token (enables the legacy email match)
+
+        Returns:
+            Organization id, or None if the user has none (or Firestore failed)
+        """
+        organization_id = self.cache.get(uid)
+        if organization_id:
+            self._cache_hits += 1
+            return organization_id
+        if self.negative is not None and self.negative.is_missing("org_scope", uid):
+            self._negative_hits += 1
+            performance_monitor.track_negative_cache_hit("org_scope", uid)
+            return None
+        if self.db is None:
+            logger.warning(f"Unable to resolve organizationId for {uid}: Firestore is not initialized")
+            return None
+        return await self._flight.do_async(uid, lambda: self._load(uid, email))
+
+    async def _load(self, uid: str, email: Optional[str]) -> Optional[str]:
+        started = time.perf_counter()
+        organization_id, source, failed = await self._lookup(uid, email)
+        self._lookup_ms.append((time.perf_counter() - started) * 1000)
+
+        if organization_id:
+            self._resolved_by[source] = self._resolved_by.get(source, 0) + 1
+            self.cache.set(uid, organization_id, ttl=self.ttl)
+            if source.startswith("legacy:"):
+                self._write_mapping(uid, organization_id, source)
+        elif failed:
+            # Do not remember "no organization" when a query failed
+            self._errors += 1
+        else:
+            self._not_found += 1
+            if self.negative is not None:
+                self.negative.mark_missing("org_scope", uid)
+        return organization_id
+
+    async def _lookup(self, uid: str, email: Optional[str]) -> Tuple[Optional[str], Optional[str], bool]:
+        users_col = self.db.collection("users")
+        direct = await asyncio.gather(
+            asyncio.to_thread(self.db.collection(self.mapping_collection).document(uid).get),
+            asyncio.to_thread(users_col.document(uid).get),
+            return_exceptions=True
+        )
+        failed = False
+        for source, result in zip(("mapping", "user_doc"), direct):
+            if isinstance(result, Exception):
+                logger.warning(f"Unable to read {source} for {uid}: {result}")
+                failed = True
+        # The user document is authoritative when both have a value
+        for source, result in (("user_doc", direct[1]), ("mapping", direct[0])):
+            if not isinstance(result, Exception) and _doc_org(result):
+                return _doc_org(result), source, failed
+
+        queries = [(f"legacy:{field}", users_col.where(field, "==", uid)) for field in LEGACY_UID_FIELDS]
+        if email:
+            queries.append(("legacy:email", users_col.where("email", "==", email)))
+        organization_id, source, legacy_failed = await self._first_hit(queries)
+        return organization_id, source, failed or legacy_failed
+
+    async def _first_hit(self, queries) -> Tuple[Optional[str], Optional[str], bool]:
+        """Run queries concurrently; return the first organization found and stop waiting for the rest"""
+        tasks = {
+            asyncio.ensure_future(asyncio.to_thread(lambda q=query: _first_non_empty_org(q.get()))): source
+            for source, query in queries
+        }
+        failed = False
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(f"Legacy org scope query {tasks[task]} failed: {task.exception()}")
+                        failed = True
+                    elif task.result():
+                        return task.result(), tasks[task], failed
+            return None, None, failed
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _write_mapping(self, uid: str, organization_id: str, source: str):
+        """Record a legacy match in the mapping collection so it is a direct read next time"""
+        def write():
+            try:
+                self.db.collection(self.mapping_collection).document(uid).set(mapping_document(organization_id, source))
+            except Exception as e:
+                logger.warning(f"Unable to write org scope mapping for {uid}: {e}")
+
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(write))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def invalidate(self, uid: str):
+        """Forget a cached mapping (call after moving a user to another organization)"""
+        self.cache.invalidate(uid)
+        if self.negative is not None:
+            self.negative.forget("org_scope", uid)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache hits, lookup sources and lookup latency"""
+        return {
+            'cache_hits': self._cache_hits,
+            'negative_hits': self._negative_hits,
+            'lookups': sum(self._resolved_by.values()) + self._not_found + self._errors,
+            'resolved_by': dict(self._resolved_by),
+            'not_found': self._not_found,
+            'errors': self._errors,
+            'lookup_ms_p50': percentile(self._lookup_ms, 0.5),
+            'lookup_ms_p95': percentile(self._lookup_ms, 0.95)
+        }
+
+
+def create_org_scope_resolver(db) -> OrgScopeResolver:
+    """Resolver from ORG_SCOPE_* settings"""
+    return OrgScopeResolver(
+        db,
+        negative=negative_cache,
+        ttl=int(os.getenv("ORG_SCOPE_CACHE_TTL", "3600"))
+    )
@@ -0,0 +1,386 @@
+"""
+Materialized per-organization analytics summaries
+
+`org_summaries/{orgId}` holds project, risk, department and user counts
+(totals, projects by status, risks by level and status). The analytics
+endpoint and the full context tier read it instead of querying the source
+collections.
+
+The summary is kept current by OrgSummaryService in "listen" mode. It runs
+Firestore on_snapshot listeners on the four source collections and keeps one
+compact (organizationId, status, level) entry per document in memory. Each
+change adjusts the in-memory counters incrementally, and every organization
+touched by a snapshot gets its summary rewritten with absolute values. The
+writes are therefore idempotent: a second listening process produces the same
+documents rather than double counting. In "read" mode a process only reads the
+documents maintained elsewhere. reconcile() rebuilds the summaries from
+scratch and reports drift (reconcile_org_summaries.py is the CLI).
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLLECTION = os.getenv("ORG_SUMMARY_COLLECTION", "org_summaries")
+
+# Source collection -> fields whose values are counted
+TRACKED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'projects': ('status',),
+    'risks': ('level', 'status'),
+    'departments': (),
+    'users': (),
+}
+
+MODES = ("off", "read", "listen")
+_BATCH_LIMIT = 500
+
+# (organizationId, ((field, value), ...)) of one source document
+Contribution = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def contribution(collection: str, data: Optional[Dict[str, Any]]) -> Optional[Contribution]:
+    """What one source document adds to its organization's summary (None if it has no organization)"""
+    if not data or not data.get('organizationId'):
+        return None
+    values = tuple(
+        (field, str(data[field])) for field in TRACKED_FIELDS[collection] if data.get(field) is not None
+    )
+    return data['organizationId'], values
+
+
+class _OrgCounts:
+    """Running counters of one organization"""
+
+    def __init__(self):
+        self.totals: Counter = Counter()
+        self.buckets: Dict[str, Counter] = {}
+
+    def apply(self, collection: str, values, delta: int):
+        self.totals[collection] += delta
+        for field, value in values:
+            bucket = self.buckets.setdefault(f"{collection}.{field}", Counter())
+            bucket[value] += delta
+            if bucket[value] <= 0:
+                del bucket[value]
+
+    def summary(self) -> Dict[str, Any]:
+        document: Dict[str, Any] = {}
+        for collection, fields in TRACKED_FIELDS.items():
+            section: Dict[str, Any] = {'total': self.totals[collection]}
+            for field in fields:
+                section[f"by_{field}"] = dict(self.buckets.get(f"{collection}.{field}", {}))
+            document[collection] = section
+        return document
+
+
+def build_summaries(docs: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Summaries from scratch
+
+    Args:
+        docs: (source collection, document data) pairs
+
+    Returns:
+        {organization_id: summary document (without timestamps)}
+    """
+    counts: Dict[str, _OrgCounts] = {}
+    for collection, data in docs:
+        contributed = contribution(collection, data)
+        if contributed:
+            organization_id, values = contributed
+            counts.setdefault(organization_id, _OrgCounts()).apply(collection, values, 1)
+    return {organization_id: org.summary() for organization_id, org in counts.items()}
+
+
+def summary_to_analytics(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary document -> FirebaseClient.get_workspace_analytics schema"""
+    projects = summary.get('projects', {})
+    risks = summary.get('risks', {})
+    by_status = projects.get('by_status', {})
+    by_level = risks.get('by_level', {})
+    return {
+        'projects': {
+            'total': projects.get('total', 0),
+            'active': by_status.get('In Progress', 0),
+            'completed': by_status.get('Completed', 0),
+            'on_hold': by_status.get('On Hold', 0)
+        },
+        'risks': {
+            'total': risks.get('total', 0),
+            'high': by_level.get('High', 0),
+            'critical': by_level.get('Critical', 0)
+        },
+        'departments': {
+            'total': summary.get('departments', {}).get('total', 0)
+        },
+        'users': {
+            'total': summary.get('users', {}).get('total', 0)
+        }
+    }
+
+
+def summary_to_context(summary: Dict[str, Any]) -> Dict[str, int]:
+    """Summary document -> ContextManager full-tier analytics summary"""
+    return {
+        'total_projects': summary.get('projects', {}).get('total', 0),
+        'pending_risks': summary.get('risks', {}).get('by_status', {}).get('open', 0),
+        'total_users': summary.get('users', {}).get('total', 0)
+    }
+
+
+def summary_drift(stored: Optional[Dict[str, Any]], actual: Dict[str, Any]) -> List[Tuple[str, Any, Any]]:
+    """(path, stored value, actual value) for every count that differs"""
+    drift = []
+    stored = stored or {}
+    for collection, section in actual.items():
+        stored_section = stored.get(collection) or {}
+        if stored_section.get('total', 0) != section['total']:
+            drift.append((f"{collection}.total", stored_section.get('total', 0), section['total']))
+        for key, buckets in section.items():
+            if key == 'total':
+                continue
+            stored_buckets = stored_section.get(key) or {}
+            for value in sorted(set(buckets) | set(stored_buckets)):
+                if stored_buckets.get(value, 0) != buckets.get(value, 0):
+                    drift.append((f"{collection}.{key}.{value}", stored_buckets.get(value, 0), buckets.get(value, 0)))
+    return drift
+
+
+class OrgSummaryService:
+    """Serves and (in listen mode) maintains org_summaries documents"""
+
+    def __init__(self, db, mode: str = "off", collection: str = SUMMARY_COLLECTION):
+        """
+        Initialize service
+
+        Args:
+            db: Firestore client
+            mode: "off" (never used), "read" (read documents kept by another process)
+                or "listen" (run the on_snapshot listeners in this process)
+            collection: Summary collection
+        """
+        if mode not in MODES:
+            raise ValueError(f"ORG_SUMMARY_MODE must be one of {MODES}, got {mode!r}")
+        self.db = db
+        self.mode = mode
+        self.collection = collection
+        self._lock = threading.Lock()
+        # Listeners fire on separate Watch threads; commits must land in the order the counts changed
+        self._write_lock = threading.RLock()
+        self._docs: Dict[str, Dict[str, Contribution]] = {name: {} for name in TRACKED_FIELDS}
+        self._counts: Dict[str, _OrgCounts] = {}
+        self._ready: set = set()
+        self._watches = []
+
+        self._changes = 0
+        self._writes = 0
+        self._memory_reads = 0
+        self._document_reads = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off" and self.db is not None
+
+    @property
+    def ready(self) -> bool:
+        """Every listener has delivered its initial snapshot"""
+        return len(self._ready) == len(TRACKED_FIELDS)
+
+    @property
+    def live(self) -> bool:
+        """Summaries are answered from this process's listeners (no read, never stale)"""
+        return self.mode == "listen" and self.ready
+
+    # ── Listening ─────────────────────────────────────────────
+
+    def start(self):
+        """Attach the on_snapshot listeners (listen mode only)"""
+        if self.mode != "listen" or self.db is None or self._watches:
+            return
+        for name in TRACKED_FIELDS:
+            self._watches.append(self.db.collection(name).on_snapshot(self._listener(name)))
+        logger.info(f"Org summary listeners started on {', '.join(TRACKED_FIELDS)}")
+
+    def stop(self):
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Unable to stop org summary listener: {e}")
+        self._watches = []
+
+    def _listener(self, name: str):
+        def on_snapshot(snapshot, changes, read_time):
+            try:
+                self.apply_changes(
+                    name,
+                    [(change.document.id, None if change.type.name == 'REMOVED' else change.document.to_dict())
+                     for change in changes]
+                )
+            except Exception as e:
+                logger.error(f"Org summary listener on {name} failed: {e}")
+        return on_snapshot
+
+    def apply_changes(self, name: str, changes: Iterable[Tuple[str, Optional[Dict[str, Any]]]]):
+        """
+        Apply one snapshot's document changes and write the touched summaries
+
+        Args:
+            name: Source collection
+            changes: (document id, data after the change; None when removed)
+        """
+        touched = set()
+        with self._lock:
+            known = self._docs[name]
+            for doc_id, data in changes:
+                before = known.get(doc_id)
+                after = contribution(name, data)
+                if before == after:
+                    continue
+                if before:
+                    self._counts[before[0]].apply(name, before[1], -1)
+                    touched.add(before[0])
+                    del known[doc_id]
+                if after:
+                    self._counts.setdefault(after[0], _OrgCounts()).apply(name, after[1], 1)
+                    touched.add(after[0])
+                    known[doc_id] = after
+                self._changes += 1
+
+            was_ready = self.ready
+            self._ready.add(name)
+            if not self.ready:
+                return
+            if not was_ready:
+                # Initial snapshots are complete: (re)write every organization once
+                touched = set(self._counts)
+        self._write_current(touched)
+
+    def _write_current(self, organization_ids: Iterable[str]):
+        """Write the latest counts of organizations, summarized just before the commit"""
+        with self._write_lock:
+            # A summary computed before waiting for the lock could be older than one committed meanwhile
+            with self._lock:
+                summaries = {organization_id: self._counts[organization_id].summary()
+                             for organization_id in organization_ids}
+            self._write(summaries)
+
+    def _write(self, summaries: Dict[str, Dict[str, Any]]):
+        with self._write_lock:
+            now = datetime.utcnow().isoformat()
+            items = list(summaries.items())
+            for start in range(0, len(items), _BATCH_LIMIT):
+                batch = self.db.batch()
+                for organization_id, summary in items[start:start + _BATCH_LIMIT]:
+                    batch.set(self.db.collection(self.collection).document(organization_id),
+                              {**summary, 'updatedAt': now})
+                batch.commit()
+                self._writes += len(items[start:start + _BATCH_LIMIT])
+
+    # ── Reading ───────────────────────────────────────────────
+
+    def get_summary(self, organization_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current summary of an organization
+
+        Listening processes answer from memory; others read one document.
+
+        Returns:
+            Summary document, or None when disabled or not yet materialized
+        """
+        if not self.enabled:
+            return None
+        if self.live:
+            with self._lock:
+                counts = self._counts.get(organization_id)
+                summary = counts.summary() if counts else _OrgCounts().summary()
+            self._memory_reads += 1
+            return summary
+        try:
+            doc = self.db.collection(self.collection).document(organization_id).get()
+        except Exception as e:
+            logger.warning(f"Unable to read org summary for {organization_id}: {e}")
+            doc = None
+        if doc is None or not doc.exists:
+            self._misses += 1
+            return None
+        self._document_reads += 1
+        return doc.to_dict()
+
+    def workspace_analytics(self, organization_id: str) -> Optional[Dict[str, Any]]:
+        summary = self.get_summary(organization_id)
+        return summary_to_analytics(summary) if summary is not None else None
+
+    def workspace_summary(self, organization_id: str) -> Optional[Dict[str, int]]:
+        summary = self.get_summary(organization_id)
+        return summary_to_context(summary) if summary is not None else None
+
+    # ── Reconciliation ────────────────────────────────────────
+
+    def rebuild(self, organization_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Summaries recomputed from the source collections (one organization or all)"""
+        def docs():
+            for name, fields in TRACKED_FIELDS.items():
+                query = self.db.collection(name)
+                if organization_id:
+                    query = query.where('organizationId', '==', organization_id)
+                for doc in query.select(['organizationId', *fields]).stream():
+                    yield name, doc.to_dict()
+
+        summaries = build_summaries(docs())
+        if organization_id and organization_id not in summaries:
+            summaries[organization_id] = _OrgCounts().summary()
+        return summaries
+
+    def reconcile(self, organization_id: Optional[str] = None, apply: bool = True) -> Dict[str, Any]:
+        """
+        Rebuild summaries from scratch and report drift from the stored documents
+
+        Args:
+            organization_id: Limit to one organization (default: all)
+            apply: Overwrite drifted documents with the rebuilt counts
+
+        Returns:
+            {'organizations': checked, 'drifted': {organization_id: [(path, stored, actual), ...]}, 'written': n}
+        """
+        actual = self.rebuild(organization_id)
+        summaries = self.db.collection(self.collection)
+        if organization_id:
+            doc = summaries.document(organization_id).get()
+            stored = {organization_id: doc.to_dict()} if doc.exists else {}
+        else:
+            stored = {doc.id: doc.to_dict() for doc in summaries.stream()}
+            for stale_org in set(stored) - set(actual):
+                actual[stale_org] = _OrgCounts().summary()
+
+        drifted = {}
+        for org_id, summary in actual.items():
+            drift = summary_drift(stored.get(org_id), summary)
+            if drift or org_id not in stored:
+                drifted[org_id] = drift
+        if apply and drifted:
+            self._write({org_id: actual[org_id] for org_id in drifted})
+        return {'organizations': len(actual), 'drifted': drifted, 'written': len(drifted) if apply else 0}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'listening': bool(self._watches),
+            'ready': self.ready,
+            'organizations': len(self._counts),
+            'changes_applied': self._changes,
+            'summaries_written': self._writes,
+            'memory_reads': self._memory_reads,
+            'document_reads': self._document_reads,
+            'misses': self._misses
+        }
+
+
+def create_org_summary_service(db) -> OrgSummaryService:
+    """Service from ORG_SUMMARY_MODE (off | read | listen, default off)"""
+    return OrgSummaryService(db, mode=os.getenv("ORG_SUMMARY_MODE", "off").lower())
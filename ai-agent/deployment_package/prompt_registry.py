@@ -0,0 +1,156 @@
+"""
+Precompiled specialist prompt registry
+
+Every specialist system prompt is built once at import, in a full variant
+and a compact variant (trimmed formatting skill), and its token count is
+recorded. The compact variant is served automatically to small models and
+to requests whose prompt budget the full variant would crowd out.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import logging
+import os
+
+from specialist_prompts import (
+    get_compliance_specialist_prompt,
+    get_risk_assessment_specialist_prompt,
+    get_training_specialist_prompt,
+    get_general_agent_prompt
+)
+from token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Models that get the compact variant regardless of budget
+COMPACT_MODELS = frozenset(
+    model.strip()
+    for model in os.getenv("PROMPT_COMPACT_MODELS", "llama-3.1-8b-instant").split(",")
+    if model.strip()
+)
+
+# Serve the compact variant when the full one would take more than this
+# share of the request's prompt budget
+COMPACT_BUDGET_SHARE = 0.5
+
+
+@dataclass(frozen=True)
+class PromptVariant:
+    """One built prompt with its version and token cost"""
+    text: str
+    version: str
+    tokens: int
+
+    @classmethod
+    def build(cls, text: str) -> 'PromptVariant':
+        return cls(
+            text=text,
+            version=hashlib.sha256(text.encode('utf-8')).hexdigest()[:12],
+            tokens=estimate_tokens(text)
+        )
+
+
+class PromptRegistry:
+    """Named prompts built once, with usage counters per variant"""
+
+    def __init__(self):
+        self._prompts: Dict[str, Dict[str, PromptVariant]] = {}
+        self._served: Dict[str, Dict[str, int]] = {}
+
+    def register(self, name: str, builder: Callable[[bool], str]):
+        """
+        Build and store both variants of a prompt
+
+        Args:
+            name: Prompt name (task type)
+            builder: Function returning the prompt, taking compact as its argument
+        """
+        self._prompts[name] = {
+            'full': PromptVariant.build(builder(False)),
+            'compact': PromptVariant.build(builder(True))
+        }
+        self._served[name] = {'full': 0, 'compact': 0}
+
+    def select_variant(self, name: str, model: Optional[str] = None,
+                       max_prompt_tokens: Optional[int] = None) -> str:
+        """Pick 'compact' for small models or a budget the full prompt would crowd out"""
+        if model in COMPACT_MODELS:
+            return 'compact'
+        full = self._prompts[name]['full']
+        if max_prompt_tokens is not None and full.tokens > max_prompt_tokens * COMPACT_BUDGET_SHARE:
+            return 'compact'
+        return 'full'
+
+    def get(self, name: str, model: Optional[str] = None, max_prompt_tokens: Optional[int] = None) -> str:
+        """
+        Get a prebuilt prompt
+
+        Args:
+            name: Prompt name; unknown names fall back to 'general'
+            model: Model the prompt is sent to
+            max_prompt_tokens: Token budget of the request's prompt
+
+        Returns:
+            Prompt text
+        """
+        if name not in self._prompts:
+            name = 'general'
+        variant = self.select_variant(name, model, max_prompt_tokens)
+        self._served[name][variant] += 1
+        return self._prompts[name][variant].text
+
+    def adapt_messages(self, messages: List[Dict[str, str]], model: str) -> List[Dict[str, str]]:
+        """
+        Swap full prompts for compact ones in system messages bound for a small model
+
+        Used when a request is retried on the fallback model after its messages
+        were built; context appended after the prompt is kept.
+        """
+        if model not in COMPACT_MODELS:
+            return messages
+        adapted = []
+        for message in messages:
+            content = message.get('content') or ''
+            if message.get('role') == 'system':
+                for name, variants in self._prompts.items():
+                    full = variants['full'].text
+                    if content.startswith(full):
+                        content = variants['compact'].text + content[len(full):]
+                        # The rejected attempt with the full prompt was not billed
+                        self._served[name]['compact'] += 1
+                        self._served[name]['full'] = max(self._served[name]['full'] - 1, 0)
+                        break
+            adapted.append({**message, 'content': content})
+        return adapted
+
+    def get_report(self) -> Dict[str, Any]:
+        """Prompt-token cost per specialist, with tokens sent so far"""
+        report = {}
+        for name, variants in sorted(self._prompts.items()):
+            full, compact = variants['full'], variants['compact']
+            served = self._served[name]
+            report[name] = {
+                'version': full.version,
+                'compact_version': compact.version,
+                'full_tokens': full.tokens,
+                'compact_tokens': compact.tokens,
+                'compact_savings_pct': round((1 - compact.tokens / full.tokens) * 100, 1) if full.tokens else 0.0,
+                'served_full': served['full'],
+                'served_compact': served['compact'],
+                'prompt_tokens_sent': served['full'] * full.tokens + served['compact'] * compact.tokens
+            }
+        return {'compact_models': sorted(COMPACT_MODELS), 'prompts': report}
+
+
+def build_default_registry() -> PromptRegistry:
+    """Registry of the specialist prompts, keyed by task type"""
+    registry = PromptRegistry()
+    registry.register('compliance', get_compliance_specialist_prompt)
+    registry.register('risk', get_risk_assessment_specialist_prompt)
+    registry.register('training', get_training_specialist_prompt)
+    registry.register('general', get_general_agent_prompt)
+    return registry
+
+
+# Global registry instance, built once at startup
+prompt_registry = build_default_registry()
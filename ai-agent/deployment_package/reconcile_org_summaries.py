@@ -0,0 +1,49 @@
+"""
+Rebuild org_summaries documents from scratch and report drift
+
+Streams projects, risks, departments and users (projected to the counted
+fields), recomputes every organization's summary, and compares it with the
+stored document. Drifted or missing summaries are rewritten unless --dry-run
+is given. Run it after enabling ORG_SUMMARY_MODE=listen for the first time,
+and periodically (e.g. nightly) to catch anything the listener missed.
+
+Usage:
+    python reconcile_org_summaries.py [--org ORG_ID] [--dry-run]
+"""
+
+import argparse
+import sys
+
+from firebase_client import firebase_client
+from org_summary_service import SUMMARY_COLLECTION, OrgSummaryService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--org", help="reconcile a single organization")
+    parser.add_argument("--collection", default=SUMMARY_COLLECTION)
+    parser.add_argument("--dry-run", action="store_true", help="report drift without rewriting summaries")
+    args = parser.parse_args()
+
+    service = OrgSummaryService(firebase_client.db, mode="read", collection=args.collection)
+    print("=" * 72)
+    print(f"ORG SUMMARY RECONCILIATION -> {args.collection}{' (dry run)' if args.dry_run else ''}")
+    print("=" * 72)
+    report = service.reconcile(organization_id=args.org, apply=not args.dry_run)
+
+    for organization_id, drift in sorted(report["drifted"].items()):
+        if not drift:
+            print(f"{organization_id}: summary missing")
+            continue
+        print(f"{organization_id}:")
+        for path, stored, actual in drift:
+            print(f"  {path:<36} stored {stored:>8}  actual {actual:>8}  ({actual - stored:+d})")
+    print("-" * 72)
+    print(f"Organizations checked: {report['organizations']}, drifted or missing: {len(report['drifted'])}, "
+          f"rewritten: {report['written']}")
+    # Non-zero exit lets a scheduled job alert on drift
+    sys.exit(1 if report["drifted"] else 0)
+
+
+if __name__ == "__main__":
+    main()
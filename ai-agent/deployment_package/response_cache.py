@@ -0,0 +1,139 @@
+"""
+Tenant- and context-aware cache for chat responses
+
+Keys combine the normalized message with the task type, organization,
+context tier and a fingerprint of the context the prompt was built from,
+so a cached answer is only reused for the same question asked against the
+same data inside the same organization.
+"""
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import re
+import zlib
+
+from cache import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+# Context fields that change on every load without changing the answer
+_VOLATILE_CONTEXT_KEYS = frozenset({'timestamp', 'thread_id', 'request_id'})
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.]+$')
+
+
+def normalize_message(message: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    normalized = _WHITESPACE.sub(' ', message.strip().lower())
+    return _TRAILING_PUNCTUATION.sub('', normalized)
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in _VOLATILE_CONTEXT_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def context_fingerprint(context: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of the data a prompt was built from"""
+    if not context:
+        return 'none'
+    canonical = json.dumps(_strip_volatile(context), sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    LLM response cache on top of a CacheBackend
+
+    Eviction is the backend's O(1) LRU. Responses are zlib-compressed in
+    process memory; the Redis backend already compresses on the wire.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int = 600):
+        """
+        Initialize response cache
+
+        Args:
+            backend: Cache backend holding the responses
+            ttl: Seconds a response may be reused
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self._compress = not getattr(backend, 'shared', False)
+        self._by_task: Dict[str, Dict[str, int]] = {}
+
+    def make_key(
+        self,
+        message: str,
+        task_type: str,
+        organization_id: Optional[str],
+        context_tier: Optional[str],
+        context: Optional[Dict[str, Any]]
+    ) -> str:
+        """
+        Build the cache key for a chat request
+
+        Args:
+            message: Raw user message
+            task_type: Routed task type (compliance, risk, training, general)
+            organization_id: Tenant scope ("" when unknown)
+            context_tier: minimal/standard/full, or None for lightweight requests
+            context: Context the prompt is built from
+        """
+        message_hash = hashlib.sha256(normalize_message(message).encode('utf-8')).hexdigest()
+        return ':'.join((
+            organization_id or 'anon',
+            task_type,
+            context_tier or 'none',
+            context_fingerprint(context),
+            message_hash
+        ))
+
+    def _count(self, task_type: str, field: str):
+        counters = self._by_task.setdefault(task_type, {'hits': 0, 'misses': 0, 'stores': 0})
+        counters[field] += 1
+
+    def get(self, key: str, task_type: str) -> Optional[str]:
+        """Return the cached response for a key, counting the hit/miss under its task type"""
+        value = self.backend.get(key)
+        if value is None:
+            self._count(task_type, 'misses')
+            return None
+        self._count(task_type, 'hits')
+        if isinstance(value, bytes):
+            value = zlib.decompress(value).decode('utf-8')
+        return value
+
+    def set(self, key: str, task_type: str, response: str, organization_id: Optional[str] = None):
+        """Store a complete response (empty responses are not cached)"""
+        if not response:
+            return
+        value = zlib.compress(response.encode('utf-8'), 6) if self._compress else response
+        tags = [f"org:{organization_id}"] if organization_id else None
+        if self.backend.set(key, value, ttl=self.ttl, tags=tags):
+            self._count(task_type, 'stores')
+
+    def invalidate_org(self, organization_id: str):
+        """Drop every cached response for an organization"""
+        self.backend.invalidate_tag(f"org:{organization_id}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-task-type hit/miss counters and backend stats"""
+        by_task = {}
+        for task_type, counters in sorted(self._by_task.items()):
+            lookups = counters['hits'] + counters['misses']
+            by_task[task_type] = {
+                **counters,
+                'hit_rate': round(counters['hits'] / lookups * 100, 2) if lookups else 0.0
+            }
+        return {
+            'ttl': self.ttl,
+            'compressed': self._compress,
+            'by_task_type': by_task,
+            'backend': self.backend.get_stats()
+        }
@@ -0,0 +1,347 @@
+"""
+Semantic near-duplicate cache for chat responses (opt-in)
+
+Accreditation questions repeat with small wording changes ("how do I
+prepare for JCI survey" vs "JCI survey preparation steps"), which an exact
+hash never matches. Messages are embedded locally, with no embedding API,
+as hashed word + character n-gram TF-IDF vectors; each organization keeps
+one matrix of L2-normalized rows and a lookup is a single matrix-vector
+product followed by a top-1 cosine check against a threshold.
+
+Enable with SEMANTIC_CACHE_ENABLED=true.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Filler words that carry no meaning for matching accreditation questions
+_STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'for', 'in', 'on', 'at', 'by',
+    'is', 'are', 'be', 'do', 'does', 'i', 'we', 'my', 'our', 'me', 'you',
+    'how', 'what', 'can', 'should', 'please', 'with', 'about'
+})
+
+
+class HashedNgramVectorizer:
+    """
+    Stateless text -> hashed feature indices
+
+    Features are word unigrams plus character n-grams of each word (with
+    boundary markers), hashed with CRC32 into a fixed number of buckets so
+    vectors are stable across processes and restarts.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (3, 5)):
+        """
+        Initialize vectorizer
+
+        Args:
+            dim: Number of hash buckets (vector width)
+            ngram_range: Inclusive character n-gram lengths
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def features(self, text: str) -> np.ndarray:
+        """Hashed feature index for every word and character n-gram in text"""
+        low, high = self.ngram_range
+        grams: List[str] = []
+        for word in _TOKEN.findall(text.lower()):
+            if word in _STOP_WORDS:
+                continue
+            grams.append(word)
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) % self.dim for gram in grams),
+            dtype=np.int32,
+            count=len(grams)
+        )
+
+    def term_frequencies(self, indices: np.ndarray) -> np.ndarray:
+        """Sublinear (1 + log tf) term-frequency vector for feature indices"""
+        counts = np.bincount(indices, minlength=self.dim).astype(np.float32)
+        nonzero = counts > 0
+        counts[nonzero] = 1.0 + np.log(counts[nonzero])
+        return counts
+
+
+class _OrgIndex:
+    """One organization's vectors, responses and document frequencies"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.features: List[np.ndarray] = []
+        self.responses: List[str] = []
+        self.scopes: List[str] = []
+        # Row buffers grow by doubling; only the first `size` rows are live
+        self.size = 0
+        self.expires_at = np.zeros(0, dtype=np.float64)
+        self.scope_ids = np.zeros(0, dtype=np.int32)
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.fitted_size = 0
+        self.scope_table: Dict[str, int] = {}
+
+
+class SemanticCache:
+    """
+    Per-organization near-duplicate response cache
+
+    Entries only match within the same scope (task type, context tier and
+    context fingerprint), so an answer built from one user's data is never
+    served against another user's context. IDF weights are refit from the
+    organization's cached messages whenever the index has grown by a
+    quarter since the last fit; rows added in between use the current IDF.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.80,
+        ttl: int = 3600,
+        max_entries_per_org: int = 5000,
+        max_orgs: int = 500,
+        dim: int = 1024
+    ):
+        """
+        Initialize semantic cache
+
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds a cached response may be reused
+            max_entries_per_org: Oldest entries are dropped beyond this
+            max_orgs: Least recently used organizations are dropped beyond this
+            dim: Hashed feature width
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_org = max_entries_per_org
+        self.max_orgs = max_orgs
+        self.vectorizer = HashedNgramVectorizer(dim=dim)
+        self._orgs: Dict[str, _OrgIndex] = {}
+        self._orgs_lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._lookup_seconds = 0.0
+        self._similarity_sum = 0.0
+
+    def _index(self, organization_id: str, create: bool) -> Optional[_OrgIndex]:
+        with self._orgs_lock:
+            index = self._orgs.pop(organization_id, None)
+            if index is None:
+                if not create:
+                    return None
+                index = _OrgIndex(self.vectorizer.dim, self.max_entries_per_org)
+                while len(self._orgs) >= self.max_orgs:
+                    self._orgs.pop(next(iter(self._orgs)))
+            # Re-insert to keep organizations in LRU order
+            self._orgs[organization_id] = index
+            return index
+
+    def _embed(self, index: _OrgIndex, features: np.ndarray) -> np.ndarray:
+        vector = self.vectorizer.term_frequencies(features) * index.idf
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _refit(self, index: _OrgIndex, now: float):
+        """Drop expired entries, recompute IDF and rebuild the normalized matrix"""
+        keep = [i for i in range(len(index.features)) if index.expires_at[i] > now]
+        index.features = [index.features[i] for i in keep]
+        index.responses = [index.responses[i] for i in keep]
+        index.scopes = [index.scopes[i] for i in keep]
+        index.expires_at = index.expires_at[keep]
+        index.scope_table = {}
+        index.scope_ids = np.fromiter(
+            (index.scope_table.setdefault(scope, len(index.scope_table)) for scope in index.scopes),
+            dtype=np.int32,
+            count=len(index.scopes)
+        )
+
+        size = len(index.features)
+        index.doc_freq = np.zeros(self.vectorizer.dim, dtype=np.float32)
+        for features in index.features:
+            index.doc_freq[np.unique(features)] += 1
+        index.idf = (np.log((1.0 + size) / (1.0 + index.doc_freq)) + 1.0).astype(np.float32)
+
+        matrix = np.zeros((size, self.vectorizer.dim), dtype=np.float32)
+        for row, features in enumerate(index.features):
+            matrix[row] = self._embed(index, features)
+        index.matrix = matrix
+        index.size = index.fitted_size = size
+
+    @staticmethod
+    def _grow(index: _OrgIndex):
+        """Make room for one more row (amortized O(1) appends)"""
+        allocated = len(index.expires_at)
+        if index.size < allocated:
+            return
+        rows = max(8, allocated * 2)
+        matrix = np.zeros((rows, index.matrix.shape[1]), dtype=np.float32)
+        matrix[:index.size] = index.matrix[:index.size]
+        expires_at = np.zeros(rows, dtype=np.float64)
+        expires_at[:index.size] = index.expires_at[:index.size]
+        scope_ids = np.zeros(rows, dtype=np.int32)
+        scope_ids[:index.size] = index.scope_ids[:index.size]
+        index.matrix, index.expires_at, index.scope_ids = matrix, expires_at, scope_ids
+
+    def lookup(self, organization_id: str, scope: str, message: str) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar cached message in the same org and scope
+
+        Args:
+            organization_id: Tenant whose matrix is searched
+            scope: Match partition (task type, context tier, context fingerprint)
+            message: Incoming user message
+
+        Returns:
+            (cached response, cosine similarity) above the threshold, or None
+        """
+        start = time.perf_counter()
+        try:
+            index = self._index(organization_id, create=False)
+            if index is None:
+                self._misses += 1
+                return None
+
+            with index.lock:
+                scope_id = index.scope_table.get(scope)
+                if scope_id is None or not index.size:
+                    self._misses += 1
+                    return None
+
+                size = index.size
+                query = self._embed(index, self.vectorizer.features(message))
+                scores = index.matrix[:size] @ query
+                scores[index.scope_ids[:size] != scope_id] = -1.0
+                scores[index.expires_at[:size] <= time.time()] = -1.0
+                best = int(np.argmax(scores))
+                similarity = float(scores[best])
+
+                if similarity < self.threshold:
+                    self._misses += 1
+                    return None
+
+                self._hits += 1
+                self._similarity_sum += similarity
+                return index.responses[best], similarity
+        finally:
+            self._lookup_seconds += time.perf_counter() - start
+
+    def add(self, organization_id: str, scope: str, message: str, response: str):
+        """
+        Cache a response under its message's vector
+
+        Args:
+            organization_id: Tenant owning the entry
+            scope: Match partition (task type, context tier, context fingerprint)
+            message: User message the response answers
+            response: Complete response text
+        """
+        if not response:
+            return
+        features = self.vectorizer.features(message)
+        if not len(features):
+            return
+
+        index = self._index(organization_id, create=True)
+        now = time.time()
+        with index.lock:
+            if index.size >= index.capacity:
+                # Drop the oldest tenth in one rebuild instead of one row at a time
+                drop = max(1, index.capacity // 10)
+                index.expires_at[:drop] = 0.0
+                self._refit(index, now)
+
+            self._grow(index)
+            row = index.size
+            index.features.append(features)
+            index.responses.append(response)
+            index.scopes.append(scope)
+            index.expires_at[row] = now + self.ttl
+            index.scope_ids[row] = index.scope_table.setdefault(scope, len(index.scope_table))
+            index.size += 1
+
+            if index.size >= max(8, math.ceil(index.fitted_size * 1.25)):
+                self._refit(index, now)
+            else:
+                index.matrix[row] = self._embed(index, features)
+
+    def bulk_load(self, organization_id: str, items: List[Tuple[str, str, str]]):
+        """
+        Load many (scope, message, response) entries with a single refit
+
+        Used for warm-up and benchmarks; add() refits as the index grows.
+        """
+        index = self._index(organization_id, create=True)
+        now = time.time()
+        with index.lock:
+            expires_at = list(index.expires_at[:index.size])
+            for scope, message, response in items[-index.capacity:]:
+                features = self.vectorizer.features(message)
+                if not len(features) or not response:
+                    continue
+                index.features.append(features)
+                index.responses.append(response)
+                index.scopes.append(scope)
+                expires_at.append(now + self.ttl)
+            overflow = len(index.features) - index.capacity
+            if overflow > 0:
+                del index.features[:overflow], index.responses[:overflow], index.scopes[:overflow]
+                del expires_at[:overflow]
+            index.expires_at = np.array(expires_at, dtype=np.float64)
+            self._refit(index, now)
+
+    def invalidate_org(self, organization_id: str):
+        """Drop an organization's whole index"""
+        with self._orgs_lock:
+            self._orgs.pop(organization_id, None)
+
+    def clear(self):
+        """Drop every index"""
+        with self._orgs_lock:
+            self._orgs.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate, lookup latency and per-organization sizes"""
+        lookups = self._hits + self._misses
+        with self._orgs_lock:
+            sizes = {org_id: index.size for org_id, index in self._orgs.items()}
+        return {
+            'threshold': self.threshold,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups * 100, 2) if lookups else 0.0,
+            'avg_similarity_on_hit': round(self._similarity_sum / self._hits, 4) if self._hits else 0.0,
+            'avg_lookup_ms': round(self._lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+            'organizations': len(sizes),
+            'entries': sum(sizes.values()),
+            'entries_by_organization': sizes
+        }
+
+
+def create_semantic_cache() -> Optional[SemanticCache]:
+    """Build the semantic cache when SEMANTIC_CACHE_ENABLED=true, else None"""
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    return SemanticCache(
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.80")),
+        ttl=int(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+        max_entries_per_org=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES_PER_ORG", "5000")),
+        max_orgs=int(os.getenv("SEMANTIC_CACHE_MAX_ORGS", "500")),
+        dim=int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+    )
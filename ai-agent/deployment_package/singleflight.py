@@ -0,0 +1,166 @@
+"""
+Single-flight request coalescing for cache misses
+
+When several callers miss the cache for the same key at the same time
+(dashboard fan-out, thundering herd after a TTL expiry), only the first one
+runs the loader; the others wait for it and share its result.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import threading
+import weakref
+
+
+class _Call:
+    """One in-flight load shared by a leader and its waiters"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _AsyncCall:
+    """One in-flight load task and the number of coroutines awaiting it"""
+
+    __slots__ = ('task', 'callers')
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.callers = 1
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent loads of the same key into a single call
+
+    do() coalesces across threads (sync Firebase calls running in a thread
+    pool); do_async() coalesces coroutines on the event loop.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize single-flight group
+
+        Args:
+            name: Label used in metrics (e.g. "firebase_client")
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _AsyncCall] = {}
+
+        self._leaders = 0
+        self._coalesced = 0
+        self._errors = 0
+        self._max_waiters = 0
+
+        _registry.add(self)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers using the same key
+
+        Args:
+            key: Identity of the load (usually the cache key)
+            fn: Loader executed by the first caller only
+
+        Returns:
+            The loader's result (re-raises its exception for every caller)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn once for all concurrent coroutines using the same key
+
+        The load runs as its own task that every caller awaits through
+        asyncio.shield, so a cancelled caller (leader included) just stops
+        waiting. The load is cancelled only when no caller is left.
+
+        Args:
+            key: Identity of the load (usually the cache key)
+            fn: Coroutine factory executed by the first caller only
+
+        Returns:
+            The loader's result (re-raises its exception for every caller)
+        """
+        call = self._async_calls.get(key)
+        if call is not None:
+            call.callers += 1
+            self._coalesced += 1
+            self._max_waiters = max(self._max_waiters, call.callers - 1)
+        else:
+            call = _AsyncCall(asyncio.ensure_future(fn()))
+            self._async_calls[key] = call
+            self._leaders += 1
+            call.task.add_done_callback(lambda task: self._finish_async(key, call))
+
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            call.callers -= 1
+            if call.callers == 0 and not call.task.done():
+                call.task.cancel()
+            raise
+
+    def _finish_async(self, key: str, call: _AsyncCall):
+        if self._async_calls.get(key) is call:
+            del self._async_calls[key]
+        # Reading the exception also marks it retrieved, so a failure nobody awaited is not logged as lost
+        if not call.task.cancelled() and call.task.exception() is not None:
+            self._errors += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        loads = self._leaders + self._coalesced
+        return {
+            'name': self.name,
+            'loads_executed': self._leaders,
+            'coalesced_waiters': self._coalesced,
+            'max_waiters_per_load': self._max_waiters,
+            'coalesce_rate': round(self._coalesced / loads * 100, 2) if loads else 0.0,
+            'in_flight': len(self._calls) + len(self._async_calls),
+            'errors': self._errors
+        }
+
+
+_registry: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+def get_single_flight_stats() -> List[Dict[str, Any]]:
+    """Stats for every live single-flight group (exposed on /metrics)"""
+    return sorted((group.get_stats() for group in list(_registry)), key=lambda s: s['name'])
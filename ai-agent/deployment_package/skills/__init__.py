@@ -9,9 +9,10 @@ Available Skills:
 - markdown_formatting: Response formatting guidelines
 """
 
-from .markdown_formatting import get_markdown_formatting_skill, MARKDOWN_FORMATTING_SKILL
+from .markdown_formatting import get_markdown_formatting_skill, MARKDOWN_FORMATTING_SKILL, MARKDOWN_FORMATTING_SKILL_COMPACT
 
 __all__ = [
     'get_markdown_formatting_skill',
-    'MARKDOWN_FORMATTING_SKILL'
+    'MARKDOWN_FORMATTING_SKILL',
+    'MARKDOWN_FORMATTING_SKILL_COMPACT'
 ]
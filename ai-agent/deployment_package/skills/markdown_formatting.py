@@ -145,10 +145,24 @@ Before sending any response, verify:
 > **Remember**: Markdown formatting is not optional. It's essential for user comprehension and professional presentation.
 """
 
+# Trimmed variant for small models and tight prompt budgets: the same rules
+# without the worked examples and checklist
+MARKDOWN_FORMATTING_SKILL_COMPACT = """
+---
+## RESPONSE FORMAT (MANDATORY)
+Format every response in Markdown:
+- Open with a ## heading and a short overview; use ### for subsections
+- **Bold** key terms, priorities and risk levels; `code` for standard references (e.g. `CBAHI 4.2.1`)
+- Numbered lists for steps, bullets for items; tables for structured data
+- > Blockquotes for warnings and critical notes
+- Blank lines between sections; be specific, no walls of text
+- End with clear next steps
+"""
+
 # Markdown formatting rules for integration
-def get_markdown_formatting_skill() -> str:
-    """Returns the markdown formatting skill content"""
-    return MARKDOWN_FORMATTING_SKILL
+def get_markdown_formatting_skill(compact: bool = False) -> str:
+    """Returns the markdown formatting skill content (trimmed variant if compact)"""
+    return MARKDOWN_FORMATTING_SKILL_COMPACT if compact else MARKDOWN_FORMATTING_SKILL
 
 # Quick reference for common patterns
 MARKDOWN_QUICK_REFERENCE = {
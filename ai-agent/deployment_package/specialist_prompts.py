@@ -30,7 +30,7 @@ TASK_ROUTING_MAP = {
     ]
 }
 
-def get_compliance_specialist_prompt() -> str:
+def get_compliance_specialist_prompt(compact: bool = False) -> str:
     """System prompt for compliance checking tasks"""
     base_prompt = """
 You are the AccreditEx Compliance Specialist, an expert CBAHI/JCI compliance auditor.
@@ -75,11 +75,11 @@ TONE: Professional, precise, and supportive. Balance strictness with encourageme
 """
     
     # Append markdown formatting skill
-    return base_prompt + "\n\n" + get_markdown_formatting_skill()
+    return base_prompt + "\n\n" + get_markdown_formatting_skill(compact)
 
 
 
-def get_risk_assessment_specialist_prompt() -> str:
+def get_risk_assessment_specialist_prompt(compact: bool = False) -> str:
     """System prompt for risk assessment tasks"""
     base_prompt = """
 You are the AccreditEx Risk Assessment Specialist, a healthcare risk management expert.
@@ -145,9 +145,9 @@ TONE: Analytical, systematic, and action-oriented. Focus on practical solutions.
 > **Key Principle**: Every identified risk must have a proposed mitigation strategy.
 """
     
-    return base_prompt + "\n\n" + get_markdown_formatting_skill()
+    return base_prompt + "\n\n" + get_markdown_formatting_skill(compact)
 
-def get_training_specialist_prompt() -> str:
+def get_training_specialist_prompt(compact: bool = False) -> str:
     """System prompt for training coordination tasks"""
     base_prompt = """
 You are the AccreditEx Training Coordinator, a healthcare education and competency development expert.
@@ -209,9 +209,9 @@ TONE: Supportive, practical, and motivating. Focus on achievable goals.
 > **Remember**: Effective training directly improves patient safety and compliance rates.
 """
     
-    return base_prompt + "\n\n" + get_markdown_formatting_skill()
+    return base_prompt + "\n\n" + get_markdown_formatting_skill(compact)
 
-def get_general_agent_prompt() -> str:
+def get_general_agent_prompt(compact: bool = False) -> str:
     """Fallback general purpose prompt"""
     base_prompt = """
 You are the AccreditEx AI Agent, an expert healthcare accreditation consultant.
@@ -232,5 +232,5 @@ TONE AND STYLE:
 > **Important**: Always be specific and reference actual standards when possible.
 """
     
-    return base_prompt + "\n\n" + get_markdown_formatting_skill()
+    return base_prompt + "\n\n" + get_markdown_formatting_skill(compact)
 
@@ -0,0 +1,197 @@
+"""
+Stale-while-revalidate caching
+
+Values are stored with a freshness deadline and a staleness bound:
+- fresh: served straight from cache
+- stale (within the namespace's max staleness): served immediately while a
+  background task reloads it, so the request does not pay the Firestore
+  round-trips
+- older than the bound, or missing: loaded inline (through single-flight)
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class StalenessPolicy(NamedTuple):
+    """Freshness and maximum staleness (seconds) for one cache namespace"""
+
+    fresh_ttl: int
+    max_stale: int
+
+    @classmethod
+    def from_env(cls, namespace: str, fresh_ttl: int, max_stale: int) -> "StalenessPolicy":
+        """
+        Build a policy, allowing SWR_<NAMESPACE>_FRESH_TTL / _MAX_STALE overrides
+
+        Args:
+            namespace: Cache namespace (e.g. "user_context")
+            fresh_ttl: Default seconds a value is served without refresh
+            max_stale: Default extra seconds a stale value may still be served
+        """
+        prefix = f"SWR_{namespace.upper()}"
+        return cls(
+            fresh_ttl=int(os.getenv(f"{prefix}_FRESH_TTL", fresh_ttl)),
+            max_stale=int(os.getenv(f"{prefix}_MAX_STALE", max_stale))
+        )
+
+    @property
+    def storage_ttl(self) -> int:
+        """How long the backend must keep the entry"""
+        return self.fresh_ttl + self.max_stale
+
+
+def _default_cacheable(value: Any) -> bool:
+    """Don't cache empty results or error payloads"""
+    if not value:
+        return False
+    return not (isinstance(value, dict) and value.get('error'))
+
+
+class StaleWhileRevalidate:
+    """
+    Stale-while-revalidate coordinator on top of any cache backend
+
+    The caller supplies read/write callables for the backing store, so the
+    same logic works for TenantCache partitions and plain CacheBackends.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize coordinator
+
+        Args:
+            name: Label used in metrics and the single-flight group
+        """
+        self.name = name
+        self._flights = SingleFlight(f"{name}_swr")
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        self._background_tasks: set = set()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        _registry.add(self)
+
+    def _count(self, namespace: str, field: str):
+        counters = self._stats.setdefault(namespace, {
+            'fresh_hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0
+        })
+        counters[field] += 1
+
+    @staticmethod
+    def wrap(value: Any, policy: StalenessPolicy) -> Dict[str, Any]:
+        """Envelope a value with its freshness and staleness deadlines"""
+        now = time.time()
+        return {
+            'v': value,
+            'fresh_until': now + policy.fresh_ttl,
+            'stale_until': now + policy.storage_ttl
+        }
+
+    def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        policy: StalenessPolicy,
+        read: Callable[[], Optional[Dict[str, Any]]],
+        write: Callable[[Dict[str, Any]], Any],
+        loader: Callable[[], Any],
+        cacheable: Callable[[Any], bool] = _default_cacheable
+    ) -> Any:
+        """
+        Serve a fresh or bounded-stale value, loading inline only when needed
+
+        Args:
+            namespace: Policy/metrics namespace (e.g. "workspace_analytics")
+            key: Cache key, also the single-flight and refresh identity
+            policy: Freshness/staleness bound for this call site
+            read: Returns the stored envelope (or None)
+            write: Stores an envelope built by wrap()
+            loader: Loads the value from the source of truth
+            cacheable: Whether a loaded value may be stored
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        envelope = read()
+        now = time.time()
+
+        if isinstance(envelope, dict) and 'v' in envelope:
+            if now < envelope.get('fresh_until', 0):
+                self._count(namespace, 'fresh_hits')
+                return envelope['v']
+            if now < envelope.get('stale_until', 0):
+                self._count(namespace, 'stale_hits')
+                self._schedule_refresh(namespace, key, policy, write, loader, cacheable)
+                return envelope['v']
+
+        self._count(namespace, 'misses')
+
+        def load_and_store():
+            value = loader()
+            if cacheable(value):
+                write(self.wrap(value, policy))
+            return value
+
+        return self._flights.do(key, load_and_store)
+
+    def _schedule_refresh(self, namespace, key, policy, write, loader, cacheable):
+        """Reload a stale key in the background (at most one refresh per key)"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = self._flights.do(key, loader)
+                if cacheable(value):
+                    write(self.wrap(value, policy))
+                self._count(namespace, 'refreshes')
+            except Exception as e:
+                self._count(namespace, 'refresh_errors')
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            # Sync Firestore client: keep the blocking reload off the event loop
+            task = loop.create_task(asyncio.to_thread(refresh))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        else:
+            threading.Thread(target=refresh, name=f"swr-refresh-{namespace}", daemon=True).start()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-namespace fresh/stale/miss counters"""
+        return {
+            'name': self.name,
+            'refreshing': len(self._refreshing),
+            'namespaces': {namespace: dict(counters) for namespace, counters in self._stats.items()}
+        }
+
+
+_registry: "weakref.WeakSet[StaleWhileRevalidate]" = weakref.WeakSet()
+
+
+def get_swr_stats() -> List[Dict[str, Any]]:
+    """Stats for every live stale-while-revalidate coordinator (exposed on /metrics)"""
+    return sorted((swr.get_stats() for swr in list(_registry)), key=lambda s: s['name'])
@@ -0,0 +1,171 @@
+"""
+End-to-end streaming metrics for /chat
+
+The /chat endpoint opens one observation per request. The agent labels it
+with the task type and route mode, the LLM gateway marks the first content
+chunk from Groq and the token usage, and the endpoint marks every chunk it
+sends to the client. Finished observations are aggregated per
+(task type, route mode, model) for the metrics endpoint.
+"""
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+import threading
+import time
+
+from monitoring import percentile
+
+_SAMPLE_WINDOW = 500
+
+_current: ContextVar[Optional['ChatStreamObservation']] = ContextVar('chat_stream_observation', default=None)
+
+
+class ChatStreamObservation:
+    """Timings of one streamed chat response (perf_counter seconds)"""
+
+    __slots__ = (
+        'started', 'task_type', 'route_mode', 'model', 'upstream_first_token_at', 'client_first_byte_at',
+        'last_client_chunk_at', 'gaps_ms', 'client_chunks', 'prompt_tokens', 'completion_tokens',
+        'usage_reported', 'finished_at', 'model_selection'
+    )
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.task_type = 'general'
+        self.route_mode = 'legacy'
+        self.model = 'none'
+        self.upstream_first_token_at: Optional[float] = None
+        self.client_first_byte_at: Optional[float] = None
+        self.last_client_chunk_at: Optional[float] = None
+        self.gaps_ms: list = []
+        self.client_chunks = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.usage_reported = False
+        self.finished_at: Optional[float] = None
+        self.model_selection: Optional[Dict[str, Any]] = None
+
+    def on_upstream_first_token(self, model: str, at: float):
+        # Keep the first upstream call's timing (later calls are e.g. summaries)
+        if self.upstream_first_token_at is None:
+            self.upstream_first_token_at = at
+            self.model = model
+
+    def on_upstream_done(self, model: str, prompt_tokens: int, completion_tokens: int, usage_reported: bool):
+        if self.model in ('none', model):
+            self.model = model
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.usage_reported = self.usage_reported or usage_reported
+
+    def on_client_chunk(self):
+        now = time.perf_counter()
+        if self.client_first_byte_at is None:
+            self.client_first_byte_at = now
+        else:
+            self.gaps_ms.append((now - self.last_client_chunk_at) * 1000)
+        self.last_client_chunk_at = now
+        self.client_chunks += 1
+
+
+def begin_chat_observation(started: Optional[float] = None) -> ChatStreamObservation:
+    """Start observing the current request's chat stream"""
+    observation = ChatStreamObservation(started)
+    _current.set(observation)
+    return observation
+
+
+def current_observation() -> Optional[ChatStreamObservation]:
+    """Observation of the current request, if it is a /chat stream"""
+    return _current.get()
+
+
+def label_chat_stream(task_type: Optional[str] = None, route_mode: Optional[str] = None,
+                      model_selection: Optional[Dict[str, Any]] = None):
+    """Attach routing labels to the current request's observation (no-op outside /chat)"""
+    observation = _current.get()
+    if observation is None:
+        return
+    if task_type:
+        observation.task_type = task_type
+    if route_mode:
+        observation.route_mode = route_mode
+    if model_selection:
+        observation.model_selection = model_selection
+
+
+class _Series:
+    """Rolling samples for one (task type, route mode, model) label set"""
+
+    def __init__(self):
+        self.streams = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.usage_reported = 0
+        self.upstream_ttft_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.first_byte_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.gap_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW * 4)
+        self.max_gap_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.tokens_per_sec: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+        self.duration_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'streams': self.streams,
+            'upstream_ttft_ms_p50': percentile(self.upstream_ttft_ms, 0.5),
+            'upstream_ttft_ms_p95': percentile(self.upstream_ttft_ms, 0.95),
+            'first_byte_ms_p50': percentile(self.first_byte_ms, 0.5),
+            'first_byte_ms_p95': percentile(self.first_byte_ms, 0.95),
+            'inter_chunk_gap_ms_p50': percentile(self.gap_ms, 0.5),
+            'inter_chunk_gap_ms_p95': percentile(self.gap_ms, 0.95),
+            'max_gap_ms_p95': percentile(self.max_gap_ms, 0.95),
+            'tokens_per_sec_p50': percentile(self.tokens_per_sec, 0.5),
+            'stream_duration_ms_p50': percentile(self.duration_ms, 0.5),
+            'stream_duration_ms_p95': percentile(self.duration_ms, 0.95),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'usage_reported_streams': self.usage_reported
+        }
+
+
+class StreamMetrics:
+    """Aggregates finished chat stream observations"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def record(self, observation: ChatStreamObservation):
+        """Fold a finished observation into its label set"""
+        finished = observation.finished_at or time.perf_counter()
+        key = (observation.task_type, observation.route_mode, observation.model)
+        with self._lock:
+            series = self._series.setdefault(key, _Series())
+            series.streams += 1
+            series.prompt_tokens += observation.prompt_tokens
+            series.completion_tokens += observation.completion_tokens
+            series.usage_reported += 1 if observation.usage_reported else 0
+            series.duration_ms.append((finished - observation.started) * 1000)
+            if observation.upstream_first_token_at is not None:
+                series.upstream_ttft_ms.append((observation.upstream_first_token_at - observation.started) * 1000)
+                generation = finished - observation.upstream_first_token_at
+                if generation > 0 and observation.completion_tokens:
+                    series.tokens_per_sec.append(observation.completion_tokens / generation)
+            if observation.client_first_byte_at is not None:
+                series.first_byte_ms.append((observation.client_first_byte_at - observation.started) * 1000)
+            if observation.gaps_ms:
+                series.gap_ms.extend(observation.gaps_ms)
+                series.max_gap_ms.append(max(observation.gaps_ms))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per task type / route mode / model streaming percentiles and token totals"""
+        with self._lock:
+            series = [
+                {'task_type': task_type, 'route_mode': route_mode, 'model': model, **stats.as_dict()}
+                for (task_type, route_mode, model), stats in sorted(self._series.items())
+            ]
+        return {'series': series}
+
+
+# Global stream metrics instance
+stream_metrics = StreamMetrics()
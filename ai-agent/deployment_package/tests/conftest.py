@@ -16,6 +16,9 @@ def mock_env_vars(monkeypatch):
     monkeypatch.setenv("GROQ_API_KEY", "test-groq-key")
     monkeypatch.setenv("API_KEY", "test-api-key")
     monkeypatch.setenv("FIREBASE_CREDENTIALS_PATH", "test-credentials.json")
+    monkeypatch.setenv("CONVERSATION_BACKEND", "memory")
+    # Unit tests must not wait on provider token budgets
+    monkeypatch.setenv("LLM_SCHEDULER_ENABLED", "false")
 
 @pytest.fixture
 def mock_firebase_client():
@@ -0,0 +1,137 @@
+"""
+Tests for aggregation-query workspace analytics
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from analytics_engine import AnalyticsEngine
+
+ORG = "org-1"
+
+
+class _Doc:
+    def __init__(self, db, data):
+        self.db = db
+        self._data = data
+
+    def to_dict(self):
+        self.db.to_dict_calls += 1
+        return dict(self._data)
+
+
+class _AggregationResult:
+    def __init__(self, value):
+        self.value = value
+
+
+class _CountQuery:
+    def __init__(self, query):
+        self.query = query
+
+    def get(self):
+        matches = len(self.query._matches())
+        # Aggregations are billed one read per 1000 index entries (minimum one)
+        self.query.db.billed_reads += max(1, math.ceil(matches / 1000))
+        self.query.db.aggregations += 1
+        return [[_AggregationResult(matches)]]
+
+
+class _Query:
+    def __init__(self, db, collection, filters=(), fields=None):
+        self.db = db
+        self.collection = collection
+        self.filters = filters
+        self.fields = fields
+
+    def where(self, field, op, value):
+        return _Query(self.db, self.collection, self.filters + ((field, value),), self.fields)
+
+    def select(self, fields):
+        return _Query(self.db, self.collection, self.filters, list(fields))
+
+    def count(self, alias=None):
+        if not self.db.supports_count:
+            raise AttributeError("'Query' object has no attribute 'count'")
+        return _CountQuery(self)
+
+    def _matches(self):
+        return [data for data in self.db.data.get(self.collection, [])
+                if all(data.get(field) == value for field, value in self.filters)]
+
+    def stream(self):
+        matches = self._matches()
+        self.db.billed_reads += max(1, len(matches))
+        self.db.projections.append(self.fields)
+        for data in matches:
+            yield _Doc(self.db, {k: v for k, v in data.items() if self.fields is None or k in self.fields})
+
+
+class _FakeFirestore:
+    """Counts billed reads and to_dict calls"""
+
+    def __init__(self, data, supports_count=True):
+        self.data = data
+        self.supports_count = supports_count
+        self.billed_reads = 0
+        self.aggregations = 0
+        self.to_dict_calls = 0
+        self.projections = []
+
+    def collection(self, name):
+        return _Query(self, name)
+
+
+def _hospital_network():
+    statuses = ["In Progress"] * 60 + ["Completed"] * 30 + ["On Hold"] * 10
+    levels = ["High"] * 400 + ["Critical"] * 100 + ["Low"] * 2500
+    return {
+        "projects": [{"organizationId": ORG, "status": s, "name": "x" * 200} for s in statuses]
+        + [{"organizationId": "org-2", "status": "In Progress"}] * 5,
+        "risks": [{"organizationId": ORG, "level": lv, "status": "open" if i % 3 else "closed", "notes": "y" * 500}
+                  for i, lv in enumerate(levels)],
+        "departments": [{"organizationId": ORG}] * 12,
+        "users": [{"organizationId": ORG}] * 250 + [{"organizationId": "org-2"}] * 40,
+    }
+
+
+EXPECTED = {
+    "projects": {"total": 100, "active": 60, "completed": 30, "on_hold": 10},
+    "risks": {"total": 3000, "high": 400, "critical": 100},
+    "departments": {"total": 12},
+    "users": {"total": 250},
+}
+
+
+@pytest.mark.unit
+class TestAnalyticsEngine:
+    """Test suite for AnalyticsEngine"""
+
+    def test_aggregations_return_schema_with_few_reads(self):
+        db = _FakeFirestore(_hospital_network())
+        analytics = AnalyticsEngine(db, executor=ThreadPoolExecutor(max_workers=4)).workspace_analytics(ORG)
+
+        assert analytics == EXPECTED
+        assert db.aggregations == 9
+        assert db.billed_reads <= 12
+        assert db.to_dict_calls == 0
+
+    def test_falls_back_to_projected_single_pass(self):
+        db = _FakeFirestore(_hospital_network(), supports_count=False)
+        engine = AnalyticsEngine(db)
+        analytics = engine.workspace_analytics(ORG)
+
+        assert analytics == EXPECTED
+        assert db.to_dict_calls == 3362  # once per document
+        assert sorted(db.projections) == [["level"], ["organizationId"], ["organizationId"], ["status"]]
+        assert engine.get_stats()["projected_fallbacks"] == 1
+
+    def test_aggregation_can_be_disabled(self):
+        db = _FakeFirestore(_hospital_network())
+        assert AnalyticsEngine(db, use_aggregation=False).workspace_analytics(ORG) == EXPECTED
+        assert db.aggregations == 0
+
+    def test_workspace_summary(self):
+        db = _FakeFirestore(_hospital_network())
+        summary = AnalyticsEngine(db).workspace_summary(ORG)
+        assert summary == {"total_projects": 100, "pending_risks": 2000, "total_users": 250}
+        assert db.billed_reads <= 4
@@ -0,0 +1,122 @@
+"""
+Tests for the async Firestore data-access layer
+"""
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from async_firebase import AsyncFirebaseClient, FirestoreExecutor
+
+request_org = contextvars.ContextVar("request_org", default=None)
+
+
+class _BlockingFirebaseClient:
+    """FirebaseClient stand-in whose reads block like the sync Firestore client"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.threads = set()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def _read(self, name, *args):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.calls.append((name, args))
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return {"method": name, "args": args, "org": request_org.get()}
+
+    def get_user_context(self, user_id, organization_id=None):
+        return self._read("get_user_context", user_id, organization_id)
+
+    def get_project_details(self, project_id, organization_id):
+        return self._read("get_project_details", project_id, organization_id)
+
+    def get_workspace_analytics(self, organization_id):
+        return self._read("get_workspace_analytics", organization_id)
+
+    def search_documents(self, query, organization_id, document_type=None, limit=10):
+        return self._read("search_documents", query, organization_id, document_type, limit)
+
+    def get_user_training_status(self, user_id, organization_id):
+        if user_id == "broken":
+            raise RuntimeError("Firestore unavailable")
+        return self._read("get_user_training_status", user_id, organization_id)
+
+
+@pytest.mark.unit
+class TestAsyncFirebaseClient:
+    """Test suite for AsyncFirebaseClient and FirestoreExecutor"""
+
+    @pytest.mark.asyncio
+    async def test_reads_do_not_block_the_event_loop(self):
+        client = _BlockingFirebaseClient(delay=0.1)
+        firestore = AsyncFirebaseClient(client, FirestoreExecutor(max_workers=2))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        await firestore.get_user_context("user-1", "org-1")
+        task.cancel()
+
+        assert ticks >= 10
+        assert all(name.startswith("firestore") for name in client.threads)
+
+    @pytest.mark.asyncio
+    async def test_async_methods_forward_arguments(self):
+        client = _BlockingFirebaseClient(delay=0)
+        firestore = AsyncFirebaseClient(client, FirestoreExecutor(max_workers=2))
+
+        await firestore.get_user_context("user-1", "org-1")
+        await firestore.get_project_details("proj-1", "org-1")
+        await firestore.get_workspace_analytics("org-1")
+        await firestore.search_documents("hygiene", "org-1", "Policy", 5)
+        await firestore.get_user_training_status("user-1", "org-1")
+
+        assert client.calls == [
+            ("get_user_context", ("user-1", "org-1")),
+            ("get_project_details", ("proj-1", "org-1")),
+            ("get_workspace_analytics", ("org-1",)),
+            ("search_documents", ("hygiene", "org-1", "Policy", 5)),
+            ("get_user_training_status", ("user-1", "org-1")),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_pool_bounds_concurrent_firestore_calls(self):
+        client = _BlockingFirebaseClient(delay=0.05)
+        executor = FirestoreExecutor(max_workers=2)
+        firestore = AsyncFirebaseClient(client, executor)
+        await asyncio.gather(*[firestore.get_workspace_analytics(f"org-{i}") for i in range(6)])
+
+        stats = executor.get_stats()
+        assert client.max_running == 2
+        assert stats["calls"] == 6 and stats["active"] == 0 and stats["queued"] == 0
+        assert stats["wait_ms_p95"] >= 40
+
+    @pytest.mark.asyncio
+    async def test_context_variables_reach_the_worker(self):
+        client = _BlockingFirebaseClient(delay=0)
+        firestore = AsyncFirebaseClient(client, FirestoreExecutor(max_workers=1))
+        request_org.set("org-7")
+        result = await firestore.get_workspace_analytics("org-7")
+        assert result["org"] == "org-7"
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_and_are_counted(self):
+        executor = FirestoreExecutor(max_workers=1)
+        firestore = AsyncFirebaseClient(_BlockingFirebaseClient(delay=0), executor)
+        with pytest.raises(RuntimeError):
+            await firestore.get_user_training_status("broken", "org-1")
+        assert executor.get_stats()["errors"] == 1
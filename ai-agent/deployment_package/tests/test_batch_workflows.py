@@ -0,0 +1,127 @@
+"""
+Tests for bounded-parallel workflow batches
+"""
+import asyncio
+import pytest
+from batch_workflows import group_duplicates, run_batch
+from llm_scheduler import PRIORITY_BATCH, get_request_scope
+
+
+async def _collect(lines):
+    return [line async for line in lines]
+
+
+@pytest.mark.unit
+class TestBatchWorkflows:
+    """Test suite for run_batch"""
+
+    def test_group_duplicates_by_content(self):
+        items = [
+            {"workflow": "action_plan", "payload": {"item": "a", "status": "x"}},
+            {"workflow": "action_plan", "payload": {"status": "x", "item": "a"}},
+            {"workflow": "compliance_check", "payload": {"item": "a", "status": "x"}},
+        ]
+        assert sorted(group_duplicates(items).values()) == [[0, 1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_duplicates_run_once_and_every_item_gets_a_line(self):
+        calls = []
+
+        async def action_plan(payload):
+            calls.append(payload["item"])
+            return {"status": "completed", "action_plan": f"plan for {payload['item']}"}
+
+        items = [
+            {"workflow": "action_plan", "payload": {"item": "hand hygiene"}, "id": "a"},
+            {"workflow": "action_plan", "payload": {"item": "hand hygiene"}, "id": "b"},
+            {"workflow": "action_plan", "payload": {"item": "fire safety"}, "id": "c"},
+        ]
+        lines = await _collect(run_batch(items, {"action_plan": action_plan}))
+
+        assert sorted(calls) == ["fire safety", "hand hygiene"]
+        results = {line["id"]: line for line in lines if line["type"] == "result"}
+        assert set(results) == {"a", "b", "c"}
+        assert results["b"]["deduplicated_from"] == 0
+        assert results["a"]["deduplicated_from"] is None
+        assert results["b"]["result"]["action_plan"] == "plan for hand hygiene"
+        assert lines[-1] == {**lines[-1], "type": "summary", "items": 3, "unique": 2, "completed": 3, "failed": 0}
+
+    @pytest.mark.asyncio
+    async def test_results_stream_in_completion_order(self):
+        async def workflow(payload):
+            await asyncio.sleep(payload["delay"])
+            return {"status": "completed"}
+
+        items = [{"workflow": "w", "payload": {"delay": delay}} for delay in (0.06, 0.0, 0.03)]
+        lines = await _collect(run_batch(items, {"w": workflow}, concurrency=3))
+        assert [line["index"] for line in lines[:-1]] == [1, 2, 0]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        in_flight = 0
+        peak = 0
+
+        async def workflow(payload):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"status": "completed"}
+
+        items = [{"workflow": "w", "payload": {"n": n}} for n in range(10)]
+        await _collect(run_batch(items, {"w": workflow}, concurrency=2))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_failures_are_isolated_to_their_line(self):
+        async def workflow(payload):
+            if payload.get("bad"):
+                raise ValueError("item is required")
+            return {"status": "completed"}
+
+        items = [
+            {"workflow": "w", "payload": {"bad": True}},
+            {"workflow": "w", "payload": {}},
+            {"workflow": "missing", "payload": {}},
+        ]
+        lines = await _collect(run_batch(items, {"w": workflow}))
+        by_index = {line["index"]: line for line in lines[:-1]}
+
+        assert by_index[0]["status"] == "error" and by_index[0]["error"] == "item is required"
+        assert by_index[1]["status"] == "completed"
+        assert "Unknown workflow" in by_index[2]["error"]
+        assert lines[-1]["failed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_runs_at_batch_priority(self):
+        seen = []
+
+        async def workflow(payload):
+            seen.append(get_request_scope()[1])
+            return {"status": "completed"}
+
+        await _collect(run_batch([{"workflow": "w", "payload": {}}], {"w": workflow}))
+        assert seen == [PRIORITY_BATCH]
+        assert get_request_scope()[1] != PRIORITY_BATCH
+
+    @pytest.mark.asyncio
+    async def test_closing_the_stream_cancels_pending_runs(self):
+        cancelled = []
+
+        async def workflow(payload):
+            try:
+                await asyncio.sleep(payload["delay"])
+            except asyncio.CancelledError:
+                cancelled.append(payload["delay"])
+                raise
+            return {"status": "completed"}
+
+        items = [{"workflow": "w", "payload": {"delay": delay}} for delay in (0.0, 5.0)]
+        lines = run_batch(items, {"w": workflow})
+        first = await lines.__anext__()
+        await lines.aclose()
+        await asyncio.sleep(0)
+
+        assert first["index"] == 0
+        assert cancelled == [5.0]
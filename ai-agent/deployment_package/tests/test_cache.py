@@ -0,0 +1,164 @@
+"""
+Unit tests for the bounded LRU/TTL cache engine
+"""
+import pytest
+from unittest.mock import patch
+from cache import NegativeCache, SimpleCache, TenantCache, estimate_size
+
+
+@pytest.mark.unit
+class TestSimpleCache:
+    """Test suite for SimpleCache"""
+
+    def test_get_set_invalidate(self):
+        cache = SimpleCache(default_ttl=60)
+        cache.set("a", {"value": 1})
+
+        assert cache.get("a") == {"value": 1}
+        cache.invalidate("a")
+        assert cache.get("a") is None
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = SimpleCache(default_ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" becomes least recently used
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_total_byte_budget(self):
+        cache = SimpleCache(default_ttl=60, max_bytes=100, max_entry_bytes=100)
+        cache.set("a", "x" * 40)
+        cache.set("b", "y" * 40)
+        cache.set("c", "z" * 40)
+
+        stats = cache.get_stats()
+        assert stats["size_bytes"] <= 100
+        assert cache.get("a") is None
+        assert stats["total_entries"] == 2
+
+    def test_per_entry_budget_rejects_oversize_values(self):
+        cache = SimpleCache(default_ttl=60, max_entry_bytes=10)
+
+        assert cache.set("big", "x" * 11) is False
+        assert cache.get("big") is None
+        assert cache.get_stats()["rejected_oversize"] == 1
+
+    def test_expired_entries_swept_without_reads(self):
+        cache = SimpleCache(default_ttl=10)
+        with patch("cache.time.time", return_value=1000.0):
+            cache.set("old", "value")
+
+        with patch("cache.time.time", return_value=1011.0):
+            cache.set("new", "value")
+
+        stats = cache.get_stats()
+        assert stats["total_entries"] == 1
+        assert stats["expirations"] == 1
+        assert stats["size_bytes"] == estimate_size("value")
+
+    def test_overwrite_keeps_size_accounting(self):
+        cache = SimpleCache(default_ttl=60)
+        cache.set("a", "x" * 50)
+        cache.set("a", "x" * 10)
+
+        assert cache.get_stats()["size_bytes"] == 10
+
+    def test_stats_do_not_walk_values(self):
+        cache = SimpleCache(default_ttl=60)
+        cache.set("a", {"nested": ["x"] * 10})
+
+        with patch("cache.estimate_size", side_effect=AssertionError("sized on read")):
+            stats = cache.get_stats()
+
+        assert stats["total_entries"] == 1
+        assert stats["size_bytes"] > 0
+
+
+@pytest.mark.unit
+class TestTenantCache:
+    """Test suite for the organization-partitioned cache"""
+
+    def test_partitions_are_isolated(self):
+        cache = TenantCache(default_ttl=60)
+        cache.set("org-a", "user_context:u1", {"org": "a"})
+        cache.set("org-b", "user_context:u1", {"org": "b"})
+
+        assert cache.get("org-a", "user_context:u1") == {"org": "a"}
+        assert cache.get("org-b", "user_context:u1") == {"org": "b"}
+
+    def test_quota_only_evicts_within_tenant(self):
+        cache = TenantCache(default_ttl=60, partition_quota_bytes=200)
+        cache.set("small-org", "k", "x" * 20)
+        for i in range(50):
+            cache.set("big-org", f"k{i}", "y" * 40)
+
+        assert cache.get("small-org", "k") == "x" * 20
+        assert cache.get_stats()["by_organization"]["big-org"]["size_bytes"] <= 200
+
+    def test_invalidate_org(self):
+        cache = TenantCache(default_ttl=60)
+        cache.set("org-a", "k", 1)
+        cache.set("org-b", "k", 2)
+        cache.invalidate_org("org-a")
+
+        assert cache.get("org-a", "k") is None
+        assert cache.get("org-b", "k") == 2
+
+    def test_invalidate_user_and_collection_tags(self):
+        cache = TenantCache(default_ttl=60)
+        cache.set("org-a", "ctx:u1", 1, user_id="u1", collections=["projects"])
+        cache.set("org-a", "ctx:u2", 2, user_id="u2", collections=["documents"])
+
+        cache.invalidate_user("org-a", "u1")
+        assert cache.get("org-a", "ctx:u1") is None
+        assert cache.get("org-a", "ctx:u2") == 2
+
+        cache.invalidate_collection("org-a", "documents")
+        assert cache.get("org-a", "ctx:u2") is None
+
+        # Entries written after invalidation are served normally
+        cache.set("org-a", "ctx:u1", 3, user_id="u1")
+        assert cache.get("org-a", "ctx:u1") == 3
+
+
+@pytest.mark.unit
+class TestNegativeCache:
+    """Test suite for NegativeCache"""
+
+    def test_marks_and_forgets_misses(self):
+        negatives = NegativeCache(SimpleCache(default_ttl=60), default_ttl=30)
+        assert not negatives.is_missing("project", "org-a:p1")
+
+        negatives.mark_missing("project", "org-a:p1")
+        assert negatives.is_missing("project", "org-a:p1")
+        assert not negatives.is_missing("project", "org-b:p1")
+
+        negatives.forget("project", "org-a:p1")
+        assert not negatives.is_missing("project", "org-a:p1")
+
+    def test_markers_expire(self):
+        negatives = NegativeCache(SimpleCache(default_ttl=60), default_ttl=10)
+        with patch("cache.time.time", return_value=1000.0):
+            negatives.mark_missing("org_scope", "uid-1")
+            assert negatives.is_missing("org_scope", "uid-1")
+        with patch("cache.time.time", return_value=1011.0):
+            assert not negatives.is_missing("org_scope", "uid-1")
+
+    def test_forget_kind_and_stats(self):
+        negatives = NegativeCache(SimpleCache(default_ttl=60))
+        negatives.mark_missing("org_scope", "uid-1")
+        negatives.mark_missing("project", "org-a:p1")
+        negatives.is_missing("org_scope", "uid-1")
+
+        negatives.forget_kind("org_scope")
+
+        assert not negatives.is_missing("org_scope", "uid-1")
+        assert negatives.is_missing("project", "org-a:p1")
+        stats = negatives.get_stats()
+        assert stats["hits"] == 2
+        assert stats["by_kind"]["org_scope"] == {"hits": 1, "stores": 1}
@@ -0,0 +1,102 @@
+"""
+Tests for the pluggable cache backends (memory / Redis)
+"""
+import os
+import pytest
+from cache import (
+    SimpleCache,
+    RedisCacheBackend,
+    TenantCache,
+    create_cache_backend,
+    encode_value,
+    decode_value,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.mark.unit
+class TestCodec:
+    """Compact value serialization"""
+
+    def test_small_values_round_trip_uncompressed(self):
+        blob = encode_value({"a": 1})
+        assert blob[:1] == b"j"
+        assert decode_value(blob) == {"a": 1}
+
+    def test_large_values_are_compressed(self):
+        value = {"text": "compliance " * 500}
+        blob = encode_value(value)
+        assert blob[:1] == b"z"
+        assert len(blob) < len("compliance " * 500)
+        assert decode_value(blob) == value
+
+
+@pytest.mark.unit
+class TestRedisCacheBackend:
+    """RedisCacheBackend against a local Redis stand-in"""
+
+    def test_workers_share_entries(self, redis_client):
+        worker_a = RedisCacheBackend(redis_client, namespace="cache")
+        worker_b = RedisCacheBackend(redis_client, namespace="cache")
+
+        worker_a.set("user_context:org:u1", {"name": "Test"})
+        assert worker_b.get("user_context:org:u1") == {"name": "Test"}
+
+    def test_ttl_is_applied(self, redis_client):
+        backend = RedisCacheBackend(redis_client, namespace="cache", default_ttl=30)
+        backend.set("k", "v")
+        assert 0 < redis_client.ttl("cache:d:k") <= 30
+
+    def test_tag_invalidation_visible_to_other_workers(self, redis_client):
+        worker_a = RedisCacheBackend(redis_client, namespace="context")
+        worker_b = RedisCacheBackend(redis_client, namespace="context")
+        worker_a.set("standard_u1", {"tier": "standard"}, tags=["user:u1"])
+        worker_a.set("standard_u2", {"tier": "standard"}, tags=["user:u2"])
+
+        worker_b.invalidate_tag("user:u1")
+
+        assert worker_a.get("standard_u1") is None
+        assert worker_a.get("standard_u2") == {"tier": "standard"}
+
+    def test_clear_is_namespace_scoped(self, redis_client):
+        context = RedisCacheBackend(redis_client, namespace="context")
+        responses = RedisCacheBackend(redis_client, namespace="llm_response")
+        context.set("k", 1)
+        responses.set("k", 2)
+
+        context.clear()
+
+        assert context.get("k") is None
+        assert responses.get("k") == 2
+
+    def test_oversize_entries_rejected(self, redis_client):
+        backend = RedisCacheBackend(redis_client, namespace="cache", max_entry_bytes=64)
+        assert backend.set("big", os.urandom(500).hex()) is False
+        assert backend.get("big") is None
+
+    def test_tenant_cache_org_invalidation_across_workers(self, redis_client):
+        def factory(**kwargs):
+            return create_cache_backend(backend="redis", client=redis_client, **kwargs)
+
+        worker_a = TenantCache(backend_factory=factory)
+        worker_b = TenantCache(backend_factory=factory)
+        worker_a.set("org-a", "user_context:org-a:u1", {"ok": True}, user_id="u1")
+        assert worker_b.get("org-a", "user_context:org-a:u1") == {"ok": True}
+
+        worker_b.invalidate_org("org-a")
+        assert worker_a.get("org-a", "user_context:org-a:u1") is None
+
+
+@pytest.mark.unit
+def test_backend_selected_by_env(monkeypatch, redis_client):
+    monkeypatch.setenv("CACHE_BACKEND", "redis")
+    assert isinstance(create_cache_backend("cache", client=redis_client), RedisCacheBackend)
+
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    assert isinstance(create_cache_backend("cache"), SimpleCache)
@@ -0,0 +1,51 @@
+"""
+Tests for the per-model circuit breaker
+"""
+import pytest
+from unittest.mock import patch
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.mark.unit
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker"""
+
+    def test_opens_on_error_rate(self):
+        breaker = CircuitBreaker("m", min_calls=4, failure_rate=0.5)
+        breaker.record_success(100)
+        breaker.record_success(100)
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.get_stats()["rejected_calls"] == 1
+
+    def test_opens_on_slow_call_rate(self):
+        breaker = CircuitBreaker("m", min_calls=4, slow_call_ms=1000, slow_call_rate=0.5)
+        for latency in (200, 1500, 300, 2500):
+            breaker.record_success(latency)
+        assert breaker.state == OPEN
+
+    def test_unjudged_latency_is_not_slow(self):
+        breaker = CircuitBreaker("m", min_calls=2, slow_call_ms=1)
+        for _ in range(5):
+            breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_closes_or_reopens(self):
+        breaker = CircuitBreaker("m", min_calls=1, cooldown=30)
+        with patch("circuit_breaker.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch("circuit_breaker.time.monotonic", return_value=131.0):
+            assert breaker.state == HALF_OPEN
+            assert breaker.allow()
+            # Only one probe at a time
+            assert not breaker.allow()
+            breaker.record_failure()
+            assert breaker.state == OPEN
+        with patch("circuit_breaker.time.monotonic", return_value=162.0):
+            assert breaker.allow()
+            breaker.record_success(50)
+            assert breaker.state == CLOSED
+        assert breaker.get_stats()["times_opened"] == 2
@@ -0,0 +1,142 @@
+"""
+Tests for the bounded, persistent conversation store
+"""
+import sys
+import threading
+import pytest
+from unittest.mock import patch
+from conversation_store import (
+    ConversationStore,
+    ConversationThread,
+    Message,
+    SQLiteConversationBackend,
+    create_conversation_store,
+    scoped_thread_id,
+)
+
+
+@pytest.mark.unit
+class TestConversationStore:
+    """Test suite for ConversationStore"""
+
+    def _store(self, **kwargs):
+        return ConversationStore(backend=SQLiteConversationBackend(":memory:"), **kwargs)
+
+    def test_messages_are_compact(self):
+        first = Message("".join(["assis", "tant"]), "hi")
+        second = Message("assistant", "there")
+        assert first.role is second.role
+        assert not hasattr(first, "__dict__")
+        assert first.role is sys.intern("assistant")
+
+    def test_thread_system_prompt_and_eviction(self):
+        thread = ConversationThread("t1")
+        thread.set_system_prompt("v1")
+        for i in range(10):
+            thread.append("user", f"m{i}")
+        thread.set_system_prompt("v2")
+        dropped = thread.evict_history(4)
+
+        messages = thread.as_messages()
+        assert messages[0] == {"role": "system", "content": "v2"}
+        assert [m["content"] for m in messages[1:]] == [f"m{i}" for i in range(4, 10)]
+        assert [m.content for m in dropped] == ["m0", "m1", "m2", "m3"]
+        assert thread.evicted == dropped
+
+    def test_summary_round_trips_through_encoding(self):
+        thread = ConversationThread("t1")
+        thread.append("user", "hello")
+        thread.evict_history(1)
+        thread.set_summary("User greeted.", folded=list(thread.evicted))
+        restored = ConversationThread.decode("t1", thread.encode())
+        assert restored.summary == "User greeted."
+        assert restored.evicted == []
+
+    def test_lru_overflow_spills_and_lazy_loads(self):
+        store = self._store(max_hot_threads=2)
+        for thread_id in ("a", "b", "c"):
+            thread = store.get_or_create(thread_id)
+            thread.append("user", f"hello from {thread_id}")
+            store.commit(thread)
+
+        assert len(store) == 2
+        assert store.get_hot("a") is None
+        assert store.get_stats()["spilled"] == 1
+
+        restored = store.get_or_create("a")
+        assert restored.as_messages() == [{"role": "user", "content": "hello from a"}]
+        assert store.get_stats()["cold_loads"] == 1
+
+    def test_idle_threads_expire_to_backend(self):
+        store = self._store(idle_ttl=10)
+        with patch("conversation_store.time.time", return_value=1000.0):
+            thread = store.get_or_create("idle")
+            thread.append("user", "first turn")
+        with patch("conversation_store.time.time", return_value=1011.0):
+            store.get_or_create("other")
+
+        assert store.get_hot("idle") is None
+        assert "idle" in store
+        assert store["idle"] == [{"role": "user", "content": "first turn"}]
+        assert store.get_stats()["idle_expired"] == 1
+
+    def test_commit_keeps_thread_evicted_mid_turn(self):
+        store = self._store(max_hot_threads=1)
+        thread = store.get_or_create("a")
+        store.get_or_create("b")  # evicts "a" while its turn is still running
+        thread.append("assistant", "late reply")
+        store.commit(thread)
+
+        assert store.get_hot("a") is thread
+        assert store["a"][-1]["content"] == "late reply"
+
+    @pytest.mark.asyncio
+    async def test_acommit_spills_off_the_event_loop(self):
+        saved_on = []
+
+        class _RecordingBackend(SQLiteConversationBackend):
+            def save(self, thread_id, blob):
+                saved_on.append(threading.get_ident())
+                super().save(thread_id, blob)
+
+        store = ConversationStore(backend=_RecordingBackend(":memory:"), max_hot_threads=1)
+        thread = await store.aget_or_create("a")
+        other = await store.aget_or_create("b")  # evicts "a" while its turn is still running
+        other.append("user", "hello from b")
+        thread.append("assistant", "late reply")
+        await store.acommit(thread)  # "a" comes back and "b" spills
+
+        assert store.get_hot("a") is thread
+        assert store["b"] == [{"role": "user", "content": "hello from b"}]
+        assert len(saved_on) == 1 and saved_on[0] != threading.get_ident()
+
+    def test_flush_persists_hot_threads(self):
+        backend = SQLiteConversationBackend(":memory:")
+        store = ConversationStore(backend=backend)
+        store.get_or_create("a").append("user", "persist me")
+        store.flush()
+
+        fresh = ConversationStore(backend=backend)
+        assert fresh.get_or_create("a").as_messages() == [{"role": "user", "content": "persist me"}]
+
+    def test_memory_backend_from_env(self, monkeypatch):
+        monkeypatch.setenv("CONVERSATION_BACKEND", "memory")
+        store = create_conversation_store()
+        assert store.backend is None
+        assert "missing" not in store
+        with pytest.raises(KeyError):
+            store["missing"]
+
+    def test_sqlite_backend_defaults_to_data_dir(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("CONVERSATION_BACKEND", "sqlite")
+        monkeypatch.delenv("CONVERSATION_DB_PATH", raising=False)
+        monkeypatch.setenv("CONVERSATION_DATA_DIR", str(tmp_path / "data"))
+        store = create_conversation_store()
+        assert store.backend.path == str(tmp_path / "data" / "conversations.db")
+        assert (tmp_path / "data" / "conversations.db").exists()
+
+    def test_thread_keys_are_scoped_by_tenant_and_user(self):
+        assert scoped_thread_id("t1", "org-1", "u1") == "org-1:u1:t1"
+        assert scoped_thread_id("t1", "org-1", "u1") != scoped_thread_id("t1", "org-2", "u1")
+        assert scoped_thread_id("t1", "org-1", "u1") != scoped_thread_id("t1", "org-1", "u2")
+        assert scoped_thread_id("t1") == "t1"
@@ -0,0 +1,58 @@
+"""
+Tests for concurrent fan-out of independent reads
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fetch_plan import StageTimings, fan_out
+
+
+def _read(value, delay=0.05, calls=None):
+    def read():
+        time.sleep(delay)
+        if calls is not None:
+            calls.append(value)
+        if isinstance(value, Exception):
+            raise value
+        return value
+    return read
+
+
+@pytest.mark.unit
+class TestFanOut:
+    """Test suite for fan_out and StageTimings"""
+
+    def test_independent_reads_run_concurrently(self):
+        executor = ThreadPoolExecutor(max_workers=4)
+        timings = {}
+        started = time.perf_counter()
+        results = fan_out({"a": _read(1), "b": _read(2), "c": _read(3)}, executor=executor, timings=timings)
+        elapsed = time.perf_counter() - started
+
+        assert results == {"a": 1, "b": 2, "c": 3}
+        assert elapsed < 0.12
+        assert set(timings) == {"a", "b", "c"} and all(ms >= 45 for ms in timings.values())
+
+    def test_without_executor_reads_run_inline_in_order(self):
+        calls = []
+        started = time.perf_counter()
+        fan_out({"a": _read("a", 0.02, calls), "b": _read("b", 0.02, calls)}, executor=None)
+        assert calls == ["a", "b"]
+        assert time.perf_counter() - started >= 0.04
+
+    def test_failure_is_raised_after_every_read_finishes(self):
+        calls = []
+        reads = {"ok": _read("ok", 0.05, calls), "broken": _read(RuntimeError("index missing"), 0.0, calls)}
+        with pytest.raises(RuntimeError):
+            fan_out(reads, executor=ThreadPoolExecutor(max_workers=2))
+        assert "ok" in calls
+
+    def test_stage_timings_percentiles(self):
+        stages = StageTimings("user_context")
+        for ms in range(1, 101):
+            stages.record({"user_doc": float(ms), "total": float(ms * 2)})
+        stats = stages.get_stats()
+
+        assert stats["user_doc"]["count"] == 100
+        assert stats["user_doc"]["p50_ms"] == 51.0
+        assert stats["total"]["p95_ms"] == 192.0
@@ -0,0 +1,273 @@
+"""
+Tests for the shared LLM gateway
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from llm_gateway import LLMGateway, LLMDeadlineExceeded, last_served_model, retry_after_seconds, is_rate_limited
+
+
+class _APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def _completion(text="ok", prompt_tokens=12, completion_tokens=3):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    )
+
+
+def _gateway(create, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return LLMGateway(client, backoff_base=0.01, **kwargs)
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.mark.unit
+class TestLLMGateway:
+    """Test suite for LLMGateway"""
+
+    @pytest.mark.asyncio
+    async def test_records_usage_and_passes_timeout(self):
+        create = AsyncMock(return_value=_completion())
+        gateway = _gateway(create, timeout=12)
+        assert await gateway.complete_text(MESSAGES, model="big") == "ok"
+
+        assert create.call_args.kwargs["timeout"] <= 12
+        stats = gateway.get_stats()["by_model"]["big"]
+        assert stats["calls"] == 1
+        assert stats["prompt_tokens"] == 12
+        assert stats["completion_tokens"] == 3
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_falls_back_to_secondary_model(self):
+        create = AsyncMock(side_effect=[_APIError(429), _completion("small")])
+        gateway = _gateway(create, fallback_model="small-model")
+        assert await gateway.complete_text(MESSAGES, model="big") == "small"
+        assert [call.kwargs["model"] for call in create.call_args_list] == ["big", "small-model"]
+        assert gateway.get_stats()["by_model"]["small-model"]["fallbacks_to"] == 1
+        assert last_served_model() == "small-model"
+
+    @pytest.mark.asyncio
+    async def test_failed_call_clears_served_model(self):
+        gateway = _gateway(AsyncMock(side_effect=[_completion(), _APIError(400)]))
+        await gateway.create(MESSAGES, model="big")
+        assert last_served_model() == "big"
+        with pytest.raises(_APIError):
+            await gateway.create(MESSAGES, model="big")
+        assert last_served_model() is None
+
+    @pytest.mark.asyncio
+    async def test_backoff_honors_retry_after(self):
+        create = AsyncMock(side_effect=[_APIError(503, {"retry-after": "1.5"}), _completion()])
+        gateway = _gateway(create)
+        with patch("llm_gateway.asyncio.sleep", new=AsyncMock()) as sleep:
+            await gateway.create(MESSAGES, model="big")
+        sleep.assert_awaited_once_with(1.5)
+        assert gateway.get_stats()["by_model"]["big"]["retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        create = AsyncMock(side_effect=_APIError(500))
+        gateway = _gateway(create, max_retries=2)
+        with pytest.raises(_APIError):
+            await gateway.create(MESSAGES, model="big")
+        assert create.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        create = AsyncMock(side_effect=_APIError(400))
+        gateway = _gateway(create)
+        with pytest.raises(_APIError):
+            await gateway.create(MESSAGES, model="big")
+        assert create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_backoff_never_outlives_deadline(self):
+        create = AsyncMock(side_effect=_APIError(503, {"retry-after": "5"}))
+        gateway = _gateway(create, deadline=0.5, backoff_max=10)
+        with pytest.raises(_APIError):
+            await gateway.create(MESSAGES, model="big")
+        assert create.await_count == 1
+
+        with pytest.raises(LLMDeadlineExceeded):
+            await gateway.create(MESSAGES, model="big", deadline=-1)
+
+    @pytest.mark.asyncio
+    async def test_stream_records_time_to_first_token(self):
+        async def chunks():
+            for text in ["Hel", "lo", None]:
+                await asyncio.sleep(0.01)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+        gateway = _gateway(AsyncMock(return_value=chunks()))
+        stream = await gateway.create(MESSAGES, model="big", stream=True)
+        text = "".join([chunk.choices[0].delta.content async for chunk in stream if chunk.choices[0].delta.content])
+        assert text == "Hello"
+
+        stats = gateway.get_stats()["by_model"]["big"]
+        assert stats["calls"] == 1
+        assert stats["ttft_ms_p50"] >= 10
+        assert stats["completion_tokens"] > 0
+
+    def test_error_classification(self):
+        assert is_rate_limited(_APIError(429))
+        assert is_rate_limited(Exception("rate_limit_exceeded"))
+        assert not is_rate_limited(_APIError(500))
+        assert retry_after_seconds(_APIError(429, {"retry-after-ms": "250"})) == 0.25
+        assert retry_after_seconds(_APIError(429)) is None
+
+
+@pytest.mark.unit
+class TestLLMGatewayScheduling:
+    """Gateway admission through the LLM scheduler"""
+
+    @pytest.mark.asyncio
+    async def test_slot_is_held_until_stream_finishes(self):
+        from llm_scheduler import LLMScheduler
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="hi"))], usage=None)
+
+        scheduler = LLMScheduler(budgets={"big": {"concurrency": 1, "tpm": 0}})
+        gateway = _gateway(AsyncMock(return_value=chunks()), scheduler=scheduler)
+        stream = await gateway.create(MESSAGES, model="big", stream=True)
+        assert scheduler.get_stats()["big"]["active"] == 1
+        async for _ in stream:
+            pass
+        assert scheduler.get_stats()["big"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_releases_slot(self):
+        from llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(budgets={"big": {"concurrency": 1, "tpm": 0}})
+        gateway = _gateway(AsyncMock(side_effect=_APIError(400)), scheduler=scheduler)
+        with pytest.raises(_APIError):
+            await gateway.create(MESSAGES, model="big")
+        assert scheduler.get_stats()["big"]["active"] == 0
+
+
+def _stream_client(delays):
+    """Client whose streams for each model wait delays[model] seconds before the first token"""
+    calls = []
+
+    async def create(model, **kwargs):
+        calls.append(model)
+
+        async def chunks():
+            await asyncio.sleep(delays[model])
+            for text in (f"from {model}", None):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+        return chunks()
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))), calls
+
+
+async def _collect(stream):
+    return "".join([chunk.choices[0].delta.content async for chunk in stream if chunk.choices[0].delta.content])
+
+
+@pytest.mark.unit
+class TestLLMGatewayResilience:
+    """Circuit breaking and hedging in the gateway"""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_routes_to_fallback(self):
+        create = AsyncMock(return_value=_completion("small"))
+        gateway = _gateway(create, fallback_model="small-model", breaker_settings={"min_calls": 1})
+        gateway.breaker("big").record_failure()
+
+        assert await gateway.complete_text(MESSAGES, model="big") == "small"
+        assert [call.kwargs["model"] for call in create.call_args_list] == ["small-model"]
+        assert gateway.get_stats()["circuit_breakers"]["big"]["state"] == "open"
+
+    @pytest.mark.asyncio
+    async def test_repeated_failures_open_breaker(self):
+        create = AsyncMock(side_effect=_APIError(500))
+        gateway = _gateway(create, max_retries=3, breaker_settings={"min_calls": 3, "failure_rate": 0.5})
+        with pytest.raises(_APIError):
+            await gateway.create(MESSAGES, model="big", fallback=False)
+        assert gateway.breaker("big").state == "open"
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_when_primary_first_token_is_late(self):
+        client, calls = _stream_client({"big": 1.0, "small-model": 0.01})
+        gateway = LLMGateway(client, fallback_model="small-model", hedge=True, hedge_after_ms=50)
+        stream = await gateway.create(MESSAGES, model="big", stream=True)
+        assert await _collect(stream) == "from small-model"
+        assert last_served_model() == "small-model"
+        assert calls == ["big", "small-model"]
+        stats = gateway.get_stats()["by_model"]["small-model"]
+        assert stats["hedges_to"] == 1
+        assert stats["hedges_won"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_primary_is_fast(self):
+        client, calls = _stream_client({"big": 0.0, "small-model": 0.0})
+        gateway = LLMGateway(client, fallback_model="small-model", hedge=True, hedge_after_ms=200)
+        stream = await gateway.create(MESSAGES, model="big", stream=True)
+        assert await _collect(stream) == "from big"
+        assert calls == ["big"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_primary_releases_scheduler_slot(self):
+        from llm_scheduler import LLMScheduler
+
+        client, _ = _stream_client({"big": 1.0, "small-model": 0.01})
+        scheduler = LLMScheduler(budgets={"big": {"concurrency": 1, "tpm": 0}, "small-model": {"concurrency": 1, "tpm": 0}})
+        gateway = LLMGateway(client, fallback_model="small-model", hedge=True, hedge_after_ms=20, scheduler=scheduler)
+        stream = await gateway.create(MESSAGES, model="big", stream=True)
+        await _collect(stream)
+        stats = scheduler.get_stats()
+        assert stats["big"]["active"] == 0
+        assert stats["small-model"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_primary_losing_hedge_race_counts_as_slow(self):
+        client, _ = _stream_client({"big": 1.0, "small-model": 0.01})
+        gateway = LLMGateway(client, fallback_model="small-model", hedge=True, hedge_after_ms=20,
+                             breaker_settings={"min_calls": 1, "slow_call_rate": 0.5})
+        stream = await gateway.create(MESSAGES, model="big", stream=True)
+        assert await _collect(stream) == "from small-model"
+        assert gateway.breaker("big").state == "open"
+        assert gateway.breaker("small-model").state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_releases_hedged_primary(self):
+        from llm_scheduler import LLMScheduler
+
+        client, _ = _stream_client({"big": 1.0, "small-model": 1.0})
+        scheduler = LLMScheduler(budgets={"big": {"concurrency": 1, "tpm": 0}})
+        gateway = LLMGateway(client, fallback_model="small-model", hedge=True, hedge_after_ms=500, scheduler=scheduler)
+        call = asyncio.create_task(gateway.create(MESSAGES, model="big", stream=True))
+        await asyncio.sleep(0.05)
+        assert scheduler.get_stats()["big"]["active"] == 1
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        assert scheduler.get_stats()["big"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_released_when_deadline_passes_in_queue(self):
+        from llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(budgets={"big": {"concurrency": 1, "tpm": 0}})
+        gateway = _gateway(AsyncMock(return_value=_completion()), scheduler=scheduler,
+                           breaker_settings={"min_calls": 1, "cooldown": 0})
+        gateway.breaker("big").record_failure()
+        held = await scheduler.acquire("big", 10)
+        with pytest.raises(LLMDeadlineExceeded):
+            await gateway.create(MESSAGES, model="big", deadline=0.05)
+        scheduler.release(held)
+        # The probe is free again: the next call is let through to the model
+        assert await gateway.complete_text(MESSAGES, model="big") == "ok"
+        assert gateway.breaker("big").state == "closed"
@@ -0,0 +1,123 @@
+"""
+Tests for the priority- and tenant-fair LLM admission scheduler
+"""
+import asyncio
+import pytest
+from llm_scheduler import (
+    LLMScheduler, SchedulerTimeout, PRIORITY_INTERACTIVE, PRIORITY_WORKFLOW, PRIORITY_BATCH,
+    request_scope, get_request_scope, create_llm_scheduler
+)
+
+MODEL = "test-model"
+
+
+async def _queued_call(scheduler, order, label, org="org-a", priority=PRIORITY_WORKFLOW, tokens=10):
+    with request_scope(organization_id=org, priority=priority):
+        grant = await scheduler.acquire(MODEL, tokens, timeout=5)
+    order.append(label)
+    await asyncio.sleep(0)
+    scheduler.release(grant, used_tokens=tokens)
+
+
+@pytest.mark.unit
+class TestLLMScheduler:
+    """Test suite for LLMScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_admits_immediately_under_budget(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 2, "tpm": 0}})
+        grant = await scheduler.acquire(MODEL, 100)
+        stats = scheduler.get_stats()[MODEL]
+        assert stats["active"] == 1
+        assert stats["queue_depth"] == 0
+        scheduler.release(grant)
+        assert scheduler.get_stats()[MODEL]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_interactive_is_served_before_batch_and_workflow(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 1, "tpm": 0}})
+        blocker = await scheduler.acquire(MODEL, 10)
+        order = []
+        tasks = [
+            asyncio.create_task(_queued_call(scheduler, order, "batch", priority=PRIORITY_BATCH)),
+            asyncio.create_task(_queued_call(scheduler, order, "workflow", priority=PRIORITY_WORKFLOW)),
+            asyncio.create_task(_queued_call(scheduler, order, "chat", priority=PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        assert scheduler.get_stats()[MODEL]["queue_depth"] == 3
+
+        scheduler.release(blocker)
+        await asyncio.gather(*tasks)
+        assert order == ["chat", "workflow", "batch"]
+
+    @pytest.mark.asyncio
+    async def test_fair_share_across_organizations(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 1, "tpm": 0}})
+        blocker = await scheduler.acquire(MODEL, 10)
+        order = []
+        # org-a bursts six calls before org-b's two arrive
+        tasks = [asyncio.create_task(_queued_call(scheduler, order, f"a{i}", org="org-a")) for i in range(6)]
+        await asyncio.sleep(0.01)
+        tasks += [asyncio.create_task(_queued_call(scheduler, order, f"b{i}", org="org-b")) for i in range(2)]
+        await asyncio.sleep(0.01)
+
+        scheduler.release(blocker)
+        await asyncio.gather(*tasks)
+        # org-b is interleaved instead of waiting behind the whole burst
+        assert order.index("b1") < order.index("a3")
+
+    @pytest.mark.asyncio
+    async def test_tokens_per_minute_budget_delays_admission(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 10, "tpm": 6000}})
+        first = await scheduler.acquire(MODEL, 5990)
+        scheduler.release(first, used_tokens=5990)
+        # 100 tokens refill in about one second at 6000 TPM
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.acquire(MODEL, 100, timeout=0.2)
+        grant = await scheduler.acquire(MODEL, 100, timeout=2)
+        assert grant.reserved_tokens == 100
+        assert scheduler.get_stats()[MODEL]["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unused_reservation_is_refunded(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 10, "tpm": 6000}})
+        grant = await scheduler.acquire(MODEL, 5000)
+        scheduler.release(grant, used_tokens=500)
+        assert scheduler.get_stats()[MODEL]["tokens_available"] >= 5500
+
+    @pytest.mark.asyncio
+    async def test_provider_rate_limit_pauses_lane(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 10, "tpm": 6000}})
+        grant = await scheduler.acquire(MODEL, 100)
+        scheduler.release(grant, used_tokens=100, rate_limited=True)
+        stats = scheduler.get_stats()[MODEL]
+        assert stats["tokens_available"] <= 1
+        assert stats["provider_throttles"] == 1
+
+    @pytest.mark.asyncio
+    async def test_wait_times_reported_per_priority(self):
+        scheduler = LLMScheduler(budgets={MODEL: {"concurrency": 1, "tpm": 0}})
+        blocker = await scheduler.acquire(MODEL, 10)
+        order = []
+        task = asyncio.create_task(_queued_call(scheduler, order, "chat", priority=PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0.05)
+        scheduler.release(blocker)
+        await task
+        interactive = scheduler.get_stats()[MODEL]["by_priority"]["interactive"]
+        assert interactive["admitted"] == 1
+        assert interactive["wait_ms_p50"] >= 40
+
+    def test_request_scope_is_restored(self):
+        default = get_request_scope()
+        with request_scope(organization_id="org-x", priority=PRIORITY_BATCH):
+            assert get_request_scope() == ("org-x", PRIORITY_BATCH)
+        assert get_request_scope() == default
+
+    def test_factory_reads_budgets_and_weights(self, monkeypatch):
+        monkeypatch.setenv("LLM_SCHEDULER_BUDGETS", '{"m": {"concurrency": 3, "tpm": 900}}')
+        monkeypatch.setenv("LLM_SCHEDULER_ORG_WEIGHTS", "org-a:2, org-b:0.5")
+        scheduler = create_llm_scheduler()
+        assert scheduler.budgets["m"] == {"concurrency": 3, "tpm": 900}
+        assert scheduler.org_weights == {"org-a": 2.0, "org-b": 0.5}
+        monkeypatch.setenv("LLM_SCHEDULER_ENABLED", "false")
+        assert create_llm_scheduler() is None
@@ -0,0 +1,115 @@
+"""
+Tests for the offline OpenAI-compatible mock LLM server
+"""
+import time
+import pytest
+import openai
+from openai import AsyncOpenAI
+from benchmarks.mock_llm_server import MockLLMConfig, MockModel, create_mock_app, serve_in_thread
+from llm_gateway import LLMGateway
+
+PRIMARY = "llama-3.3-70b-versatile"
+FALLBACK = "llama-3.1-8b-instant"
+MESSAGES = [{"role": "user", "content": "How do we close the hand hygiene gap?"}]
+
+
+def _fast(**overrides):
+    options = {"ttft_ms": 5.0, "ttft_sigma": 0.0, "tokens_per_sec": 0.0}
+    options.update(overrides)
+    return MockModel(**options)
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    config = MockLLMConfig(
+        models={
+            PRIMARY: _fast(),
+            FALLBACK: _fast(),
+            "always-429": _fast(rate_limit_rate=1.0, retry_after=0.01),
+            "slow-start": _fast(ttft_ms=200.0),
+        },
+        responses=["## Plan\n1. Audit hand hygiene monthly.\n2. Retrain staff.", "Short answer."]
+    )
+    app = create_mock_app(config)
+    return serve_in_thread(app), app.state.mock
+
+
+@pytest.mark.unit
+class TestMockLLMServer:
+    """Test suite for the mock chat completions server"""
+
+    @pytest.mark.asyncio
+    async def test_non_streaming_completion_is_deterministic(self, mock_server):
+        base_url, _ = mock_server
+        client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+        first = await client.chat.completions.create(model=PRIMARY, messages=MESSAGES)
+        second = await client.chat.completions.create(model=PRIMARY, messages=MESSAGES)
+        await client.close()
+
+        assert first.choices[0].message.content == second.choices[0].message.content
+        assert first.choices[0].finish_reason == "stop"
+        assert first.usage.completion_tokens > 0 and first.usage.prompt_tokens > 0
+
+    @pytest.mark.asyncio
+    async def test_streaming_matches_non_streaming_and_reports_usage(self, mock_server):
+        base_url, _ = mock_server
+        client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+        full = await client.chat.completions.create(model=PRIMARY, messages=MESSAGES)
+        stream = await client.chat.completions.create(
+            model=PRIMARY, messages=MESSAGES, stream=True, stream_options={"include_usage": True}
+        )
+        parts, usage = [], None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            usage = chunk.usage or usage
+        await client.close()
+
+        assert "".join(parts) == full.choices[0].message.content
+        assert usage.completion_tokens == full.usage.completion_tokens
+
+    @pytest.mark.asyncio
+    async def test_max_tokens_truncates(self, mock_server):
+        base_url, _ = mock_server
+        client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+        response = await client.chat.completions.create(model=PRIMARY, messages=MESSAGES, max_tokens=1)
+        await client.close()
+
+        assert response.choices[0].finish_reason == "length"
+        assert response.usage.completion_tokens == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_injection(self, mock_server):
+        base_url, server = mock_server
+        client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+        with pytest.raises(openai.RateLimitError) as raised:
+            await client.chat.completions.create(model="always-429", messages=MESSAGES)
+        await client.close()
+
+        assert raised.value.response.headers["retry-after"] == "0.01"
+        assert server.stats["always-429"]["rate_limited"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_gateway_falls_back_on_injected_429(self, mock_server):
+        base_url, _ = mock_server
+        client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+        gateway = LLMGateway(client, fallback_model=FALLBACK)
+        text = await gateway.complete_text(MESSAGES, model="always-429")
+        await client.close()
+
+        assert text
+
+    @pytest.mark.asyncio
+    async def test_first_token_delay(self, mock_server):
+        base_url, _ = mock_server
+        client = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0)
+        started = time.perf_counter()
+        stream = await client.chat.completions.create(model="slow-start", messages=MESSAGES, stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                break
+        ttft_ms = (time.perf_counter() - started) * 1000
+        await stream.close()
+        await client.close()
+
+        assert 180 <= ttft_ms < 1000
@@ -0,0 +1,99 @@
+"""
+Tests for latency-aware model selection
+"""
+import pytest
+from model_selector import ModelSelector
+
+PRIMARY = "llama-3.3-70b-versatile"
+FAST = "llama-3.1-8b-instant"
+SHORT = "What is IPSG.1?"
+MEDIUM = "Summarize the open corrective actions for infection control in our ICU. " * 6
+
+
+def _selector(**kwargs):
+    options = {"epsilon": 0.0, "min_samples": 5, "seed": 3}
+    options.update(kwargs)
+    return ModelSelector(PRIMARY, FAST, **options)
+
+
+def _train(selector, task_type, tier, message, model, latency_ms, quality, completion_tokens=300, n=5):
+    for _ in range(n):
+        decision = selector.select(task_type, tier, message)
+        decision.model = model
+        selector.record(decision, latency_ms=latency_ms, quality=quality, completion_tokens=completion_tokens)
+
+
+@pytest.mark.unit
+class TestModelSelector:
+    """Test suite for ModelSelector"""
+
+    def test_prior_sends_short_minimal_chat_to_fast_model(self):
+        selector = _selector()
+        assert selector.select("general", "minimal", SHORT).model == FAST
+        assert selector.select("general", "standard", MEDIUM).model == PRIMARY
+        decision = selector.select("compliance", "minimal", SHORT)
+        assert decision.reason == "prior"
+        assert decision.bucket == "compliance:minimal:short"
+
+    def test_full_tier_never_uses_fast_model(self):
+        selector = _selector(epsilon=1.0)
+        assert {selector.select("general", "full", SHORT).model for _ in range(20)} == {PRIMARY}
+
+    def test_exploits_faster_model_when_quality_holds(self):
+        selector = _selector()
+        _train(selector, "general", "standard", MEDIUM, PRIMARY, latency_ms=3000, quality=0.82)
+        _train(selector, "general", "standard", MEDIUM, FAST, latency_ms=800, quality=0.82)
+        decision = selector.select("general", "standard", MEDIUM)
+        assert (decision.model, decision.reason) == (FAST, "exploit")
+
+    def test_quality_floor_beats_latency(self):
+        selector = _selector()
+        _train(selector, "general", "minimal", SHORT, PRIMARY, latency_ms=3000, quality=0.82)
+        _train(selector, "general", "minimal", SHORT, FAST, latency_ms=500, quality=0.62)
+        assert selector.select("general", "minimal", SHORT).model == PRIMARY
+
+    def test_exploration_rate(self):
+        selector = _selector(epsilon=0.3)
+        reasons = [selector.select("general", "standard", MEDIUM).reason for _ in range(1000)]
+        assert 0.25 < reasons.count("explore") / len(reasons) < 0.35
+
+    def test_max_tokens_follows_observed_completion_length(self):
+        selector = _selector()
+        _train(selector, "general", "standard", MEDIUM, PRIMARY, latency_ms=2000, quality=0.8, completion_tokens=200)
+        _train(selector, "general", "standard", MEDIUM, FAST, latency_ms=2500, quality=0.8, completion_tokens=200)
+        decision = selector.select("general", "standard", MEDIUM, default_max_tokens=1024)
+        assert decision.model == PRIMARY
+        assert decision.max_tokens == 320
+
+        # A response that hit the cap puts the default back
+        selector.record(decision, latency_ms=2000, quality=0.8, completion_tokens=decision.max_tokens)
+        assert selector.select("general", "standard", MEDIUM, default_max_tokens=1024).max_tokens == 1024
+
+    def test_disabled_is_static(self):
+        selector = _selector(enabled=False)
+        decision = selector.select("general", "minimal", SHORT, default_max_tokens=700)
+        assert (decision.model, decision.max_tokens, decision.reason) == (PRIMARY, 700, "static")
+        selector.record(decision, latency_ms=100, quality=0.9, completion_tokens=10)
+        assert selector.get_stats()["buckets"] == {}
+
+    def test_stats_and_meta(self):
+        selector = _selector()
+        decision = selector.select("action_plan", None, MEDIUM, default_max_tokens=2048)
+        selector.record(decision, latency_ms=1500, quality=0.9, completion_tokens=900)
+        assert decision.as_meta() == {
+            "model": PRIMARY, "max_tokens": 2048, "bucket": "action_plan:none:medium", "reason": "prior"
+        }
+        stats = selector.get_stats()
+        assert stats["decisions"]["prior"] == 1
+        assert stats["buckets"]["action_plan:none:medium"][PRIMARY]["samples"] == 1
+
+    def test_outcome_is_recorded_against_the_model_that_served(self):
+        selector = _selector()
+        decision = selector.select("action_plan", None, MEDIUM, default_max_tokens=2048)
+        assert decision.model == PRIMARY
+        selector.record(decision, latency_ms=400, quality=0.7, completion_tokens=300, served_model=FAST)
+        selector.record(decision, latency_ms=400, quality=0.7, completion_tokens=300, served_model="other-model")
+
+        arms = selector.get_stats()["buckets"]["action_plan:none:medium"]
+        assert set(arms) == {FAST}
+        assert arms[FAST]["samples"] == 1
@@ -0,0 +1,179 @@
+"""
+Tests for cached, parallel organization-scope resolution
+"""
+import asyncio
+import threading
+import time
+import pytest
+from cache import NegativeCache, SimpleCache
+from org_scope import OrgScopeResolver, build_org_scope_mappings
+
+
+class _Doc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Query:
+    def __init__(self, db, field, value):
+        self.db = db
+        self.field = field
+        self.value = value
+
+    def get(self):
+        self.db.reads.append(("where", self.field))
+        self.db.threads.add(threading.current_thread().name)
+        time.sleep(self.db.delays.get(self.field, 0.0))
+        if self.field in self.db.failing:
+            raise RuntimeError(f"{self.field} index missing")
+        return [_Doc(doc_id, data) for doc_id, data in self.db.collections["users"].items()
+                if data.get(self.field) == self.value]
+
+
+class _DocRef:
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.collection = collection
+        self.doc_id = doc_id
+
+    def get(self):
+        self.db.reads.append((self.collection, self.doc_id))
+        self.db.threads.add(threading.current_thread().name)
+        return _Doc(self.doc_id, self.db.collections.setdefault(self.collection, {}).get(self.doc_id))
+
+    def set(self, data):
+        self.db.collections.setdefault(self.collection, {})[self.doc_id] = data
+
+
+class _Collection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id):
+        return _DocRef(self.db, self.name, doc_id)
+
+    def where(self, field, op, value):
+        return _Query(self.db, field, value)
+
+
+class _FakeFirestore:
+    """Just enough of the Firestore client for the resolver's lookups"""
+
+    def __init__(self, users=None, mappings=None, delays=None, failing=()):
+        self.collections = {"users": dict(users or {}), "user_org_scopes": dict(mappings or {})}
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.reads = []
+        self.threads = set()
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+
+def _resolver(db):
+    return OrgScopeResolver(db, cache_backend=SimpleCache(max_entries=100), negative=NegativeCache(SimpleCache()))
+
+
+@pytest.mark.unit
+class TestOrgScopeResolver:
+    """Test suite for OrgScopeResolver"""
+
+    @pytest.mark.asyncio
+    async def test_user_doc_is_cached(self):
+        db = _FakeFirestore(users={"u1": {"organizationId": "org-1"}})
+        resolver = _resolver(db)
+        assert await resolver.resolve("u1") == "org-1"
+        reads = len(db.reads)
+        assert await resolver.resolve("u1") == "org-1"
+
+        assert len(db.reads) == reads
+        assert resolver.get_stats()["cache_hits"] == 1
+        assert "MainThread" not in db.threads
+
+    @pytest.mark.asyncio
+    async def test_mapping_collection_avoids_legacy_queries(self):
+        db = _FakeFirestore(mappings={"u1": {"organizationId": "org-1"}})
+        assert await _resolver(db).resolve("u1", "a@example.com") == "org-1"
+        assert not any(kind == "where" for kind, _ in db.reads)
+
+    @pytest.mark.asyncio
+    async def test_legacy_queries_run_in_parallel_and_first_hit_wins(self):
+        db = _FakeFirestore(
+            users={"legacy-doc": {"authUid": "u1", "email": "a@example.com", "organizationId": "org-1"}},
+            delays={"id": 0.3, "uid": 0.3, "authUid": 0.05, "email": 0.3}
+        )
+        resolver = _resolver(db)
+        started = time.perf_counter()
+        org_id = await resolver.resolve("u1", "a@example.com")
+        elapsed = time.perf_counter() - started
+
+        assert org_id == "org-1"
+        assert elapsed < 0.25
+        assert resolver.get_stats()["resolved_by"] == {"legacy:authUid": 1}
+
+    @pytest.mark.asyncio
+    async def test_legacy_hit_is_written_back_to_mapping(self):
+        db = _FakeFirestore(users={"legacy-doc": {"uid": "u1", "organizationId": "org-1"}})
+        await _resolver(db).resolve("u1")
+        for _ in range(50):
+            if "u1" in db.collections["user_org_scopes"]:
+                break
+            await asyncio.sleep(0.01)
+
+        mapping = db.collections["user_org_scopes"]["u1"]
+        assert mapping["organizationId"] == "org-1" and mapping["source"] == "legacy:uid"
+
+    @pytest.mark.asyncio
+    async def test_users_without_org_are_negatively_cached(self):
+        db = _FakeFirestore(users={"u1": {"name": "No Org"}})
+        resolver = _resolver(db)
+        assert await resolver.resolve("u1", "a@example.com") is None
+        reads = len(db.reads)
+        assert await resolver.resolve("u1", "a@example.com") is None
+
+        assert len(db.reads) == reads
+        stats = resolver.get_stats()
+        assert stats["not_found"] == 1 and stats["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_query_is_not_negatively_cached(self):
+        db = _FakeFirestore(failing={"authUid"})
+        resolver = _resolver(db)
+        assert await resolver.resolve("u1") is None
+        assert await resolver.resolve("u1") is None
+        assert resolver.get_stats()["errors"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_lookup(self):
+        db = _FakeFirestore(users={"legacy-doc": {"id": "u1", "organizationId": "org-1"}}, delays={"id": 0.05})
+        resolver = _resolver(db)
+        results = await asyncio.gather(*[resolver.resolve("u1") for _ in range(10)])
+
+        assert set(results) == {"org-1"}
+        assert sum(1 for kind, field in db.reads if kind == "where" and field == "id") == 1
+
+
+@pytest.mark.unit
+class TestBuildOrgScopeMappings:
+    """Test suite for the backfill mapping builder"""
+
+    def test_precedence_and_conflicts(self):
+        user_docs = [
+            ("u1", {"organizationId": "org-1"}),
+            ("legacy-1", {"uid": "u1", "organizationId": "org-2"}),
+            ("legacy-2", {"authUid": "u2", "organizationId": "org-3", "email": "b@example.com"}),
+            ("no-org", {"uid": "u4"}),
+        ]
+        mappings, conflicts = build_org_scope_mappings(user_docs, [("u3", "B@example.com")])
+
+        assert mappings["u1"] == ("org-1", "user_doc")
+        assert mappings["u2"] == ("org-3", "legacy:authUid")
+        assert mappings["u3"] == ("org-3", "legacy:email")
+        assert "u4" not in mappings
+        assert conflicts == ["u1"]
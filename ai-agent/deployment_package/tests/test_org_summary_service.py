@@ -0,0 +1,259 @@
+"""
+Tests for listener-maintained organization summaries
+"""
+from types import SimpleNamespace
+import threading
+import pytest
+from org_summary_service import OrgSummaryService, build_summaries, summary_to_analytics, summary_to_context
+
+
+class _Doc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _DocRef:
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.collection = collection
+        self.doc_id = doc_id
+
+    def get(self):
+        self.db.reads += 1
+        return _Doc(self.doc_id, self.db.data.setdefault(self.collection, {}).get(self.doc_id))
+
+
+class _Query:
+    def __init__(self, db, collection, filters=()):
+        self.db = db
+        self.collection = collection
+        self.filters = filters
+
+    def where(self, field, op, value):
+        return _Query(self.db, self.collection, self.filters + ((field, value),))
+
+    def select(self, fields):
+        return self
+
+    def stream(self):
+        for doc_id, data in list(self.db.data.get(self.collection, {}).items()):
+            if all(data.get(field) == value for field, value in self.filters):
+                self.db.reads += 1
+                yield _Doc(doc_id, data)
+
+
+class _Collection(_Query):
+    def document(self, doc_id):
+        return _DocRef(self.db, self.collection, doc_id)
+
+    def on_snapshot(self, callback):
+        self.db.listeners[self.collection] = callback
+        return _Watch()
+
+
+class _Watch:
+    def __init__(self):
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data))
+
+    def commit(self):
+        for ref, data in self.writes:
+            self.db.data.setdefault(ref.collection, {})[ref.doc_id] = data
+            self.db.writes += 1
+
+
+class _FakeFirestore:
+    def __init__(self, data=None):
+        self.data = data or {}
+        self.listeners = {}
+        self.reads = 0
+        self.writes = 0
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+
+def _source():
+    return {
+        "projects": {
+            "p1": {"organizationId": "org-1", "status": "In Progress"},
+            "p2": {"organizationId": "org-1", "status": "Completed"},
+            "p3": {"organizationId": "org-2", "status": "On Hold"},
+        },
+        "risks": {
+            "r1": {"organizationId": "org-1", "level": "High", "status": "open"},
+            "r2": {"organizationId": "org-1", "level": "Critical", "status": "closed"},
+        },
+        "departments": {"d1": {"organizationId": "org-1"}},
+        "users": {"u1": {"organizationId": "org-1"}, "u2": {"organizationId": "org-2"}, "u3": {"name": "No Org"}},
+    }
+
+
+def _deliver_initial_snapshots(service):
+    for name, docs in _source().items():
+        service.apply_changes(name, list(docs.items()))
+
+
+@pytest.mark.unit
+class TestOrgSummaryService:
+    """Test suite for OrgSummaryService"""
+
+    def test_initial_snapshots_materialize_every_org(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db, mode="listen")
+        _deliver_initial_snapshots(service)
+
+        assert service.ready
+        summary = db.data["org_summaries"]["org-1"]
+        assert summary["projects"] == {"total": 2, "by_status": {"In Progress": 1, "Completed": 1}}
+        assert summary["risks"]["by_level"] == {"High": 1, "Critical": 1}
+        assert db.data["org_summaries"]["org-2"]["users"] == {"total": 1}
+
+    def test_nothing_is_written_before_every_listener_is_ready(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db, mode="listen")
+        service.apply_changes("projects", list(_source()["projects"].items()))
+        assert db.writes == 0 and not service.ready
+
+    def test_changes_update_counts_incrementally(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db, mode="listen")
+        _deliver_initial_snapshots(service)
+        writes = db.writes
+
+        service.apply_changes("projects", [
+            ("p1", {"organizationId": "org-1", "status": "Completed"}),  # modified
+            ("p3", None),  # removed
+        ])
+        service.apply_changes("risks", [("r1", {"organizationId": "org-1", "level": "High", "status": "open"})])
+
+        assert db.writes == writes + 2  # org-1 and org-2 once; the unchanged risk writes nothing
+        assert db.data["org_summaries"]["org-1"]["projects"]["by_status"] == {"Completed": 2}
+        assert db.data["org_summaries"]["org-2"]["projects"] == {"total": 0, "by_status": {}}
+
+    def test_interleaved_snapshots_cannot_commit_a_stale_summary(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db, mode="listen")
+        _deliver_initial_snapshots(service)
+
+        # Hold the projects listener's commit until the risks listener has run
+        committing, release = threading.Event(), threading.Event()
+        make_batch = db.batch
+
+        def gated_batch():
+            batch = make_batch()
+            commit = batch.commit
+
+            def gated_commit():
+                if not committing.is_set():
+                    committing.set()
+                    release.wait(5)
+                commit()
+            batch.commit = gated_commit
+            return batch
+
+        db.batch = gated_batch
+        projects = threading.Thread(target=service.apply_changes, args=(
+            "projects", [("p4", {"organizationId": "org-1", "status": "On Hold"})]))
+        risks = threading.Thread(target=service.apply_changes, args=(
+            "risks", [("r3", {"organizationId": "org-1", "level": "High", "status": "open"})]))
+        projects.start()
+        assert committing.wait(5)
+        risks.start()
+        risks.join(0.2)
+        release.set()
+        projects.join(5)
+        risks.join(5)
+
+        summary = db.data["org_summaries"]["org-1"]
+        assert summary["projects"]["total"] == 3
+        assert summary["risks"]["by_level"] == {"High": 2, "Critical": 1}
+
+    def test_listening_process_serves_from_memory(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db, mode="listen")
+        _deliver_initial_snapshots(service)
+        reads = db.reads
+
+        analytics = service.workspace_analytics("org-1")
+        assert analytics == {
+            "projects": {"total": 2, "active": 1, "completed": 1, "on_hold": 0},
+            "risks": {"total": 2, "high": 1, "critical": 1},
+            "departments": {"total": 1},
+            "users": {"total": 1},
+        }
+        assert service.workspace_summary("org-1") == {"total_projects": 2, "pending_risks": 1, "total_users": 1}
+        assert db.reads == reads
+
+    def test_read_mode_reads_one_document(self):
+        summaries = build_summaries((name, data) for name, docs in _source().items() for data in docs.values())
+        db = _FakeFirestore({"org_summaries": summaries})
+        service = OrgSummaryService(db, mode="read")
+
+        assert service.workspace_summary("org-2") == {"total_projects": 1, "pending_risks": 0, "total_users": 1}
+        assert db.reads == 1
+        assert service.get_summary("org-unknown") is None
+
+    def test_off_mode_is_never_used(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db)
+        service.start()
+        assert service.get_summary("org-1") is None
+        assert db.listeners == {} and db.reads == 0
+
+    def test_start_and_stop_attach_listeners(self):
+        db = _FakeFirestore()
+        service = OrgSummaryService(db, mode="listen")
+        service.start()
+        assert set(db.listeners) == {"projects", "risks", "departments", "users"}
+
+        for name in ("projects", "risks", "departments"):
+            db.listeners[name]([], [], None)
+        added = SimpleNamespace(type=SimpleNamespace(name="ADDED"), document=_Doc("u1", {"organizationId": "org-1"}))
+        db.listeners["users"]([], [added], None)
+        assert db.data["org_summaries"]["org-1"]["users"] == {"total": 1}
+
+        removed = SimpleNamespace(type=SimpleNamespace(name="REMOVED"), document=_Doc("u1", {"organizationId": "org-1"}))
+        db.listeners["users"]([], [removed], None)
+        assert db.data["org_summaries"]["org-1"]["users"] == {"total": 0}
+
+        service.stop()
+        assert service.get_stats()["listening"] is False
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        db = _FakeFirestore(_source())
+        service = OrgSummaryService(db, mode="read")
+        assert set(service.reconcile()["drifted"]) == {"org-1", "org-2"}  # never materialized
+
+        db.data["org_summaries"]["org-1"]["risks"]["by_level"]["High"] = 5
+        db.data["org_summaries"]["org-gone"] = {"projects": {"total": 3, "by_status": {}}}
+        report = service.reconcile(apply=False)
+
+        assert report["drifted"]["org-1"] == [("risks.by_level.High", 5, 1)]
+        assert ("projects.total", 3, 0) in report["drifted"]["org-gone"]
+        assert report["written"] == 0
+        assert service.reconcile()["written"] == 2
+        assert service.reconcile()["drifted"] == {}
+
+    def test_summary_conversions_tolerate_missing_sections(self):
+        assert summary_to_analytics({})["projects"]["total"] == 0
+        assert summary_to_context({}) == {"total_projects": 0, "pending_risks": 0, "total_users": 0}
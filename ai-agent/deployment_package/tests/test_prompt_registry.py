@@ -0,0 +1,71 @@
+"""
+Tests for the precompiled prompt registry
+"""
+import pytest
+from prompt_registry import PromptRegistry, build_default_registry
+from specialist_prompts import get_compliance_specialist_prompt
+from skills import MARKDOWN_FORMATTING_SKILL, MARKDOWN_FORMATTING_SKILL_COMPACT
+
+
+@pytest.mark.unit
+class TestPromptRegistry:
+    """Test suite for PromptRegistry"""
+
+    def test_prompts_are_built_once_and_match_builders(self):
+        calls = []
+
+        def builder(compact):
+            calls.append(compact)
+            return f"prompt compact={compact}"
+
+        registry = PromptRegistry()
+        registry.register("compliance", builder)
+        for _ in range(5):
+            registry.get("compliance")
+        assert calls == [False, True]
+
+        default = build_default_registry()
+        assert default.get("compliance") == get_compliance_specialist_prompt()
+
+    def test_compact_variant_for_small_model(self):
+        registry = build_default_registry()
+        compact = registry.get("risk", model="llama-3.1-8b-instant")
+        assert MARKDOWN_FORMATTING_SKILL_COMPACT in compact
+        assert MARKDOWN_FORMATTING_SKILL not in compact
+        assert MARKDOWN_FORMATTING_SKILL in registry.get("risk", model="llama-3.3-70b-versatile")
+
+    def test_compact_variant_for_low_budget(self):
+        registry = build_default_registry()
+        full_tokens = registry.get_report()["prompts"]["training"]["full_tokens"]
+        assert registry.select_variant("training", max_prompt_tokens=full_tokens * 10) == "full"
+        assert registry.select_variant("training", max_prompt_tokens=full_tokens) == "compact"
+
+    def test_unknown_task_falls_back_to_general(self):
+        registry = build_default_registry()
+        assert registry.get("billing") == registry.get("general")
+
+    def test_adapt_messages_keeps_appended_context(self):
+        registry = build_default_registry()
+        full = registry.get("compliance")
+        messages = [
+            {"role": "system", "content": full + "\nCURRENT ORGANIZATION CONTEXT: ICU"},
+            {"role": "user", "content": "hi"}
+        ]
+        assert registry.adapt_messages(messages, "llama-3.3-70b-versatile") is messages
+
+        adapted = registry.adapt_messages(messages, "llama-3.1-8b-instant")
+        assert adapted[0]["content"].endswith("CURRENT ORGANIZATION CONTEXT: ICU")
+        assert MARKDOWN_FORMATTING_SKILL_COMPACT in adapted[0]["content"]
+        assert adapted[1] == messages[1]
+        assert messages[0]["content"].startswith(full)
+
+    def test_report_shows_token_cost_per_specialist(self):
+        registry = build_default_registry()
+        registry.get("compliance")
+        registry.get("compliance", model="llama-3.1-8b-instant")
+        report = registry.get_report()["prompts"]
+        assert set(report) == {"compliance", "risk", "training", "general"}
+        entry = report["compliance"]
+        assert entry["compact_tokens"] < entry["full_tokens"] / 2
+        assert len(entry["version"]) == 12
+        assert entry["prompt_tokens_sent"] == entry["full_tokens"] + entry["compact_tokens"]
@@ -0,0 +1,66 @@
+"""
+Tests for the tenant- and context-aware LLM response cache
+"""
+import pytest
+from cache import SimpleCache
+from response_cache import ResponseCache, context_fingerprint, normalize_message
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """Test suite for ResponseCache"""
+
+    def _cache(self, **kwargs):
+        return ResponseCache(SimpleCache(default_ttl=600, **kwargs), ttl=600)
+
+    def test_normalized_messages_share_a_key(self):
+        cache = self._cache()
+        assert normalize_message("  Summarize   my Projects?? ") == "summarize my projects"
+        key_a = cache.make_key("Summarize my projects?", "general", "org-a", "standard", {"user_id": "u1"})
+        key_b = cache.make_key("summarize  my projects", "general", "org-a", "standard", {"user_id": "u1"})
+        assert key_a == key_b
+
+    def test_key_separates_tenants_tasks_tiers_and_context(self):
+        cache = self._cache()
+        base = cache.make_key("summarize my projects", "general", "org-a", "standard", {"projects": 3})
+        assert base != cache.make_key("summarize my projects", "general", "org-b", "standard", {"projects": 3})
+        assert base != cache.make_key("summarize my projects", "compliance", "org-a", "standard", {"projects": 3})
+        assert base != cache.make_key("summarize my projects", "general", "org-a", "full", {"projects": 3})
+        assert base != cache.make_key("summarize my projects", "general", "org-a", "standard", {"projects": 4})
+
+    def test_fingerprint_ignores_volatile_fields(self):
+        assert context_fingerprint({"user_id": "u1", "timestamp": "t1"}) == \
+            context_fingerprint({"timestamp": "t2", "user_id": "u1"})
+        assert context_fingerprint(None) == "none"
+
+    def test_round_trip_is_compressed_in_memory(self):
+        backend = SimpleCache(default_ttl=600)
+        cache = ResponseCache(backend, ttl=600)
+        response = "Your projects are on track. " * 50
+        cache.set("k", "general", response, "org-a")
+
+        assert isinstance(backend.get("k"), bytes)
+        assert len(backend.get("k")) < len(response)
+        assert cache.get("k", "general") == response
+
+    def test_per_task_metrics(self):
+        cache = self._cache()
+        cache.get("missing", "risk")
+        cache.set("k", "risk", "answer", "org-a")
+        cache.get("k", "risk")
+        cache.set("empty", "risk", "", "org-a")
+
+        stats = cache.get_stats()["by_task_type"]["risk"]
+        assert stats == {"hits": 1, "misses": 1, "stores": 1, "hit_rate": 50.0}
+
+    def test_invalidate_org_and_lru_bound(self):
+        cache = self._cache(max_entries=2)
+        cache.set("a", "general", "one", "org-a")
+        cache.set("b", "general", "two", "org-b")
+        cache.invalidate_org("org-a")
+        assert cache.get("a", "general") is None
+        assert cache.get("b", "general") == "two"
+
+        cache.set("c", "general", "three", "org-b")
+        cache.set("d", "general", "four", "org-b")
+        assert len(cache.backend) == 2
@@ -0,0 +1,78 @@
+"""
+Tests for the semantic near-duplicate response cache
+"""
+import pytest
+from unittest.mock import patch
+from semantic_cache import SemanticCache, HashedNgramVectorizer, create_semantic_cache
+
+QUESTIONS = [
+    "how do I prepare for JCI survey",
+    "what is a CAPA report",
+    "list open risks in ICU",
+    "training plan for nurses on infection control",
+    "how to write a policy on hand hygiene",
+    "explain CBAHI standard LD.1",
+    "what documents are missing for accreditation",
+    "JCI standards for medication management",
+]
+
+
+@pytest.mark.unit
+class TestSemanticCache:
+    """Test suite for SemanticCache"""
+
+    def _loaded(self, threshold=0.8, scope="general:standard:ctx"):
+        cache = SemanticCache(threshold=threshold, dim=1024)
+        cache.bulk_load("org-a", [(scope, q, f"answer: {q}") for q in QUESTIONS])
+        return cache
+
+    def test_vectorizer_is_deterministic(self):
+        vectorizer = HashedNgramVectorizer(dim=256)
+        first = vectorizer.features("JCI survey preparation")
+        assert (first == vectorizer.features("JCI survey preparation")).all()
+        assert first.max() < 256
+
+    def test_reworded_question_hits(self):
+        cache = self._loaded()
+        match = cache.lookup("org-a", "general:standard:ctx", "What's a CAPA report?")
+        assert match is not None
+        response, similarity = match
+        assert response == "answer: what is a CAPA report"
+        assert similarity >= 0.8
+
+    def test_unrelated_question_misses(self):
+        cache = self._loaded()
+        assert cache.lookup("org-a", "general:standard:ctx", "fire drill schedule for radiology") is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_lookups_are_scoped_to_org_and_scope(self):
+        cache = self._loaded()
+        assert cache.lookup("org-b", "general:standard:ctx", "what is a CAPA report") is None
+        assert cache.lookup("org-a", "risk:standard:ctx", "what is a CAPA report") is None
+
+    def test_add_grows_index_incrementally(self):
+        cache = SemanticCache(threshold=0.8)
+        for question in QUESTIONS * 3:
+            cache.add("org-a", "s", question, f"answer: {question}")
+        assert cache.get_stats()["entries_by_organization"]["org-a"] == len(QUESTIONS) * 3
+        assert cache.lookup("org-a", "s", "open risks in the ICU")[0] == "answer: list open risks in ICU"
+
+    def test_capacity_drops_oldest_entries(self):
+        cache = SemanticCache(threshold=0.8, max_entries_per_org=10)
+        for i in range(25):
+            cache.add("org-a", "s", f"question number {i} about survey readiness", f"answer {i}")
+        assert cache.get_stats()["entries_by_organization"]["org-a"] <= 10
+
+    def test_expired_entries_do_not_match(self):
+        cache = SemanticCache(threshold=0.8, ttl=10)
+        with patch("semantic_cache.time.time", return_value=1000.0):
+            cache.add("org-a", "s", "what is a CAPA report", "answer")
+        with patch("semantic_cache.time.time", return_value=1011.0):
+            assert cache.lookup("org-a", "s", "what is a CAPA report") is None
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("SEMANTIC_CACHE_ENABLED", raising=False)
+        assert create_semantic_cache() is None
+        monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+        monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD", "0.9")
+        assert create_semantic_cache().threshold == 0.9
@@ -0,0 +1,125 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+import threading
+import time
+import pytest
+from singleflight import SingleFlight, get_single_flight_stats
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Test suite for SingleFlight"""
+
+    def test_concurrent_threads_share_one_load(self):
+        flights = SingleFlight("test_threads")
+        calls = []
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(2)
+            return {"projects": 3}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.do("user_context:o:u", loader)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        # Let every caller join the in-flight load before it completes
+        deadline = time.time() + 2
+        while flights.get_stats()["coalesced_waiters"] < 7 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [{"projects": 3}] * 8
+        stats = flights.get_stats()
+        assert stats["loads_executed"] == 1
+        assert stats["coalesced_waiters"] == 7
+        assert stats["in_flight"] == 0
+
+    def test_errors_propagate_to_waiters_and_are_not_cached(self):
+        flights = SingleFlight("test_errors")
+
+        def failing():
+            raise RuntimeError("firestore down")
+
+        with pytest.raises(RuntimeError):
+            flights.do("k", failing)
+        assert flights.do("k", lambda: "recovered") == "recovered"
+        assert flights.get_stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_coroutines_share_one_load(self):
+        flights = SingleFlight("test_async")
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "analytics"
+
+        results = await asyncio.gather(*[flights.do_async("workspace_analytics:o", loader) for _ in range(5)])
+
+        assert calls == 1
+        assert results == ["analytics"] * 5
+        assert flights.get_stats()["coalesced_waiters"] == 4
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_fail_waiters(self):
+        flights = SingleFlight("test_async_cancel")
+        started = asyncio.Event()
+
+        async def loader():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "analytics"
+
+        leader = asyncio.create_task(flights.do_async("k", loader))
+        await started.wait()
+        waiter = asyncio.create_task(flights.do_async("k", loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await waiter == "analytics"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert flights.get_stats()["loads_executed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_load_is_cancelled_when_every_caller_is(self):
+        flights = SingleFlight("test_async_abandon")
+        cancelled = asyncio.Event()
+
+        async def loader():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(flights.do_async("k", loader)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled.is_set()
+
+        callers[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert flights.get_stats()["in_flight"] == 0
+
+    def test_stats_registry(self):
+        flights = SingleFlight("test_registry")
+        flights.do("k", lambda: 1)
+
+        names = [stats["name"] for stats in get_single_flight_stats()]
+        assert "test_registry" in names
@@ -11,7 +11,7 @@ class TestSpecialistRouting:
     """Validate specialist routing behavior and telemetry."""
 
     def test_detect_task_type_prefers_keyword_scores(self, mock_env_vars):
-        with patch('unified_accreditex_agent.AsyncOpenAI'), \
+        with patch('llm_gateway.AsyncOpenAI'), \
              patch('unified_accreditex_agent.firebase_admin'):
             agent = UnifiedAccreditexAgent()
 
@@ -21,7 +21,7 @@ class TestSpecialistRouting:
             assert agent.detect_task_type("Hello there") == "general"
 
     def test_routing_metrics_api_shape(self, mock_env_vars):
-        with patch('unified_accreditex_agent.AsyncOpenAI'), \
+        with patch('llm_gateway.AsyncOpenAI'), \
              patch('unified_accreditex_agent.firebase_admin'):
             agent = UnifiedAccreditexAgent()
 
@@ -0,0 +1,123 @@
+"""
+Tests for stale-while-revalidate caching
+"""
+import asyncio
+import time
+import pytest
+from cache import SimpleCache
+from stale_while_revalidate import StaleWhileRevalidate, StalenessPolicy, get_swr_stats
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.unit
+class TestStaleWhileRevalidate:
+    """Test suite for StaleWhileRevalidate"""
+
+    def _store(self):
+        backend = SimpleCache(default_ttl=60)
+        return backend, (lambda: backend.get("k")), (lambda env: backend.set("k", env, ttl=60))
+
+    def test_miss_loads_and_fresh_hit_skips_loader(self):
+        swr = StaleWhileRevalidate("test_fresh")
+        policy = StalenessPolicy(fresh_ttl=60, max_stale=60)
+        _, read, write = self._store()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {"projects": 3}
+
+        assert swr.get_or_load("ns", "k", policy, read, write, loader) == {"projects": 3}
+        assert swr.get_or_load("ns", "k", policy, read, write, loader) == {"projects": 3}
+        assert len(calls) == 1
+        counters = swr.get_stats()["namespaces"]["ns"]
+        assert counters["misses"] == 1
+        assert counters["fresh_hits"] == 1
+
+    def test_stale_value_served_while_refreshing(self):
+        swr = StaleWhileRevalidate("test_stale")
+        policy = StalenessPolicy(fresh_ttl=60, max_stale=60)
+        backend, read, write = self._store()
+        envelope = swr.wrap({"version": 1}, policy)
+        envelope["fresh_until"] = time.time() - 1
+        backend.set("k", envelope)
+
+        value = swr.get_or_load("ns", "k", policy, read, write, lambda: {"version": 2})
+
+        assert value == {"version": 1}
+        assert _wait_for(lambda: read()["v"] == {"version": 2})
+        counters = swr.get_stats()["namespaces"]["ns"]
+        assert counters["stale_hits"] == 1
+        assert _wait_for(lambda: swr.get_stats()["namespaces"]["ns"]["refreshes"] == 1)
+
+    def test_past_staleness_bound_loads_inline(self):
+        swr = StaleWhileRevalidate("test_expired")
+        policy = StalenessPolicy(fresh_ttl=60, max_stale=60)
+        backend, read, write = self._store()
+        envelope = swr.wrap({"version": 1}, policy)
+        envelope["fresh_until"] = envelope["stale_until"] = time.time() - 1
+        backend.set("k", envelope)
+
+        assert swr.get_or_load("ns", "k", policy, read, write, lambda: {"version": 2}) == {"version": 2}
+        assert swr.get_stats()["namespaces"]["ns"]["misses"] == 1
+
+    def test_failed_refresh_keeps_stale_value(self):
+        swr = StaleWhileRevalidate("test_refresh_error")
+        policy = StalenessPolicy(fresh_ttl=60, max_stale=60)
+        backend, read, write = self._store()
+        envelope = swr.wrap({"version": 1}, policy)
+        envelope["fresh_until"] = time.time() - 1
+        backend.set("k", envelope)
+
+        def failing_loader():
+            raise RuntimeError("firestore unavailable")
+
+        assert swr.get_or_load("ns", "k", policy, read, write, failing_loader) == {"version": 1}
+        assert _wait_for(lambda: swr.get_stats()["namespaces"]["ns"]["refresh_errors"] == 1)
+        assert read()["v"] == {"version": 1}
+
+    def test_error_payloads_are_not_cached(self):
+        swr = StaleWhileRevalidate("test_errors")
+        policy = StalenessPolicy(fresh_ttl=60, max_stale=60)
+        backend, read, write = self._store()
+
+        swr.get_or_load("ns", "k", policy, read, write, lambda: {"error": "not found"})
+
+        assert read() is None
+
+    @pytest.mark.asyncio
+    async def test_refresh_runs_off_the_event_loop(self):
+        swr = StaleWhileRevalidate("test_async")
+        policy = StalenessPolicy(fresh_ttl=60, max_stale=60)
+        backend, read, write = self._store()
+        envelope = swr.wrap({"version": 1}, policy)
+        envelope["fresh_until"] = time.time() - 1
+        backend.set("k", envelope)
+
+        def slow_loader():
+            time.sleep(0.05)
+            return {"version": 2}
+
+        assert swr.get_or_load("ns", "k", policy, read, write, slow_loader) == {"version": 1}
+        for _ in range(100):
+            if read()["v"] == {"version": 2}:
+                break
+            await asyncio.sleep(0.01)
+        assert read()["v"] == {"version": 2}
+
+    def test_policy_env_override(self, monkeypatch):
+        monkeypatch.setenv("SWR_WORKSPACE_ANALYTICS_MAX_STALE", "30")
+        policy = StalenessPolicy.from_env("workspace_analytics", fresh_ttl=120, max_stale=900)
+        assert policy == StalenessPolicy(fresh_ttl=120, max_stale=30)
+        assert policy.storage_ttl == 150
+
+    def test_registry_exposes_stats(self):
+        swr = StaleWhileRevalidate("test_registry")
+        assert "test_registry" in [stats["name"] for stats in get_swr_stats()]
+        del swr
@@ -0,0 +1,94 @@
+"""
+Tests for /chat streaming instrumentation
+"""
+import asyncio
+import contextvars
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from llm_gateway import LLMGateway
+from stream_metrics import StreamMetrics, ChatStreamObservation, begin_chat_observation, label_chat_stream, current_observation
+
+
+def _chunk(text, usage=None, x_groq=None):
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=usage)
+    if x_groq is not None:
+        chunk.x_groq = x_groq
+    return chunk
+
+
+@pytest.mark.unit
+class TestStreamMetrics:
+    """Test suite for StreamMetrics"""
+
+    def test_aggregates_by_task_route_and_model(self):
+        metrics = StreamMetrics()
+        for route_mode in ("specialist", "specialist", "legacy"):
+            observation = ChatStreamObservation(started=100.0)
+            observation.task_type = "risk"
+            observation.route_mode = route_mode
+            observation.on_upstream_first_token("big", 100.4)
+            observation.client_first_byte_at = 100.45
+            observation.gaps_ms = [20.0, 30.0, 250.0]
+            observation.on_upstream_done("big", 500, 60, usage_reported=True)
+            observation.finished_at = 101.0
+            metrics.record(observation)
+
+        series = {s["route_mode"]: s for s in metrics.get_stats()["series"]}
+        specialist = series["specialist"]
+        assert specialist["streams"] == 2
+        assert specialist["model"] == "big"
+        assert specialist["upstream_ttft_ms_p50"] == pytest.approx(400, abs=1)
+        assert specialist["first_byte_ms_p50"] == pytest.approx(450, abs=1)
+        assert specialist["max_gap_ms_p95"] == 250.0
+        assert specialist["tokens_per_sec_p50"] == pytest.approx(100, abs=1)
+        assert specialist["completion_tokens"] == 120
+        assert series["legacy"]["streams"] == 1
+
+    def test_labels_only_apply_inside_an_observation(self):
+        def outside():
+            label_chat_stream(task_type="risk")
+            return current_observation()
+
+        assert contextvars.copy_context().run(outside) is None
+
+        def inside():
+            observation = begin_chat_observation()
+            label_chat_stream(task_type="training", route_mode="cache")
+            return observation
+
+        observation = contextvars.copy_context().run(inside)
+        assert (observation.task_type, observation.route_mode) == ("training", "cache")
+
+    def test_client_chunks_record_first_byte_and_gaps(self):
+        observation = ChatStreamObservation()
+        for _ in range(3):
+            observation.on_client_chunk()
+        assert observation.client_first_byte_at is not None
+        assert len(observation.gaps_ms) == 2
+        assert observation.client_chunks == 3
+
+    @pytest.mark.asyncio
+    async def test_gateway_stream_reports_upstream_ttft_and_usage(self):
+        async def chunks():
+            await asyncio.sleep(0.02)
+            yield _chunk("Hel")
+            yield _chunk("lo")
+            yield _chunk(None, x_groq={"usage": {"prompt_tokens": 42, "completion_tokens": 7}})
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=AsyncMock(return_value=chunks()))))
+        gateway = LLMGateway(client)
+
+        async def run():
+            observation = begin_chat_observation()
+            stream = await gateway.create([{"role": "user", "content": "hi"}], model="big", stream=True)
+            async for _ in stream:
+                observation.on_client_chunk()
+            return observation
+
+        observation = await asyncio.create_task(run(), context=contextvars.copy_context())
+        assert observation.model == "big"
+        assert (observation.upstream_first_token_at - observation.started) >= 0.02
+        assert (observation.prompt_tokens, observation.completion_tokens) == (42, 7)
+        assert observation.usage_reported
+        assert gateway.get_stats()["by_model"]["big"]["prompt_tokens"] == 42
@@ -0,0 +1,106 @@
+"""
+Tests for token-budget-aware history trimming and summarization
+"""
+import pytest
+from conversation_store import ConversationThread
+from token_budget import HistoryBudget, estimate_tokens, truncate_to_tokens, SUMMARY_PREFIX
+
+
+def _thread(turns, words_per_message=20):
+    thread = ConversationThread("t1")
+    thread.set_system_prompt("You are the AccreditEx assistant.")
+    for i in range(turns):
+        thread.append("user", f"question {i} " + "policy " * words_per_message)
+        thread.append("assistant", f"answer {i} " + "standard " * words_per_message)
+    return thread
+
+
+@pytest.mark.unit
+class TestHistoryBudget:
+    """Test suite for HistoryBudget"""
+
+    def test_estimator_is_roughly_bpe_sized(self):
+        assert estimate_tokens("") == 0
+        assert 8 <= estimate_tokens("How do I prepare for the JCI accreditation survey?") <= 16
+        assert estimate_tokens("مرحبا") == 5
+
+    def test_short_history_is_sent_whole(self):
+        budget = HistoryBudget(max_prompt_tokens=6000, max_messages=10)
+        thread = _thread(2)
+        thread.append("user", "next question")
+        prompt = budget.build_prompt(thread)
+        assert len(prompt) == 6
+        assert prompt[-1]["content"] == "next question"
+        assert thread.evicted == []
+
+    def test_history_fits_token_budget_and_evicts_oldest(self):
+        budget = HistoryBudget(max_prompt_tokens=200, max_messages=50)
+        thread = _thread(6)
+        thread.append("user", "latest question")
+        prompt = budget.build_prompt(thread)
+
+        assert sum(estimate_tokens(m["content"]) + 4 for m in prompt) <= 200
+        assert prompt[-1]["content"] == "latest question"
+        assert thread.evicted
+        assert thread.evicted[0].content.startswith("question 0")
+        assert budget.get_stats()["prompt_tokens_saved_last"] > 0
+
+    def test_oversized_message_is_truncated_not_dropped(self):
+        budget = HistoryBudget(max_prompt_tokens=1000, max_messages=10)
+        thread = _thread(1)
+        huge = "Audit finding details. " * 5000
+        thread.append("user", huge)
+        prompt = budget.build_prompt(thread)
+
+        assert "characters omitted" in prompt[-1]["content"]
+        assert estimate_tokens(prompt[-1]["content"]) <= 1000
+        # The stored turn keeps its original text
+        assert thread.messages[-1].content == huge
+        assert budget.get_stats()["truncated_messages"] == 1
+
+    def test_message_cap_bounds_stored_history(self):
+        budget = HistoryBudget(max_prompt_tokens=100000, max_messages=10)
+        thread = _thread(15, words_per_message=1)
+        budget.build_prompt(thread)
+        assert len(thread) <= 11
+
+    @pytest.mark.asyncio
+    async def test_summary_folds_evicted_turns_into_prompt(self):
+        budget = HistoryBudget(max_prompt_tokens=200, max_messages=50)
+        thread = _thread(6)
+        thread.append("user", "latest question")
+        budget.build_prompt(thread)
+        evicted = len(thread.evicted)
+
+        async def complete(messages, max_tokens):
+            assert "question 0" in messages[1]["content"]
+            return "User asked about policies; assistant cited standards."
+
+        assert await budget.summarize(thread, complete)
+        assert thread.evicted == []
+        assert budget.get_stats()["summaries"] == 1
+
+        thread.append("assistant", "reply")
+        thread.append("user", "follow up")
+        prompt = budget.build_prompt(thread)
+        assert prompt[1]["content"].startswith(SUMMARY_PREFIX)
+        assert evicted > 0
+
+    @pytest.mark.asyncio
+    async def test_failed_summary_keeps_pending_turns(self):
+        budget = HistoryBudget(max_prompt_tokens=200, max_messages=50)
+        thread = _thread(6)
+        budget.build_prompt(thread)
+
+        async def complete(messages, max_tokens):
+            raise RuntimeError("rate limited")
+
+        assert not await budget.summarize(thread, complete)
+        assert thread.evicted
+        assert budget.get_stats()["summary_failures"] == 1
+
+    def test_truncate_keeps_head_and_tail(self):
+        text = "HEAD " + "middle " * 2000 + "TAIL"
+        truncated = truncate_to_tokens(text, 200)
+        assert truncated.startswith("HEAD")
+        assert truncated.endswith("TAIL")
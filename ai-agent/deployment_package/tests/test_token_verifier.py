@@ -0,0 +1,107 @@
+"""
+Tests for non-blocking Firebase ID-token verification
+"""
+import asyncio
+import threading
+import time
+import pytest
+from token_verifier import TokenVerifier
+
+
+class _FakeFirebaseAuth:
+    """verify_id_token stand-in that counts calls and records the calling thread"""
+
+    def __init__(self, delay=0.0, ttl=3600):
+        self.calls = 0
+        self.threads = set()
+        self.delay = delay
+        self.ttl = ttl
+
+    def verify_id_token(self, token):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if token.startswith("bad"):
+            raise ValueError("Invalid Firebase token")
+        return {"uid": token, "organizationId": "org-1", "exp": time.time() + self.ttl}
+
+
+@pytest.mark.unit
+class TestTokenVerifier:
+    """Test suite for TokenVerifier"""
+
+    @pytest.mark.asyncio
+    async def test_repeat_requests_skip_verification(self):
+        auth = _FakeFirebaseAuth()
+        verifier = TokenVerifier(auth.verify_id_token)
+        first = await verifier.verify("user-a")
+        second = await verifier.verify("user-a")
+
+        assert first == second and first["uid"] == "user-a"
+        assert auth.calls == 1
+        assert verifier.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_verification_runs_off_the_event_loop(self):
+        auth = _FakeFirebaseAuth(delay=0.05)
+        verifier = TokenVerifier(auth.verify_id_token)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        await verifier.verify("user-a")
+        task.cancel()
+
+        assert all(name.startswith("token-verify") for name in auth.threads)
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_requests_share_one_verification(self):
+        auth = _FakeFirebaseAuth(delay=0.02)
+        verifier = TokenVerifier(auth.verify_id_token)
+        results = await asyncio.gather(*[verifier.verify("user-a") for _ in range(10)])
+        assert auth.calls == 1
+        assert {result["uid"] for result in results} == {"user-a"}
+
+    @pytest.mark.asyncio
+    async def test_invalid_tokens_are_not_cached(self):
+        auth = _FakeFirebaseAuth()
+        verifier = TokenVerifier(auth.verify_id_token)
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await verifier.verify("bad-token")
+        assert auth.calls == 2
+        assert verifier.get_stats()["failures"] == 2
+
+    @pytest.mark.asyncio
+    async def test_tokens_near_expiry_are_reverified(self):
+        auth = _FakeFirebaseAuth(ttl=10)
+        verifier = TokenVerifier(auth.verify_id_token, expiry_margin=30)
+        await verifier.verify("user-a")
+        await verifier.verify("user-a")
+        assert auth.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_lru_bound_and_invalidate(self):
+        auth = _FakeFirebaseAuth()
+        verifier = TokenVerifier(auth.verify_id_token, max_entries=2)
+        for token in ("a", "b", "c"):
+            await verifier.verify(token)
+        assert verifier.get_stats()["cached_sessions"] == 2
+
+        await verifier.verify("a")  # evicted
+        verifier.invalidate("c")
+        await verifier.verify("c")
+        assert auth.calls == 5
+
+    @pytest.mark.asyncio
+    async def test_callers_get_their_own_copy(self):
+        verifier = TokenVerifier(_FakeFirebaseAuth().verify_id_token)
+        claims = await verifier.verify("user-a")
+        claims["organizationId"] = "tampered"
+        assert (await verifier.verify("user-a"))["organizationId"] == "org-1"
@@ -4,6 +4,7 @@ Unit tests for UnifiedAccreditexAgent
 import pytest
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from unified_accreditex_agent import UnifiedAccreditexAgent
+from conversation_store import ConversationStore
 import asyncio
 
 @pytest.mark.unit
@@ -13,20 +14,20 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_agent_initialization(self, mock_env_vars):
         """Test agent initializes with correct configuration"""
-        with patch('unified_accreditex_agent.AsyncOpenAI') as mock_openai, \
+        with patch('llm_gateway.AsyncOpenAI') as mock_openai, \
              patch('unified_accreditex_agent.firebase_admin'):
             
             agent = UnifiedAccreditexAgent()
             
             assert agent.client is not None
             assert agent.model == "llama-3.3-70b-versatile"
-            assert isinstance(agent.conversations, dict)
+            assert isinstance(agent.conversations, ConversationStore)
             assert len(agent.conversations) == 0
     
     @pytest.mark.asyncio
     async def test_initialize(self, mock_env_vars):
         """Test async initialization"""
-        with patch('unified_accreditex_agent.AsyncOpenAI'), \
+        with patch('llm_gateway.AsyncOpenAI'), \
              patch('unified_accreditex_agent.firebase_admin'):
             
             agent = UnifiedAccreditexAgent()
@@ -36,7 +37,7 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_get_system_prompt_basic(self, mock_env_vars):
         """Test system prompt generation without context"""
-        with patch('unified_accreditex_agent.AsyncOpenAI'), \
+        with patch('llm_gateway.AsyncOpenAI'), \
              patch('unified_accreditex_agent.firebase_admin'):
             
             agent = UnifiedAccreditexAgent()
@@ -49,7 +50,7 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_get_system_prompt_with_context(self, mock_env_vars, sample_context):
         """Test system prompt generation with full context"""
-        with patch('unified_accreditex_agent.AsyncOpenAI'), \
+        with patch('llm_gateway.AsyncOpenAI'), \
              patch('unified_accreditex_agent.firebase_admin'):
             
             agent = UnifiedAccreditexAgent()
@@ -70,7 +71,7 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_chat_creates_new_thread(self, mock_env_vars):
         """Test chat creates new conversation thread"""
-        with patch('unified_accreditex_agent.AsyncOpenAI') as mock_openai_class, \
+        with patch('llm_gateway.AsyncOpenAI') as mock_openai_class, \
              patch('unified_accreditex_agent.firebase_admin'), \
              patch('unified_accreditex_agent.firebase_client') as mock_fb_client:
             
@@ -108,7 +109,7 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_chat_maintains_history(self, mock_env_vars):
         """Test chat maintains conversation history"""
-        with patch('unified_accreditex_agent.AsyncOpenAI') as mock_openai_class, \
+        with patch('llm_gateway.AsyncOpenAI') as mock_openai_class, \
              patch('unified_accreditex_agent.firebase_admin'), \
              patch('unified_accreditex_agent.firebase_client') as mock_fb_client:
             
@@ -140,7 +141,7 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_get_organization_context(self, mock_env_vars, mock_firebase_client):
         """Test organization context fetching"""
-        with patch('unified_accreditex_agent.AsyncOpenAI'), \
+        with patch('llm_gateway.AsyncOpenAI'), \
              patch('unified_accreditex_agent.firebase_admin'), \
              patch('unified_accreditex_agent.firebase_client', mock_firebase_client):
             
@@ -155,7 +156,7 @@ class TestUnifiedAccreditexAgent:
     @pytest.mark.asyncio
     async def test_conversation_history_limit(self, mock_env_vars):
         """Test conversation history is limited to prevent memory issues"""
-        with patch('unified_accreditex_agent.AsyncOpenAI') as mock_openai_class, \
+        with patch('llm_gateway.AsyncOpenAI') as mock_openai_class, \
              patch('unified_accreditex_agent.firebase_admin'), \
              patch('unified_accreditex_agent.firebase_client') as mock_fb_client:
             
@@ -179,10 +180,36 @@ class TestUnifiedAccreditexAgent:
             # History should be limited (system + last 10 messages)
             assert len(agent.conversations["test-thread"]) <= 11
 
+    @pytest.mark.asyncio
+    async def test_thread_ids_do_not_cross_tenants(self, mock_env_vars):
+        """Test the same thread_id from another organization starts a separate thread"""
+        with patch('llm_gateway.AsyncOpenAI') as mock_openai_class, \
+             patch('unified_accreditex_agent.firebase_admin'), \
+             patch('unified_accreditex_agent.firebase_client'):
+            
+            mock_client = AsyncMock()
+            mock_openai_class.return_value = mock_client
+            
+            async def mock_stream():
+                yield MagicMock(choices=[MagicMock(delta=MagicMock(content="Response"))], usage=None, x_groq=None)
+            
+            mock_client.chat.completions.create.side_effect = lambda **kwargs: mock_stream()
+            
+            agent = UnifiedAccreditexAgent()
+            async for _ in agent.chat("Our secret plan", thread_id="shared", context={'organization_id': 'org-a', 'user_id': 'u1'}):
+                pass
+            async for _ in agent.chat("Hello", thread_id="shared", context={'organization_id': 'org-b', 'user_id': 'u2'}):
+                pass
+            
+            assert "shared" not in agent.conversations
+            tenant_b = agent.conversations["org-b:u2:shared"]
+            assert all(message['content'] != "Our secret plan" for message in tenant_b)
+            assert len(agent.conversations["org-a:u1:shared"]) == 3  # system + user + assistant
+
 @pytest.mark.unit
 def test_model_selection_groq(mock_env_vars):
     """Test model selection with Groq API key"""
-    with patch('unified_accreditex_agent.AsyncOpenAI'), \
+    with patch('llm_gateway.AsyncOpenAI'), \
          patch('unified_accreditex_agent.firebase_admin'):
         
         agent = UnifiedAccreditexAgent()
@@ -194,7 +221,7 @@ def test_model_selection_openai(mock_env_vars, monkeypatch):
     monkeypatch.delenv("GROQ_API_KEY", raising=False)
     monkeypatch.setenv("OPENAI_API_KEY", "test-openai-key")
     
-    with patch('unified_accreditex_agent.AsyncOpenAI'), \
+    with patch('llm_gateway.AsyncOpenAI'), \
          patch('unified_accreditex_agent.firebase_admin'):
         
         agent = UnifiedAccreditexAgent()
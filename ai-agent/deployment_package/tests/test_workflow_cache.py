@@ -0,0 +1,83 @@
+"""
+Tests for workflow result caching and in-flight dedup
+"""
+import asyncio
+import pytest
+from cache import SimpleCache
+from workflow_cache import WorkflowCache, cached_workflow, payload_hash
+
+
+class _FakeAgent:
+    """Minimal agent exposing a decorated workflow method"""
+
+    def __init__(self, delay=0.0):
+        self.workflow_cache = WorkflowCache(SimpleCache(default_ttl=900), ttl=900)
+        self.calls = 0
+        self.delay = delay
+
+    @cached_workflow("action_plan")
+    async def generate_action_plan(self, standard_id, item, status, findings=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"status": "completed", "action_plan": f"plan for {item}", "meta": {"model": "test"}}
+
+    @cached_workflow("root_cause_analysis")
+    async def analyze_root_cause(self, issue_title):
+        self.calls += 1
+        return {"status": "error", "error": "upstream failed"}
+
+
+@pytest.mark.unit
+class TestWorkflowCache:
+    """Test suite for WorkflowCache"""
+
+    def test_payload_hash_ignores_key_order(self):
+        assert payload_hash({"a": 1, "b": [1, 2]}) == payload_hash({"b": [1, 2], "a": 1})
+        assert payload_hash({"a": 1}) != payload_hash({"a": 2})
+
+    @pytest.mark.asyncio
+    async def test_identical_payload_served_from_cache(self):
+        agent = _FakeAgent()
+        first = await agent.generate_action_plan("IPSG.1", "Hand hygiene", "NonCompliant")
+        second = await agent.generate_action_plan(standard_id="IPSG.1", item="Hand hygiene", status="NonCompliant")
+
+        assert agent.calls == 1
+        assert first["meta"]["served_from_cache"] is False
+        assert second["meta"]["served_from_cache"] is True
+        assert second["meta"]["model"] == "test"
+        assert second["action_plan"] == first["action_plan"]
+
+    @pytest.mark.asyncio
+    async def test_different_payload_misses(self):
+        agent = _FakeAgent()
+        await agent.generate_action_plan("IPSG.1", "Hand hygiene", "NonCompliant")
+        await agent.generate_action_plan("IPSG.1", "Hand hygiene", "NonCompliant", findings="ICU only")
+        assert agent.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_double_submit_shares_one_completion(self):
+        agent = _FakeAgent(delay=0.05)
+        results = await asyncio.gather(*[
+            agent.generate_action_plan("IPSG.1", "Hand hygiene", "NonCompliant") for _ in range(5)
+        ])
+
+        assert agent.calls == 1
+        assert sum(1 for r in results if r["meta"].get("coalesced")) == 4
+        stats = agent.workflow_cache.get_stats()["by_workflow"]["action_plan"]
+        assert stats["misses"] == 1
+        assert stats["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_error_results_are_not_cached(self):
+        agent = _FakeAgent()
+        await agent.analyze_root_cause("Late CAPA closure")
+        await agent.analyze_root_cause("Late CAPA closure")
+        assert agent.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_result_is_not_mutated_by_callers(self):
+        agent = _FakeAgent()
+        first = await agent.generate_action_plan("IPSG.1", "Hand hygiene", "NonCompliant")
+        first["meta"]["tampered"] = True
+        second = await agent.generate_action_plan("IPSG.1", "Hand hygiene", "NonCompliant")
+        assert "tampered" not in second["meta"]
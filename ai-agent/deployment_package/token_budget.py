@@ -0,0 +1,240 @@
+"""
+Token-budget-aware chat history
+
+Estimates tokens offline (no tokenizer download), fits the system prompt,
+the rolling summary and the newest turns into a configurable prompt
+budget, and queues turns that no longer fit for summarization. The summary
+is produced after the response has been streamed, so the next turn does
+not wait for it.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+import math
+import os
+import re
+
+from conversation_store import ConversationThread, Message
+
+logger = logging.getLogger(__name__)
+
+# Latin words, single digits, non-Latin letters and punctuation, roughly
+# matching how BPE vocabularies split text
+_PIECES = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+# Role/format overhead the chat API adds per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate token count of text
+
+    English words cost about one token per four letters; digits,
+    punctuation and non-Latin characters cost about one token each.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        tokens += math.ceil(len(piece) / 4) if piece[0].isascii() and piece[0].isalpha() else 1
+    return tokens
+
+
+def estimate_message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of text within max_tokens (the middle is elided)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Scale by the measured chars/token ratio, then keep 2/3 head and 1/3 tail
+    ratio = len(text) / max(estimate_tokens(text), 1)
+    budget_chars = max(int(max_tokens * ratio) - 40, 0)
+    head = budget_chars * 2 // 3
+    tail = budget_chars - head
+    return f"{text[:head]}\n\n[... {len(text) - budget_chars} characters omitted ...]\n\n{text[len(text) - tail:] if tail else ''}"
+
+
+SUMMARY_PREFIX = "Summary of the earlier conversation (older turns were condensed):\n"
+
+
+class HistoryBudget:
+    """
+    Fits a thread into a prompt token budget
+
+    The system prompt and the newest user message are always sent (the
+    message truncated if it alone exceeds the budget). Older turns are kept
+    newest-first while they fit; the rest move to the thread's evicted queue
+    for summarization. A hard message cap bounds memory per thread.
+    """
+
+    def __init__(self, max_prompt_tokens: int = 6000, max_messages: int = 10, summary_max_tokens: int = 300):
+        """
+        Initialize budget policy
+
+        Args:
+            max_prompt_tokens: Budget for system prompt + summary + history
+            max_messages: Hard cap on stored history messages per thread
+            summary_max_tokens: Completion budget for each rolling summary
+        """
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_messages = max_messages
+        self.summary_max_tokens = summary_max_tokens
+
+        self._requests = 0
+        self._prompt_tokens = 0
+        self._tokens_saved = 0
+        self._last_saved = 0
+        self._truncated_messages = 0
+        self._summaries = 0
+        self._summary_failures = 0
+
+    def enforce_message_cap(self, thread: ConversationThread):
+        """Evict the oldest turns beyond max_messages (paths that don't build a prompt)"""
+        has_system = bool(thread.messages) and thread.messages[0].role == 'system'
+        history_count = len(thread.messages) - (1 if has_system else 0)
+        if history_count > self.max_messages:
+            self._account_evicted(thread, thread.evict_history(history_count - self.max_messages))
+
+    def build_prompt(self, thread: ConversationThread) -> List[Dict[str, str]]:
+        """
+        Evict what doesn't fit and return the messages to send
+
+        Args:
+            thread: Thread whose last message is the new user turn
+
+        Returns:
+            Chat-completions messages within the budget
+        """
+        self.enforce_message_cap(thread)
+        has_system = bool(thread.messages) and thread.messages[0].role == 'system'
+
+        system_tokens = estimate_message_tokens(thread.messages[0].content) if has_system else 0
+        summary_text = SUMMARY_PREFIX + thread.summary if thread.summary else ''
+        summary_tokens = estimate_message_tokens(summary_text) if summary_text else 0
+        remaining = self.max_prompt_tokens - system_tokens - summary_tokens
+
+        history = thread.messages[1:] if has_system else thread.messages
+        kept = 0
+        truncated_saving = 0
+        newest: Optional[Dict[str, str]] = None
+        for position, message in enumerate(reversed(history)):
+            cost = estimate_message_tokens(message.content)
+            if position == 0:
+                # The new turn is always sent; truncate it rather than drop it
+                if cost > remaining:
+                    allowed = max(remaining - MESSAGE_OVERHEAD_TOKENS, 256)
+                    content = truncate_to_tokens(message.content, allowed)
+                    truncated_saving = cost - estimate_message_tokens(content)
+                    cost -= truncated_saving
+                    newest = {'role': message.role, 'content': content}
+                    self._truncated_messages += 1
+                remaining -= cost
+                kept = 1
+                continue
+            if cost > remaining:
+                break
+            remaining -= cost
+            kept += 1
+
+        if kept < len(history):
+            self._account_evicted(thread, thread.evict_history(len(history) - kept))
+
+        prompt = []
+        if has_system:
+            prompt.append(thread.messages[0].to_dict())
+        if summary_text:
+            prompt.append({'role': 'system', 'content': summary_text})
+        kept_messages = thread.messages[1:] if has_system else thread.messages
+        prompt.extend(message.to_dict() for message in kept_messages)
+        if newest is not None:
+            prompt[-1] = newest
+
+        prompt_tokens = self.max_prompt_tokens - remaining
+        # Savings versus resending every turn of the thread verbatim
+        saved = max(thread.evicted_tokens + truncated_saving - summary_tokens, 0)
+        self._requests += 1
+        self._prompt_tokens += prompt_tokens
+        self._tokens_saved += saved
+        self._last_saved = saved
+        return prompt
+
+    @staticmethod
+    def _account_evicted(thread: ConversationThread, dropped: List[Message]):
+        thread.evicted_tokens += sum(estimate_message_tokens(message.content) for message in dropped)
+
+    async def summarize(
+        self,
+        thread: ConversationThread,
+        complete: Callable[[List[Dict[str, str]], int], Awaitable[str]]
+    ) -> bool:
+        """
+        Fold the thread's evicted turns into its rolling summary
+
+        Args:
+            thread: Thread with evicted turns queued
+            complete: Async completion call taking (messages, max_tokens)
+
+        Returns:
+            Whether the summary was updated
+        """
+        pending = list(thread.evicted)
+        if not pending:
+            return False
+
+        transcript = "\n".join(
+            f"{message.role.upper()}: {truncate_to_tokens(message.content, 600)}" for message in pending
+        )
+        messages = [
+            {
+                'role': 'system',
+                'content': (
+                    "You maintain a running summary of a healthcare accreditation assistant conversation. "
+                    "Merge the new turns into the existing summary. Keep facts, decisions, standards, "
+                    "project names and open questions. Reply with the summary only, under "
+                    f"{self.summary_max_tokens} tokens."
+                )
+            },
+            {
+                'role': 'user',
+                'content': f"Existing summary:\n{thread.summary or '(none)'}\n\nNew turns:\n{transcript}"
+            }
+        ]
+        try:
+            summary = (await complete(messages, self.summary_max_tokens) or '').strip()
+        except Exception as e:
+            self._summary_failures += 1
+            logger.warning(f"History summarization failed for {thread.thread_id}: {e}")
+            return False
+        if not summary:
+            self._summary_failures += 1
+            return False
+
+        thread.set_summary(truncate_to_tokens(summary, self.summary_max_tokens), folded=pending)
+        self._summaries += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prompt size and tokens-saved metrics"""
+        return {
+            'max_prompt_tokens': self.max_prompt_tokens,
+            'max_messages': self.max_messages,
+            'requests': self._requests,
+            'avg_prompt_tokens': round(self._prompt_tokens / self._requests, 1) if self._requests else 0.0,
+            'prompt_tokens_saved_total': self._tokens_saved,
+            'prompt_tokens_saved_avg': round(self._tokens_saved / self._requests, 1) if self._requests else 0.0,
+            'prompt_tokens_saved_last': self._last_saved,
+            'truncated_messages': self._truncated_messages,
+            'summaries': self._summaries,
+            'summary_failures': self._summary_failures
+        }
+
+
+def create_history_budget() -> HistoryBudget:
+    """History policy from HISTORY_TOKEN_BUDGET / HISTORY_MAX_MESSAGES / HISTORY_SUMMARY_TOKENS"""
+    return HistoryBudget(
+        max_prompt_tokens=int(os.getenv("HISTORY_TOKEN_BUDGET", "6000")),
+        max_messages=int(os.getenv("HISTORY_MAX_MESSAGES", "10")),
+        summary_max_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+    )
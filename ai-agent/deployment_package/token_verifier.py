@@ -0,0 +1,156 @@
+"""
+Non-blocking Firebase ID-token verification
+
+firebase_admin's verify_id_token checks the RS256 signature on the calling
+thread and, when Google's public certificates expire, fetches them over HTTP.
+Called from an async dependency that blocks the event loop for every request.
+TokenVerifier runs the check in a small dedicated thread pool and caches the
+decoded claims by token hash until shortly before the token's `exp`, so
+repeat requests from the same session skip verification entirely.
+Concurrent first requests with the same token share one verification.
+"""
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+from monitoring import percentile
+from singleflight import SingleFlight
+
+_SAMPLE_WINDOW = 500
+
+
+class TokenVerifier:
+    """Thread-pool token verification with a claims cache keyed by token hash"""
+
+    def __init__(
+        self,
+        verify: Callable[[str], Dict[str, Any]],
+        max_entries: int = 10000,
+        expiry_margin: float = 30.0,
+        max_workers: int = 4
+    ):
+        """
+        Initialize verifier
+
+        Args:
+            verify: Blocking verification returning decoded claims (firebase_auth.verify_id_token)
+            max_entries: Cached sessions kept per process (LRU)
+            expiry_margin: Seconds before `exp` at which a cached token must be re-verified
+            max_workers: Threads used for verification
+        """
+        self._verify = verify
+        self.max_entries = max_entries
+        self.expiry_margin = expiry_margin
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="token-verify")
+        self._flight = SingleFlight("token_verifier")
+        # token hash -> (claims, valid until); raw tokens are never stored
+        self._claims: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._failures = 0
+        self._verify_ms: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._claims.get(key)
+            if entry is None:
+                return None
+            claims, valid_until = entry
+            if time.time() >= valid_until:
+                del self._claims[key]
+                return None
+            self._claims.move_to_end(key)
+            return claims
+
+    def _store(self, key: str, claims: Dict[str, Any]):
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        valid_until = exp - self.expiry_margin
+        if valid_until <= time.time():
+            return
+        with self._lock:
+            self._claims[key] = (claims, valid_until)
+            self._claims.move_to_end(key)
+            while len(self._claims) > self.max_entries:
+                self._claims.popitem(last=False)
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Decoded claims of a valid token
+
+        Args:
+            token: Firebase ID token from the Authorization header
+
+        Returns:
+            Decoded claims (a copy; callers may modify it)
+
+        Raises:
+            Whatever the verify function raises for an invalid token
+        """
+        key = self._key(token)
+        claims = self._cached(key)
+        if claims is not None:
+            self._hits += 1
+            return dict(claims)
+        self._misses += 1
+
+        async def load() -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                decoded = await asyncio.get_running_loop().run_in_executor(self._executor, self._verify, token)
+            except Exception:
+                self._failures += 1
+                raise
+            finally:
+                self._verify_ms.append((time.perf_counter() - started) * 1000)
+            self._store(key, decoded)
+            return decoded
+
+        return dict(await self._flight.do_async(key, load))
+
+    def invalidate(self, token: str):
+        """Drop a token's cached claims (e.g. after sign-out or claim changes)"""
+        with self._lock:
+            self._claims.pop(self._key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache hit rate and verification latency"""
+        lookups = self._hits + self._misses
+        return {
+            'cached_sessions': len(self._claims),
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups * 100, 2) if lookups else 0.0,
+            'failures': self._failures,
+            'verify_ms_p50': percentile(self._verify_ms, 0.5, ndigits=2),
+            'verify_ms_p95': percentile(self._verify_ms, 0.95, ndigits=2)
+        }
+
+
+def create_token_verifier(verify: Callable[[str], Dict[str, Any]]) -> TokenVerifier:
+    """Verifier from TOKEN_CACHE_* settings"""
+    return TokenVerifier(
+        verify,
+        max_entries=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000")),
+        expiry_margin=float(os.getenv("TOKEN_CACHE_EXPIRY_MARGIN_SECONDS", "30")),
+        max_workers=int(os.getenv("TOKEN_VERIFY_THREADS", "4"))
+    )
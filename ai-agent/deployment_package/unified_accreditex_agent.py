@@ -2,14 +2,12 @@ import os
 import json
 import asyncio
 import time
-import hashlib
 from typing import List, Dict, Any, Optional, AsyncGenerator
 from datetime import datetime
 import logging
 
 # OpenAI SDK (used for Groq)
 import openai
-from openai import AsyncOpenAI
 
 # Firebase
 import firebase_admin
@@ -23,17 +21,23 @@ from dotenv import load_dotenv
 
 # Import Firebase client
 from firebase_client import firebase_client
+from async_firebase import AsyncFirebaseClient
 from monitoring import performance_monitor
+from cache import create_cache_backend
+from response_cache import ResponseCache, context_fingerprint
+from semantic_cache import create_semantic_cache
+from workflow_cache import cached_workflow, create_workflow_cache
+from conversation_store import ConversationThread, create_conversation_store, scoped_thread_id
+from token_budget import create_history_budget, estimate_tokens
+from llm_gateway import create_llm_gateway, last_served_model
+from stream_metrics import label_chat_stream
+from model_selector import ModelDecision, create_model_selector
+from llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, bind_request_scope, request_scope
 from document_analyzer import document_analyzer
 
 # Import specialist prompts (Quick Win 1)
-from specialist_prompts import (
-    TASK_ROUTING_MAP,
-    get_compliance_specialist_prompt,
-    get_risk_assessment_specialist_prompt,
-    get_training_specialist_prompt,
-    get_general_agent_prompt
-)
+from specialist_prompts import TASK_ROUTING_MAP
+from prompt_registry import prompt_registry
 
 # Import context manager (Quick Win 3)
 from context_manager import ContextManager
@@ -63,18 +67,16 @@ class UnifiedAccreditexAgent:
         self.client = None
         self.db = None
         
-        # Initialize Groq client using OpenAI SDK
-        # Groq is compatible with OpenAI's API structure
-        api_key = os.getenv("GROQ_API_KEY") or os.getenv("OPENAI_API_KEY")
-        base_url = "https://api.groq.com/openai/v1" if os.getenv("GROQ_API_KEY") else None
-        
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        # Initialize Groq client using OpenAI SDK (Groq is compatible with OpenAI's
+        # API structure). Every completion goes through the gateway: one pooled
+        # connection, timeouts, backoff and rate-limit fallback for all agents.
+        self.llm = create_llm_gateway()
+        self.client = self.llm.client
         
         # Initialize Firebase
         self.db = firebase_client.db
+        # Firestore reads awaited from request handlers run on a bounded pool
+        self.firestore = AsyncFirebaseClient(firebase_client)
         if self.db:
             logger.info("✅ Firebase database connected")
         else:
@@ -85,10 +87,26 @@ class UnifiedAccreditexAgent:
         self.fallback_model = "llama-3.1-8b-instant"
         self.temperature = 0.7
         self.max_tokens = 4096
+        # Per-request model and max_tokens from observed latency and quality
+        self.model_selector = create_model_selector(self.model, self.fallback_model)
         
-        # Response cache — avoids hitting the API for identical prompts
-        self._response_cache: Dict[str, Dict[str, Any]] = {}
+        # Response cache — avoids hitting the API for the same question asked
+        # against the same context in the same organization
+        # (shared across workers when CACHE_BACKEND=redis)
         self._cache_ttl = 600  # 10 minutes
+        self.response_cache = ResponseCache(
+            create_cache_backend(
+                namespace="llm_response",
+                default_ttl=self._cache_ttl,
+                max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000")),
+                max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+            ),
+            ttl=self._cache_ttl
+        )
+        # Near-duplicate matching for reworded questions (opt-in: SEMANTIC_CACHE_ENABLED)
+        self.semantic_cache = create_semantic_cache()
+        # Workflow results by payload hash; identical concurrent requests share one completion
+        self.workflow_cache = create_workflow_cache()
         
         # Initialize context manager (3-tier system)
         try:
@@ -101,14 +119,17 @@ class UnifiedAccreditexAgent:
         
         # Initialize specialist agents (Week 2 - Agent Specialization)
         logger.info("🤖 Initializing specialist agents...")
-        self.compliance_agent = ComplianceAgent(self.client, firebase_client)
-        self.risk_agent = RiskAssessmentAgent(self.client, firebase_client)
-        self.training_agent = TrainingCoordinator(self.client, firebase_client)
+        self.compliance_agent = ComplianceAgent(self.llm, firebase_client)
+        self.risk_agent = RiskAssessmentAgent(self.llm, firebase_client)
+        self.training_agent = TrainingCoordinator(self.llm, firebase_client)
         logger.info("✅ All specialist agents initialized")
         
-        # Conversation history (managed manually since not using Assistants API)
-        # In production, this should be in Redis or Firestore
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
+        # Conversation history (managed manually since not using Assistants API):
+        # LRU of hot threads, idle threads spill to SQLite/Firestore (CONVERSATION_BACKEND)
+        self.conversations = create_conversation_store(self.db)
+        # Token-budgeted history; evicted turns are summarized after the response is sent
+        self.history_budget = create_history_budget()
+        self._summary_tasks: set = set()
 
         # Routing mode and telemetry (additive, safe)
         self.strict_specialist_routing = os.getenv("STRICT_SPECIALIST_ROUTING", "true").lower() == "true"
@@ -163,47 +184,64 @@ class UnifiedAccreditexAgent:
         logger.info(f"✅ Agent initialized using model: {self.model} (fallback: {self.fallback_model})")
 
     # ── Response cache helpers ───────────────────────────────────────
-    def _cache_key(self, text: str) -> str:
-        return hashlib.sha256(text.encode()).hexdigest()
-
-    def _cache_get(self, key: str) -> Optional[str]:
-        entry = self._response_cache.get(key)
-        if entry and time.time() < entry['expires']:
+    def _cache_get(self, key: str, task_type: str) -> Optional[str]:
+        value = self.response_cache.get(key, task_type)
+        if value:
             logger.info("✅ Cache HIT — returning cached response (0 tokens used)")
-            return entry['value']
-        if entry:
-            del self._response_cache[key]
-        return None
-
-    def _cache_set(self, key: str, value: str):
-        self._response_cache[key] = {
-            'value': value,
-            'expires': time.time() + self._cache_ttl
-        }
-        # Evict old entries (keep max 200)
-        if len(self._response_cache) > 200:
-            oldest = min(self._response_cache, key=lambda k: self._response_cache[k]['expires'])
-            del self._response_cache[oldest]
+        return value
+
+    def _cache_set(self, key: str, task_type: str, value: str, organization_id: Optional[str] = None):
+        self.response_cache.set(key, task_type, value, organization_id)
+
+    async def _semantic_get(self, organization_id: Optional[str], scope: str, message: str) -> Optional[str]:
+        if not self.semantic_cache or not organization_id:
+            return None
+        # Vectorizing and scoring run on a worker; a lookup also waits out any refit holding the index lock
+        match = await asyncio.to_thread(self.semantic_cache.lookup, organization_id, scope, message)
+        if not match:
+            return None
+        response, similarity = match
+        logger.info(f"✅ Semantic cache HIT (similarity {similarity:.2f}) — returning cached response")
+        return response
+
+    async def _semantic_set(self, organization_id: Optional[str], scope: str, message: str, value: str):
+        if self.semantic_cache and organization_id:
+            # Periodic IDF refits rebuild the org matrix; keep them off the event loop
+            await asyncio.to_thread(self.semantic_cache.add, organization_id, scope, message, value)
+
+    # ── History summarization ────────────────────────────────────────
+    def _schedule_summary(self, thread: ConversationThread):
+        """Fold evicted turns into the thread summary without delaying the response"""
+        if not thread.evicted or any(task.get_name() == thread.thread_id for task in self._summary_tasks):
+            return
+        task = asyncio.create_task(
+            self.history_budget.summarize(thread, self._complete_summary),
+            name=thread.thread_id
+        )
+        self._summary_tasks.add(task)
+        task.add_done_callback(self._summary_tasks.discard)
+
+    async def _complete_summary(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        # The lighter model is plenty for condensing history; it is background work
+        with request_scope(priority=PRIORITY_BATCH):
+            return await self.llm.complete_text(
+                messages,
+                model=self.fallback_model,
+                max_tokens=max_tokens,
+                temperature=0.2,
+                fallback=False,
+            )
 
     # ── Rate-limit-aware API call ────────────────────────────────────
-    async def _create_completion(self, messages, stream=True, max_tokens=None, temperature=None):
-        """Call Groq with automatic fallback to lighter model on 429."""
-        kwargs = {
-            'model': self.model,
-            'messages': messages,
-            'stream': stream,
-            'temperature': temperature or self.temperature,
-            'max_tokens': max_tokens or 1024,
-        }
-        try:
-            return await self.client.chat.completions.create(**kwargs)
-        except Exception as e:
-            error_str = str(e)
-            if '429' in error_str or 'rate_limit' in error_str.lower():
-                logger.warning(f"⚠️ Rate-limited on {self.model}, falling back to {self.fallback_model}")
-                kwargs['model'] = self.fallback_model
-                return await self.client.chat.completions.create(**kwargs)
-            raise
+    async def _create_completion(self, messages, stream=True, max_tokens=None, temperature=None, model=None):
+        """Call Groq through the gateway (timeouts, backoff, fallback to lighter model on 429)."""
+        return await self.llm.create(
+            messages,
+            model=model or self.model,
+            stream=stream,
+            temperature=temperature or self.temperature,
+            max_tokens=max_tokens or 1024,
+        )
 
     def _estimate_quality_confidence(self, text: str) -> float:
         """Simple deterministic quality score for workflow output confidence."""
@@ -223,17 +261,56 @@ class UnifiedAccreditexAgent:
             return 0.74
         return 0.62
 
-    def _build_workflow_response(self, field_name: str, content: str) -> Dict[str, Any]:
+    def _record_model_outcome(self, decision: ModelDecision, started: float, content: str,
+                              completion_tokens: Optional[int] = None, success: bool = True):
+        """Feed latency, quality confidence and length of a response back to the model selector"""
+        self.model_selector.record(
+            decision,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            quality=self._estimate_quality_confidence(content) if success else 0.0,
+            completion_tokens=completion_tokens if completion_tokens is not None else estimate_tokens(content or ""),
+            # The gateway may have answered on the fallback model (429, open breaker, hedge)
+            served_model=last_served_model() if success else None,
+        )
+
+    async def _complete_workflow(self, field_name: str, messages: List[Dict[str, str]],
+                                 max_tokens: int = 2048) -> Dict[str, Any]:
+        """Run a workflow completion on the selected model and build its response"""
+        decision = self.model_selector.select(field_name, None, messages[-1]["content"], default_max_tokens=max_tokens)
+        started = time.perf_counter()
+        try:
+            response = await self._create_completion(
+                messages=messages,
+                stream=False,
+                max_tokens=decision.max_tokens,
+                model=decision.model,
+            )
+        except Exception:
+            self._record_model_outcome(decision, started, "", completion_tokens=0, success=False)
+            raise
+        content = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        self._record_model_outcome(
+            decision, started, content, completion_tokens=getattr(usage, "completion_tokens", None)
+        )
+        return self._build_workflow_response(field_name, content, decision, served_model=last_served_model())
+
+    def _build_workflow_response(self, field_name: str, content: str,
+                                 decision: Optional[ModelDecision] = None,
+                                 served_model: Optional[str] = None) -> Dict[str, Any]:
         """Build a consistent workflow response payload with additive metadata."""
+        meta = {
+            "route_mode": "endpoint",
+            "model": served_model or (decision.model if decision else self.model),
+            "quality_confidence": self._estimate_quality_confidence(content),
+        }
+        if decision:
+            meta["model_selection"] = decision.as_meta()
         return {
             "status": "completed",
             field_name: content,
             "timestamp": datetime.now().isoformat(),
-            "meta": {
-                "route_mode": "endpoint",
-                "model": self.model,
-                "quality_confidence": self._estimate_quality_confidence(content),
-            }
+            "meta": meta
         }
 
     async def _get_organization_context(self, user_id: Optional[str] = None, organization_id: Optional[str] = None) -> Dict[str, Any]:
@@ -261,7 +338,7 @@ class UnifiedAccreditexAgent:
         try:
             # Get comprehensive user context from Firebase client
             if user_id:
-                user_context = firebase_client.get_user_context(user_id, organization_id)
+                user_context = await self.firestore.get_user_context(user_id, organization_id)
                 
                 if not user_context.get('error'):
                     # Extract user data
@@ -291,7 +368,7 @@ class UnifiedAccreditexAgent:
             
             # Get workspace analytics
             if organization_id:
-                analytics = firebase_client.get_workspace_analytics(organization_id)
+                analytics = await self.firestore.get_workspace_analytics(organization_id)
             else:
                 analytics = {}
             if analytics:
@@ -398,7 +475,9 @@ class UnifiedAccreditexAgent:
         task_type: str,
         message: str,
         context: Optional[Dict[str, Any]] = None,
-        stream: bool = True
+        stream: bool = True,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None
     ) -> AsyncGenerator[str, None]:
         """
         Route request to appropriate specialist agent (Week 2)
@@ -408,6 +487,8 @@ class UnifiedAccreditexAgent:
             message: User message
             context: Optional context dictionary
             stream: Whether to stream response
+            model: Model to answer with (defaults to the agent's model)
+            max_tokens: Completion cap (defaults to the agent's cap)
             
         Yields:
             Response chunks from specialist
@@ -416,28 +497,30 @@ class UnifiedAccreditexAgent:
         
         # Route to appropriate specialist
         if task_type == 'compliance':
-            async for chunk in self.compliance_agent.chat(message, context, stream):
+            async for chunk in self.compliance_agent.chat(message, context, stream, model=model, max_tokens=max_tokens):
                 yield chunk
                 
         elif task_type == 'risk':
-            async for chunk in self.risk_agent.chat(message, context, stream):
+            async for chunk in self.risk_agent.chat(message, context, stream, model=model, max_tokens=max_tokens):
                 yield chunk
                 
         elif task_type == 'training':
-            async for chunk in self.training_agent.chat(message, context, stream):
+            async for chunk in self.training_agent.chat(message, context, stream, model=model, max_tokens=max_tokens):
                 yield chunk
                 
         else:
             # Fallback to unified agent for general queries
             logger.info("📝 Using unified agent for general query")
-            async for chunk in self._general_chat(message, context, stream):
+            async for chunk in self._general_chat(message, context, stream, model=model, max_tokens=max_tokens):
                 yield chunk
     
     async def _general_chat(
         self,
         message: str,
         context: Optional[Dict[str, Any]] = None,
-        stream: bool = True
+        stream: bool = True,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None
     ) -> AsyncGenerator[str, None]:
         """
         Handle general (non-specialist) chat queries
@@ -446,12 +529,15 @@ class UnifiedAccreditexAgent:
             message: User message
             context: Optional context
             stream: Whether to stream
+            model: Model to answer with (defaults to the agent's model)
+            max_tokens: Completion cap (defaults to the agent's cap)
             
         Yields:
             Response chunks
         """
+        model = model or self.model
         # Get general agent prompt
-        system_prompt = get_general_agent_prompt()
+        system_prompt = prompt_registry.get('general', model=model)
         
         # Add context if available
         if context:
@@ -466,12 +552,12 @@ class UnifiedAccreditexAgent:
         ]
         
         # Stream response
-        stream_response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
+        stream_response = await self._create_completion(
+            messages,
+            stream=stream,
             temperature=self.temperature,
-            max_tokens=self.max_tokens,
-            stream=stream
+            max_tokens=max_tokens or self.max_tokens,
+            model=model
         )
         
         if stream:
@@ -497,28 +583,30 @@ class UnifiedAccreditexAgent:
         
         return context_text
 
-    def _get_base_system_prompt(self, context: Optional[Dict[str, Any]] = None, ai_instructions: Optional[Dict[str, Any]] = None, task_type: str = 'general') -> str:
+    def _get_base_system_prompt(self, context: Optional[Dict[str, Any]] = None, ai_instructions: Optional[Dict[str, Any]] = None, task_type: str = 'general', model: Optional[str] = None) -> str:
         """
         Get the system prompt with dynamic context and specialist routing
         
         Args:
             context: Application context (user, page, data)
             task_type: Type of task (compliance, risk, training, general)
+            model: Model the prompt is sent to (defaults to the agent's model)
         """
         
-        # Select specialist prompt based on task type
+        # Select the prebuilt specialist prompt based on task type; the compact
+        # variant is used when the full one would crowd the history budget
         if task_type == 'compliance':
-            base_prompt = get_compliance_specialist_prompt()
             logger.info("📋 Using Compliance Specialist prompt")
         elif task_type == 'risk':
-            base_prompt = get_risk_assessment_specialist_prompt()
             logger.info("⚠️ Using Risk Assessment Specialist prompt")
         elif task_type == 'training':
-            base_prompt = get_training_specialist_prompt()
             logger.info("🎓 Using Training Coordinator prompt")
         else:
-            base_prompt = get_general_agent_prompt()
+            task_type = 'general'
             logger.info("💬 Using General Agent prompt")
+        base_prompt = prompt_registry.get(
+            task_type, model=model or self.model, max_prompt_tokens=self.history_budget.max_prompt_tokens
+        )
         
         # Add dynamic context if provided
         if context:
@@ -615,32 +703,25 @@ Always be specific and actionable, using real data from their workspace.
         Now with specialist routing, tiered context management, caching, and fallback model.
         """
         try:
-            # ── Check response cache first (saves 100 % of tokens on repeat requests)
-            cache_key = self._cache_key(message)
-            cached = self._cache_get(cache_key)
-            if cached:
-                yield cached
-                return
-
-            # Generate thread_id if not provided
-            if not thread_id:
-                thread_id = f"thread_{datetime.now().timestamp()}"
-            
             # Detect task type from message (Quick Win 1)
             task_type = self.detect_task_type(message)
+            label_chat_stream(task_type=task_type)
             
             # ── Context loading — SKIP heavy Firebase fetch when frontend
             #    already omitted context (writing / document commands).
             user_id = context.get('user_id') if context else None
             organization_id = context.get('organization_id') if context else None
             has_context = bool(context and context.get('current_data'))
+            context_tier = None
+            # Interactive chat is admitted ahead of workflow and batch calls
+            bind_request_scope(organization_id, PRIORITY_INTERACTIVE)
 
             if has_context and user_id:
                 # Interactive chat — load tiered context
                 context_tier = context.get('context_tier') if context else None
                 if not context_tier:
                     context_tier = self.context_manager.detect_context_tier(message)
-                tiered_context = self.context_manager.get_context(user_id, context_tier, organization_id)
+                tiered_context = await self.context_manager.get_context_async(user_id, context_tier, organization_id)
                 logger.info(f"📦 Using {context_tier} context tier ({len(str(tiered_context))} chars)")
                 org_context = await self._get_organization_context(user_id, organization_id)
                 enhanced_context = {
@@ -654,59 +735,99 @@ Always be specific and actionable, using real data from their workspace.
                 enhanced_context = context or {}
                 logger.info("⚡ Lightweight request — skipping context fetch")
             
-            # Initialize conversation history if new thread
-            if thread_id not in self.conversations:
-                self.conversations[thread_id] = [
-                    {"role": "system", "content": self._get_base_system_prompt(context=enhanced_context if has_context else None, task_type=task_type)}
-                ]
+            # ── Check response cache (saves 100 % of tokens on repeat requests).
+            #    Keyed on tenant + task + tier + context so answers never cross orgs.
+            cache_key = self.response_cache.make_key(
+                message, task_type, organization_id, context_tier, enhanced_context
+            )
+            cached = self._cache_get(cache_key, task_type)
+            # Reworded repeats only match within the same task, tier and context
+            semantic_scope = f"{task_type}:{context_tier or 'none'}:{context_fingerprint(enhanced_context)}"
+            if not cached:
+                cached = await self._semantic_get(organization_id, semantic_scope, message)
+            if cached:
+                label_chat_stream(route_mode="cache")
+                yield cached
+                return
+
+            # Model and completion cap for this turn (latency/quality bandit)
+            specialist_route = self.strict_specialist_routing and task_type in ("compliance", "risk", "training")
+            decision = self.model_selector.select(
+                task_type, context_tier, message,
+                default_max_tokens=self.compliance_agent.max_tokens if specialist_route else 1024
+            )
+            label_chat_stream(model_selection=decision.as_meta())
+            
+            # Load (or lazily restore) the thread. Without a thread_id the client
+            # can never continue the conversation, so it is not stored at all.
+            # Stored threads are keyed by tenant and user as well as thread_id.
+            if thread_id:
+                thread = await self.conversations.aget_or_create(
+                    scoped_thread_id(thread_id, organization_id, user_id)
+                )
             else:
-                self.conversations[thread_id][0] = {
-                    "role": "system", 
-                    "content": self._get_base_system_prompt(context=enhanced_context if has_context else None, task_type=task_type)
-                }
+                thread = ConversationThread(f"thread_{datetime.now().timestamp()}")
+            thread.set_system_prompt(
+                self._get_base_system_prompt(
+                    context=enhanced_context if has_context else None, task_type=task_type, model=decision.model
+                )
+            )
 
             # Append user message
-            self.conversations[thread_id].append({"role": "user", "content": message})
+            thread.append("user", message)
 
             routing_start = time.perf_counter()
+            attempt_start = routing_start
             route_mode = "legacy"
             full_response = ""
 
             # Strict specialist dispatch for specialist task types (safe fallback enabled)
-            if self.strict_specialist_routing and task_type in ("compliance", "risk", "training"):
+            if specialist_route:
                 route_mode = "specialist"
+                label_chat_stream(route_mode=route_mode)
                 try:
                     async for chunk in self.route_to_specialist(
                         task_type=task_type,
                         message=message,
                         context=enhanced_context,
-                        stream=True
+                        stream=True,
+                        model=decision.model,
+                        max_tokens=decision.max_tokens
                     ):
                         full_response += chunk
                         yield chunk
 
-                    self.conversations[thread_id].append({"role": "assistant", "content": full_response})
+                    thread.append("assistant", full_response)
+                    if thread_id:
+                        self.history_budget.enforce_message_cap(thread)
+                        await self.conversations.acommit(thread)
+                        self._schedule_summary(thread)
                     latency_ms = (time.perf_counter() - routing_start) * 1000
                     self._record_routing_metric(task_type, route_mode, latency_ms, success=True)
-                    self._cache_set(cache_key, full_response)
+                    self._record_model_outcome(decision, attempt_start, full_response)
+                    self._cache_set(cache_key, task_type, full_response, organization_id)
+                    await self._semantic_set(organization_id, semantic_scope, message, full_response)
                     return
                 except Exception as specialist_error:
                     logger.error(f"Specialist routing failed, falling back to legacy path: {specialist_error}")
                     latency_ms = (time.perf_counter() - routing_start) * 1000
                     self._record_routing_metric(task_type, route_mode, latency_ms, success=False)
+                    self._record_model_outcome(decision, attempt_start, full_response, success=False)
+                    attempt_start = time.perf_counter()
                     route_mode = "legacy-fallback"
+                    label_chat_stream(route_mode=route_mode)
 
             
-            # Keep history manageable (last 6 messages + system prompt — reduced from 10)
-            if len(self.conversations[thread_id]) > 7:
-                self.conversations[thread_id] = [self.conversations[thread_id][0]] + self.conversations[thread_id][-6:]
+            # Fit system prompt + summary + newest turns into the token budget
+            prompt_messages = self.history_budget.build_prompt(thread)
 
             # Stream response with automatic fallback on rate limit
             stream = await self._create_completion(
-                messages=self.conversations[thread_id],
+                messages=prompt_messages,
                 stream=True,
-                max_tokens=1024,
+                max_tokens=decision.max_tokens,
                 temperature=0.7,
+                model=decision.model,
             )
 
             async for chunk in stream:
@@ -716,16 +837,23 @@ Always be specific and actionable, using real data from their workspace.
                     yield content
             
             # Append to history + cache
-            self.conversations[thread_id].append({"role": "assistant", "content": full_response})
+            thread.append("assistant", full_response)
+            if thread_id:
+                self.history_budget.enforce_message_cap(thread)
+                await self.conversations.acommit(thread)
+                self._schedule_summary(thread)
             latency_ms = (time.perf_counter() - routing_start) * 1000
             self._record_routing_metric(task_type, route_mode, latency_ms, success=True)
-            self._cache_set(cache_key, full_response)
+            self._record_model_outcome(decision, attempt_start, full_response)
+            self._cache_set(cache_key, task_type, full_response, organization_id)
+            await self._semantic_set(organization_id, semantic_scope, message, full_response)
             
         except Exception as e:
             logger.error(f"Chat error: {e}")
             self._record_routing_metric('general', 'legacy', 0.0, success=False)
             yield f"I encountered an error: {str(e)}"
 
+    @cached_workflow("document_compliance")
     async def check_document_compliance(self, document_type: str, standard: str, content_summary: str, requirements: Optional[List[str]] = None) -> Dict[str, Any]:
         """Check if a document meets specific standards"""
         prompt = f"""
@@ -743,12 +871,13 @@ Always be specific and actionable, using real data from their workspace.
         3. Recommendations
         """
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create_completion(
             messages=[
                 {"role": "system", "content": "You are a compliance auditor."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            stream=False,
+            max_tokens=self.max_tokens
         )
         
         return {
@@ -768,12 +897,13 @@ Always be specific and actionable, using real data from their workspace.
         Provide a risk assessment (Low/Medium/High) and immediate actions needed.
         """
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create_completion(
             messages=[
                 {"role": "system", "content": "You are a risk management expert."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            stream=False,
+            max_tokens=self.max_tokens
         )
         
         return {
@@ -793,12 +923,13 @@ Always be specific and actionable, using real data from their workspace.
         Suggest 3 specific training modules or activities.
         """
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
+        response = await self._create_completion(
             messages=[
                 {"role": "system", "content": "You are a healthcare training coordinator."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            stream=False,
+            max_tokens=self.max_tokens
         )
         
         return {
@@ -810,6 +941,7 @@ Always be specific and actionable, using real data from their workspace.
     # Week 3: Dedicated AI Workflow Methods
     # ─────────────────────────────────────────────────────────────
 
+    @cached_workflow("action_plan")
     async def generate_action_plan(self, standard_id: str, item: str, status: str, findings: Optional[str] = None) -> Dict[str, Any]:
         """Generate actionable compliance action plan"""
         system_prompt = f"""You are an expert compliance consultant helping create actionable action plans.
@@ -837,19 +969,12 @@ Provide:
 5. Success metrics
 6. Required resources"""
 
-        response = await self._create_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2048
-        )
-
-        return self._build_workflow_response(
-            "action_plan",
-            response.choices[0].message.content,
-        )
+        return await self._complete_workflow("action_plan", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ])
 
+    @cached_workflow("root_cause_analysis")
     async def analyze_root_cause(self, issue_title: str, description: str, context: Optional[str] = None, affected_areas: Optional[List[str]] = None) -> Dict[str, Any]:
         """Perform structured root cause analysis"""
         system_prompt = """You are a Root Cause Analysis expert using the "5 Whys" methodology and Fishbone Diagram thinking.
@@ -876,19 +1001,12 @@ Use the 5 Whys methodology and provide:
 5. Preventive and corrective actions
 6. Implementation plan"""
 
-        response = await self._create_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2048
-        )
-
-        return self._build_workflow_response(
-            "root_cause_analysis",
-            response.choices[0].message.content,
-        )
+        return await self._complete_workflow("root_cause_analysis", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ])
 
+    @cached_workflow("pdca_improvements")
     async def suggest_pdca_improvements(self, process_name: str, current_state: str, problem_identified: str, previous_actions: Optional[str] = None) -> Dict[str, Any]:
         """Suggest Plan-Do-Check-Act improvements"""
         system_prompt = """You are a Quality Improvement specialist trained in PDCA (Plan-Do-Check-Act) methodology.
@@ -913,19 +1031,12 @@ Provide a PDCA cycle with:
 4. **ACT**: How will you standardize? (documentation, training, monitoring)
 5. **Expected Outcomes**: What will success look like?"""
 
-        response = await self._create_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2048
-        )
-
-        return self._build_workflow_response(
-            "pdca_improvements",
-            response.choices[0].message.content,
-        )
+        return await self._complete_workflow("pdca_improvements", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ])
 
+    @cached_workflow("survey_risk_assessment")
     async def assess_survey_risk(self, standard: str, organization_area: str, readiness_level: str, critical_concerns: Optional[List[str]] = None, survey_date: Optional[str] = None) -> Dict[str, Any]:
         """Assess readiness risk for upcoming accreditation survey"""
         system_prompt = f"""You are an accreditation survey readiness expert specializing in {standard} standards.
@@ -953,19 +1064,12 @@ Provide:
 5. **Recommended Timeline**: Realistic completion dates
 6. **Mock Survey Scenarios**: Likely surveyor questions and recommended responses"""
 
-        response = await self._create_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2048
-        )
-
-        return self._build_workflow_response(
-            "survey_risk_assessment",
-            response.choices[0].message.content,
-        )
+        return await self._complete_workflow("survey_risk_assessment", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ])
 
+    @cached_workflow("design_compliance")
     async def check_design_compliance(self, design_element: str, requirement: str, current_implementation: str, design_phase: Optional[str] = None) -> Dict[str, Any]:
         """Assess design control compliance"""
         system_prompt = """You are a Design Control and Quality Assurance expert in healthcare.
@@ -993,25 +1097,17 @@ Provide:
 6. **Validation Plan**: How to prove design meets requirements
 7. **Traceability**: Link back to original requirements"""
 
-        response = await self._create_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2048
-        )
-
-        return self._build_workflow_response(
-            "design_compliance_assessment",
-            response.choices[0].message.content,
-        )
+        return await self._complete_workflow("design_compliance_assessment", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ])
 
     async def get_project_insights(self, project_id: str, user_id: str, organization_id: str) -> Dict[str, Any]:
         """
         Get AI-generated insights for a specific project using Firebase data
         """
         try:
-            project = firebase_client.get_project_details(project_id, organization_id)
+            project = await self.firestore.get_project_details(project_id, organization_id)
             
             if not project:
                 return {'error': 'Project not found'}
@@ -1045,12 +1141,12 @@ Provide a comprehensive analysis with:
 
 Format your response in clear Markdown with headings and bullet points."""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            response = await self._create_completion(
                 messages=[
                     {"role": "system", "content": "You are an expert healthcare accreditation consultant providing strategic project insights."},
                     {"role": "user", "content": prompt}
                 ],
+                stream=False,
                 temperature=0.7,
                 max_tokens=2048
             )
@@ -1073,7 +1169,7 @@ Format your response in clear Markdown with headings and bullet points."""
         """
         try:
             # Search Firebase
-            results = firebase_client.search_documents(query, organization_id, document_type)
+            results = await self.firestore.search_documents(query, organization_id, document_type)
             
             if not results:
                 return {
@@ -1096,12 +1192,12 @@ Found documents:
 Rank these documents by relevance to the search query and explain why each is relevant.
 Format with clear headings and bullet points."""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            response = await self._create_completion(
                 messages=[
                     {"role": "system", "content": "You are a document management expert helping users find relevant compliance documents."},
                     {"role": "user", "content": prompt}
                 ],
+                stream=False,
                 temperature=0.5,
                 max_tokens=1024
             )
@@ -1123,7 +1219,7 @@ Format with clear headings and bullet points."""
         Get user's training status with AI recommendations
         """
         try:
-            training_status = firebase_client.get_user_training_status(user_id, organization_id)
+            training_status = await self.firestore.get_user_training_status(user_id, organization_id)
             
             if training_status.get('error'):
                 return training_status
@@ -1145,12 +1241,12 @@ Provide:
 
 Format with clear Markdown headings."""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            response = await self._create_completion(
                 messages=[
                     {"role": "system", "content": "You are a healthcare training coordinator providing personalized training recommendations."},
                     {"role": "user", "content": prompt}
                 ],
+                stream=False,
                 temperature=0.7,
                 max_tokens=1024
             )
@@ -0,0 +1,157 @@
+"""
+Result cache and in-flight dedup for workflow endpoints
+
+Workflow prompts are built only from the request payload, so an identical
+payload produces an equivalent completion. Results are cached by a hash of
+the payload for a short TTL, and identical concurrent requests (frontend
+double-submits) share one completion through single-flight.
+"""
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+
+from cache import CacheBackend, create_cache_backend
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """Stable hash of a workflow payload (key order and whitespace insensitive)"""
+    canonical = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _cacheable(result: Any) -> bool:
+    return isinstance(result, dict) and not result.get('error') and result.get('status', 'completed') == 'completed'
+
+
+def _annotate(result: Dict[str, Any], served_from_cache: bool, coalesced: bool = False,
+              cached_at: Optional[float] = None) -> Dict[str, Any]:
+    """Copy a result and record how it was served in its meta block"""
+    annotated = dict(result)
+    meta = dict(annotated.get('meta') or {})
+    meta['served_from_cache'] = served_from_cache
+    if coalesced:
+        meta['coalesced'] = True
+    if cached_at is not None:
+        meta['cache_age_seconds'] = round(time.time() - cached_at, 1)
+    annotated['meta'] = meta
+    return annotated
+
+
+class WorkflowCache:
+    """Payload-hash cache with single-flight for async workflow methods"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = 900):
+        """
+        Initialize workflow cache
+
+        Args:
+            backend: Cache backend holding results
+            ttl: Seconds a result may be reused for an identical payload
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self._flights = SingleFlight('workflow_cache')
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, workflow: str, field: str):
+        counters = self._stats.setdefault(workflow, {'hits': 0, 'misses': 0, 'coalesced': 0})
+        counters[field] += 1
+
+    async def run(
+        self,
+        workflow: str,
+        payload: Dict[str, Any],
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Serve a cached result or compute it once for all identical callers
+
+        Args:
+            workflow: Workflow name (part of the key and metrics label)
+            payload: Arguments the result depends on
+            compute: Coroutine factory producing the result on a miss
+
+        Returns:
+            Result with meta.served_from_cache set
+        """
+        key = f"{workflow}:{payload_hash(payload)}"
+        entry = self.backend.get(key)
+        if entry is not None:
+            self._count(workflow, 'hits')
+            return _annotate(entry['result'], True, cached_at=entry.get('cached_at'))
+
+        ran = False
+
+        async def load():
+            nonlocal ran
+            ran = True
+            result = await compute()
+            if _cacheable(result):
+                self.backend.set(key, {'result': result, 'cached_at': time.time()}, ttl=self.ttl)
+            return result
+
+        result = await self._flights.do_async(key, load)
+        self._count(workflow, 'misses' if ran else 'coalesced')
+        return _annotate(result, False, coalesced=not ran)
+
+    def invalidate(self, workflow: str, payload: Dict[str, Any]):
+        """Drop the cached result for one payload"""
+        self.backend.invalidate(f"{workflow}:{payload_hash(payload)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-workflow hit/miss/coalesced counters"""
+        by_workflow = {}
+        for workflow, counters in sorted(self._stats.items()):
+            requests = sum(counters.values())
+            by_workflow[workflow] = {
+                **counters,
+                'completions_saved_rate': round(
+                    (counters['hits'] + counters['coalesced']) / requests * 100, 2
+                ) if requests else 0.0
+            }
+        return {'ttl': self.ttl, 'by_workflow': by_workflow}
+
+
+def cached_workflow(workflow: str):
+    """
+    Route an agent workflow method through its instance's workflow_cache
+
+    Every bound argument (defaults included) forms the payload, so callers
+    passing the same values positionally or by keyword share a result.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'workflow_cache', None)
+            if cache is None:
+                return await method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            payload = {name: value for name, value in bound.arguments.items() if name != 'self'}
+            return await cache.run(workflow, payload, lambda: method(self, *args, **kwargs))
+
+        return wrapper
+    return decorator
+
+
+def create_workflow_cache() -> WorkflowCache:
+    """Workflow cache on the configured backend (shared across workers with Redis)"""
+    ttl = int(os.getenv("WORKFLOW_CACHE_TTL", "900"))
+    return WorkflowCache(
+        create_cache_backend(
+            namespace="workflow",
+            default_ttl=ttl,
+            max_entries=int(os.getenv("WORKFLOW_CACHE_MAX_ENTRIES", "1000"))
+        ),
+        ttl=ttl
+    )